@@ -0,0 +1,49 @@
+"""Compare two benchmark result files written by benchmarks/run.py
+
+Usage:
+
+    python benchmarks/compare.py base.json new.json
+
+Prints the ratio new / base of each time, below 1 is faster.
+"""
+import argparse
+import json
+import pathlib
+from typing import Dict, Tuple
+
+METRICS = ["build.total", "build.compile", "do_step", "get_derivatives", "get_real"]
+
+
+def load(path: pathlib.Path) -> Dict[Tuple, dict]:
+    with open(path) as f:
+        data = json.load(f)
+    return {(r["nx"], r["nu"], r["ny"], r["density"]): r for r in data["results"]}
+
+
+def metric(result: dict, name: str) -> float:
+    for key in name.split("."):
+        result = result.get(key, {}) if isinstance(result, dict) else {}
+    return result if isinstance(result, float) else float("nan")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", type=pathlib.Path)
+    parser.add_argument("new", type=pathlib.Path)
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(
+        f"{'nx':>5} {'nu':>3} {'ny':>3} {'density':>7} "
+        + " ".join(f"{m:>15}" for m in METRICS)
+    )
+    for key in sorted(base.keys() & new.keys()):
+        ratios = [metric(new[key], m) / metric(base[key], m) for m in METRICS]
+        print(
+            f"{key[0]:>5} {key[1]:>3} {key[2]:>3} {key[3]:>7} "
+            + " ".join(f"{r:>15.3f}" for r in ratios)
+        )
+
+
+if __name__ == "__main__":
+    main()
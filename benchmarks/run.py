@@ -0,0 +1,98 @@
+"""Benchmark generated FMUs over a grid of model sizes and write JSON results
+
+Usage:
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --quick -o quick.json
+
+Compare two result files with benchmarks/compare.py.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+
+import numpy as np
+import scipy
+
+import qfmu
+from qfmu.benchmark import benchmark_model, random_model
+from qfmu.utils import OPT_PROFILES
+
+# Grid of (nx, nu, ny, density), sparse models only for larger nx
+GRID = [
+    (nx, nu, ny, density)
+    for nx, nu, ny, density in itertools.product(
+        [1, 4, 10, 50, 200, 1000], [1, 10], [1, 10], [1.0, 0.05]
+    )
+    if density == 1.0 or nx >= 50
+]
+QUICK_GRID = [(1, 1, 1, 1.0), (10, 1, 1, 1.0), (50, 10, 10, 1.0), (200, 1, 1, 0.05)]
+
+
+def git_revision() -> str:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=pathlib.Path(__file__).parent,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compiler_version() -> str:
+    try:
+        out = subprocess.check_output(["gcc", "--version"], stderr=subprocess.STDOUT)
+        return out.decode().splitlines()[0]
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", type=pathlib.Path, required=True)
+    parser.add_argument("--quick", action="store_true", help="Small grid")
+    parser.add_argument("--calls", type=int, default=10000, help="Calls per metric")
+    parser.add_argument("--solver", default="euler")
+    parser.add_argument("--opt", default="O2", choices=OPT_PROFILES)
+    args = parser.parse_args()
+
+    results = []
+    for nx, nu, ny, density in QUICK_GRID if args.quick else GRID:
+        m = random_model(nx, nu, ny, density)
+        r = benchmark_model(m, n_calls=args.calls, solver=args.solver, opt=args.opt)
+        results.append({"nx": nx, "nu": nu, "ny": ny, "density": density, **r})
+        print(
+            f"nx={nx:<5} nu={nu:<3} ny={ny:<3} density={density:<5} "
+            f"build={r['build']['total']:.3f}s do_step={r['do_step'] * 1e6:.3f}us",
+            file=sys.stderr,
+        )
+
+    meta = {
+        "qfmu": qfmu.__version__,
+        "revision": git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "compiler": compiler_version(),
+        "solver": args.solver,
+        "opt": args.opt,
+        "calls": args.calls,
+    }
+    with open(args.output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
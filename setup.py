@@ -37,7 +37,7 @@ setup(
     package_data={"qfmu": ["codegen/templates/*", "codegen/include/*"]},
     test_suite="tests",
     install_requires=install_requires,
-    extras_require={"dev": dev_requires},
+    extras_require={"dev": dev_requires, "yaml": ["PyYAML"]},
     url="https://github.com/hyumo/qfmu",
     version="0.2.9",
     zip_safe=False,
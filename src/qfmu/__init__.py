@@ -1,5 +1,7 @@
 """Top-level package for qFMU."""
+
 import pathlib
+import platform
 import sys
 
 __author__ = """Hang Yu"""
@@ -23,3 +25,11 @@ if sys.maxsize > 2**32:
     __platform__ += "64"
 else:
     __platform__ += "32"
+
+# Platform tuple of FMI 3 binaries, e.g. x86_64-linux
+__platform_tuple__ = "{}-{}".format(
+    {"amd64": "x86_64", "arm64": "aarch64", "i386": "x86", "i686": "x86"}.get(
+        platform.machine().lower(), platform.machine().lower()
+    ),
+    {"win": "windows"}.get(__platform__[:-2], __platform__[:-2]),
+)
@@ -0,0 +1,378 @@
+"""Step-time benchmarks of generated FMUs
+
+The FMUs are driven through a minimal ctypes binding rather than a full FMI
+importer, so that the measured times are dominated by the generated code.
+"""
+
+import ctypes
+import ctypes.util
+import pathlib
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from qfmu import __platform__
+from qfmu.model import StateSpace
+from qfmu.model.lti import LTI
+from qfmu.utils import OPT_PROFILES, build_fmu
+
+fmi2Component = ctypes.c_void_p
+fmi2Status = ctypes.c_int
+fmi2Real = ctypes.c_double
+fmi2ValueReference = ctypes.c_uint
+
+FMI2_MODEL_EXCHANGE = 0
+FMI2_CO_SIMULATION = 1
+
+FMI2_OK = 0
+
+_LOGGER = ctypes.CFUNCTYPE(
+    None,
+    ctypes.c_void_p,
+    ctypes.c_char_p,
+    ctypes.c_int,
+    ctypes.c_char_p,
+    ctypes.c_char_p,
+)
+
+
+class _CallbackFunctions(ctypes.Structure):
+    _fields_ = [
+        ("logger", _LOGGER),
+        ("allocateMemory", ctypes.c_void_p),
+        ("freeMemory", ctypes.c_void_p),
+        ("stepFinished", ctypes.c_void_p),
+        ("componentEnvironment", ctypes.c_void_p),
+    ]
+
+
+def _libc() -> ctypes.CDLL:
+    if __platform__.startswith("win"):
+        return ctypes.cdll.msvcrt
+    return ctypes.CDLL(ctypes.util.find_library("c"))
+
+
+def _ignore_log(env, instance, status, category, message) -> None:
+    pass
+
+
+def check_status(name: str, status: int) -> None:
+    """Raise a RuntimeError if the FMI function `name` did not return fmi2OK"""
+    if status != FMI2_OK:
+        raise RuntimeError(f"{name} failed with status {status}")
+
+
+class Fmu:
+    """Minimal ctypes binding of a qfmu generated FMU
+
+    Args:
+        fmu_path: the FMU to load
+        unzip_dir: directory the FMU is extracted to, it must outlive the
+            instance
+    """
+
+    _SIGNATURES = {
+        "fmi2Instantiate": (
+            fmi2Component,
+            [
+                ctypes.c_char_p,
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_char_p,
+                ctypes.POINTER(_CallbackFunctions),
+                ctypes.c_int,
+                ctypes.c_int,
+            ],
+        ),
+        "fmi2FreeInstance": (None, [fmi2Component]),
+        "fmi2SetupExperiment": (
+            fmi2Status,
+            [fmi2Component, ctypes.c_int, fmi2Real, fmi2Real, ctypes.c_int, fmi2Real],
+        ),
+        "fmi2EnterInitializationMode": (fmi2Status, [fmi2Component]),
+        "fmi2ExitInitializationMode": (fmi2Status, [fmi2Component]),
+        "fmi2Terminate": (fmi2Status, [fmi2Component]),
+        "fmi2DoStep": (fmi2Status, [fmi2Component, fmi2Real, fmi2Real, ctypes.c_int]),
+        "fmi2GetReal": (
+            fmi2Status,
+            [
+                fmi2Component,
+                ctypes.POINTER(fmi2ValueReference),
+                ctypes.c_size_t,
+                ctypes.POINTER(fmi2Real),
+            ],
+        ),
+        "fmi2SetReal": (
+            fmi2Status,
+            [
+                fmi2Component,
+                ctypes.POINTER(fmi2ValueReference),
+                ctypes.c_size_t,
+                ctypes.POINTER(fmi2Real),
+            ],
+        ),
+        "fmi2GetTypesPlatform": (ctypes.c_char_p, []),
+        "fmi2EnterContinuousTimeMode": (fmi2Status, [fmi2Component]),
+        "fmi2SetTime": (fmi2Status, [fmi2Component, fmi2Real]),
+        "fmi2GetDerivatives": (
+            fmi2Status,
+            [fmi2Component, ctypes.POINTER(fmi2Real), ctypes.c_size_t],
+        ),
+    }
+
+    def __init__(self, fmu_path: pathlib.Path, unzip_dir: pathlib.Path) -> None:
+        unzip_dir = pathlib.Path(unzip_dir)
+        with zipfile.ZipFile(fmu_path) as z:
+            z.extractall(unzip_dir)
+
+        root = ET.parse(unzip_dir / "modelDescription.xml").getroot()
+        self.guid = root.get("guid")
+        self.identifier = root.find("CoSimulation").get("modelIdentifier")
+        self.variables = {
+            v.get("name"): int(v.get("valueReference"))
+            for v in root.iter("ScalarVariable")
+        }
+        # The built FMU may have fewer states than its model, e.g. if reduced
+        self.nx = len(root.findall("ModelStructure/Derivatives/Unknown"))
+
+        ext = {"win": ".dll", "darwin": ".dylib", "linux": ".so"}[__platform__[:-2]]
+        dll = unzip_dir / "binaries" / __platform__ / f"{self.identifier}{ext}"
+        self._lib = ctypes.CDLL(str(dll))
+        for name, (restype, argtypes) in self._SIGNATURES.items():
+            f = getattr(self._lib, name)
+            f.restype, f.argtypes = restype, argtypes
+
+        libc = _libc()
+        self._callbacks = _CallbackFunctions(
+            logger=_LOGGER(_ignore_log),
+            allocateMemory=ctypes.cast(libc.calloc, ctypes.c_void_p),
+            freeMemory=ctypes.cast(libc.free, ctypes.c_void_p),
+        )
+        self._component = None
+
+    def instantiate(self, fmu_type: int = FMI2_CO_SIMULATION) -> None:
+        self._component = self._lib.fmi2Instantiate(
+            b"benchmark",
+            fmu_type,
+            self.guid.encode(),
+            b"",
+            ctypes.byref(self._callbacks),
+            0,
+            0,
+        )
+        if not self._component:
+            raise RuntimeError(f"Failed to instantiate {self.identifier}")
+
+    def call(self, name: str, *args) -> None:
+        """Call the FMI function `name` on the instance, checking its status"""
+        check_status(name, getattr(self._lib, name)(self._component, *args))
+
+    def initialize(self, start_time: float = 0.0) -> None:
+        self.call("fmi2SetupExperiment", 0, 0.0, start_time, 0, 0.0)
+        self.call("fmi2EnterInitializationMode")
+        self.call("fmi2ExitInitializationMode")
+
+    def inputs(self) -> List[int]:
+        return [vr for name, vr in self.variables.items() if is_input(name)]
+
+    def outputs(self) -> List[int]:
+        return [vr for name, vr in self.variables.items() if is_output(name)]
+
+    def set_real(self, vrs: Sequence[int], values: Sequence[float]) -> None:
+        self.call("fmi2SetReal", vr_array(vrs), len(vrs), real_array(values))
+
+    def get_real(self, vrs: Sequence[int]) -> np.ndarray:
+        values = real_array([0.0] * len(vrs))
+        self.call("fmi2GetReal", vr_array(vrs), len(vrs), values)
+        return np.array(values)
+
+    @property
+    def component(self) -> fmi2Component:
+        return self._component
+
+    @property
+    def lib(self) -> ctypes.CDLL:
+        return self._lib
+
+    def free(self) -> None:
+        if self._component:
+            self._lib.fmi2Terminate(self._component)
+            self._lib.fmi2FreeInstance(self._component)
+            self._component = None
+
+
+def real_array(values: Sequence[float]) -> ctypes.Array:
+    return (fmi2Real * len(values))(*values)
+
+
+def vr_array(vrs: Sequence[int]) -> ctypes.Array:
+    return (fmi2ValueReference * len(vrs))(*vrs)
+
+
+def random_model(
+    nx: int, nu: int = 1, ny: int = 1, density: float = 1.0, seed: int = 0
+) -> StateSpace:
+    """Random stable state space model
+
+    A has the given `density` and is made diagonally dominant with negative
+    diagonal, so that all eigenvalues have negative real parts.
+    """
+    rng = np.random.default_rng(seed)
+    A = sparse.random(nx, nx, density=density, random_state=rng, format="csr")
+    A = A.toarray() - 0.5 * (A.toarray() != 0)
+    np.fill_diagonal(A, -(np.abs(A).sum(axis=1) + 1.0))
+    B = rng.uniform(-1.0, 1.0, (nx, nu))
+    C = rng.uniform(-1.0, 1.0, (ny, nx))
+    if density < 1.0:
+        return StateSpace(sparse.csr_matrix(A), B, C, np.zeros((ny, nu)))
+    return StateSpace(A, B, C, np.zeros((ny, nu)))
+
+
+def is_input(name: str) -> bool:
+    """Whether `name` is an input variable of a generated FMU, e.g. u1"""
+    return name[0] == "u" and name[1:].isdigit()
+
+
+def is_output(name: str) -> bool:
+    """Whether `name` is an output variable of a generated FMU, e.g. y1"""
+    return name[0] == "y" and name[1:].isdigit()
+
+
+def time_calls(f: Callable, args: Sequence[Any], n_calls: int) -> float:
+    """Mean wall time of `f(*args)` in seconds"""
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        f(*args)
+    return (time.perf_counter() - start) / n_calls
+
+
+def time_do_step(
+    fmu_path: pathlib.Path, n_steps: int = 10000, step_size: float = 1e-3
+) -> float:
+    """Mean wall time of one fmi2DoStep call in seconds, with all inputs at 1"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fmu = Fmu(fmu_path, pathlib.Path(tmpdir))
+        fmu.instantiate()
+        fmu.initialize()
+        inputs = fmu.inputs()
+        if inputs:
+            fmu.set_real(inputs, [1.0] * len(inputs))
+
+        do_step, component = fmu.lib.fmi2DoStep, fmu.component
+        status = FMI2_OK
+        start = time.perf_counter()
+        for i in range(n_steps):
+            status |= do_step(component, i * step_size, step_size, 1)
+        elapsed = time.perf_counter() - start
+        check_status("fmi2DoStep", status)
+
+        fmu.free()
+    return elapsed / n_steps
+
+
+def time_calls_of_fmu(
+    fmu_path: pathlib.Path, n_calls: int = 10000, step_size: float = 1e-3
+) -> Dict[str, float]:
+    """Mean wall times in seconds of the FMI calls on the hot path of a simulation
+
+    call_overhead is the time of fmi2GetTypesPlatform, which does no work, and
+    approximates the cost of a ctypes call that is included in all other times.
+    Each FMI function is called once and its status checked before it is timed,
+    a RuntimeError is raised if it fails.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fmu = Fmu(fmu_path, pathlib.Path(tmpdir))
+        lib = fmu.lib
+        results["call_overhead"] = time_calls(lib.fmi2GetTypesPlatform, [], n_calls)
+
+        fmu.instantiate(FMI2_MODEL_EXCHANGE)
+        fmu.initialize()
+        fmu.call("fmi2EnterContinuousTimeMode")
+        if fmu.nx > 0:
+            derivatives = real_array([0.0] * fmu.nx)
+            fmu.call("fmi2GetDerivatives", derivatives, fmu.nx)
+            results["get_derivatives"] = time_calls(
+                lib.fmi2GetDerivatives, [fmu.component, derivatives, fmu.nx], n_calls
+            )
+        fmu.free()
+
+        fmu.instantiate(FMI2_CO_SIMULATION)
+        fmu.initialize()
+        for name, vrs, f in [
+            ("set_real", fmu.inputs(), lib.fmi2SetReal),
+            ("get_real", fmu.outputs(), lib.fmi2GetReal),
+        ]:
+            if vrs:
+                args = [fmu.component, vr_array(vrs), len(vrs), real_array(vrs)]
+                fmu.call(f.__name__, *args[1:])
+                results[name] = time_calls(f, args, n_calls)
+        fmu.free()
+
+    results["do_step"] = time_do_step(fmu_path, n_calls, step_size)
+    results["steps_per_second"] = 1.0 / results["do_step"]
+    return results
+
+
+def benchmark_model(
+    model: LTI,
+    n_calls: int = 10000,
+    step_size: float = 1e-3,
+    output_dir: Optional[pathlib.Path] = None,
+    **options,
+) -> Dict[str, Any]:
+    """Build `model` and time the build phases and the FMI calls
+
+    `options` are passed to `build_fmu`, the build cache is never used.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fmu_path = pathlib.Path(output_dir or tmpdir) / "bench.fmu"
+        report = build_fmu(
+            model,
+            fmu_path,
+            "bench",
+            dt=step_size,
+            cache=False,
+            **options,
+        )
+        build = {
+            **report.timings,
+            "source_size": report.source_size,
+            "library_size": report.library_size,
+            "fmu_size": report.fmu_size,
+        }
+        calls = time_calls_of_fmu(fmu_path, n_calls, step_size)
+        return {"build": build, **calls}
+
+
+def compare_opt(
+    model: LTI,
+    profiles: Sequence[str] = OPT_PROFILES,
+    n_steps: int = 10000,
+    step_size: float = 1e-3,
+    solver: str = "euler",
+    output_dir: Optional[pathlib.Path] = None,
+) -> Dict[str, float]:
+    """Mean fmi2DoStep wall time of `model` compiled with each of `profiles`"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_dir = pathlib.Path(output_dir or tmpdir)
+        for opt in profiles:
+            identifier = f"bench_{opt}"
+            fmu_path = output_dir / f"{identifier}.fmu"
+            build_fmu(
+                model,
+                fmu_path,
+                identifier,
+                dt=step_size,
+                solver=solver,
+                opt=opt,
+                cache=False,
+            )
+            results[opt] = time_do_step(fmu_path, n_steps, step_size)
+    return results
@@ -0,0 +1,191 @@
+"""Content-addressed cache of built FMUs"""
+
+import hashlib
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import uuid
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from qfmu import __include_path__, __platform__, __template_path__, __version__
+from qfmu.model.lti import LTI, issparse
+
+# Upper bound of the total size of the cached FMUs in bytes, least recently
+# used FMUs are evicted first. Overridden by the QFMU_CACHE_SIZE environment
+# variable.
+DEFAULT_CACHE_SIZE = 1 << 30
+
+# Namespace of the GUIDs derived from build keys
+GUID_NAMESPACE = uuid.UUID("8e5b3c1a-6f0d-4a5e-9c3b-2d7f1e0a9b64")
+
+
+def default_cache_dir() -> pathlib.Path:
+    """QFMU_CACHE_DIR if set, else a qfmu folder in the user cache directory"""
+    if os.environ.get("QFMU_CACHE_DIR"):
+        return pathlib.Path(os.environ["QFMU_CACHE_DIR"])
+    if __platform__.startswith("win") and os.environ.get("LOCALAPPDATA"):
+        return pathlib.Path(os.environ["LOCALAPPDATA"]) / "qfmu" / "cache"
+    if os.environ.get("XDG_CACHE_HOME"):
+        return pathlib.Path(os.environ["XDG_CACHE_HOME"]) / "qfmu"
+    return pathlib.Path.home() / ".cache" / "qfmu"
+
+
+@lru_cache(maxsize=None)
+def source_digest() -> str:
+    """Digest of the qfmu version, templates and runtime sources"""
+    h = hashlib.sha256(__version__.encode())
+    for root in (__template_path__, __include_path__):
+        for path in sorted(p for p in root.rglob("*") if p.is_file()):
+            h.update(path.relative_to(root).as_posix().encode())
+            h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _update_matrix(h, m) -> None:
+    if issparse(m):
+        m = m.tocsr()
+        parts = ("csr", m.shape, m.data, m.indices, m.indptr)
+    else:
+        m = np.asarray(m, dtype=float)
+        parts = ("dense", m.shape, m)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode())
+
+
+def build_key(model: LTI, **options) -> str:
+    """Hash of everything that determines the content of an FMU
+
+    That is the model matrices and start values, the build `options` (e.g.
+    identifier, step size, solver, compiler command) and the sources the FMU
+    is generated from.
+    """
+    h = hashlib.sha256(source_digest().encode())
+    for m in (model.A, model.B, model.C, model.D, model.x0, model.u0):
+        _update_matrix(h, m)
+    h.update(repr(sorted(options.items())).encode())
+    return h.hexdigest()
+
+
+def runtime_key(**options) -> str:
+    """Hash of the runtime sources and the compiler `options` building them"""
+    h = hashlib.sha256(source_digest().encode())
+    h.update(repr(sorted(options.items())).encode())
+    return h.hexdigest()
+
+
+def key_to_guid(key: str) -> str:
+    """Deterministic GUID of the FMU built with `key`"""
+    return str(uuid.uuid5(GUID_NAMESPACE, key))
+
+
+class BuildCache:
+    """Directory of finished FMUs named after their build key
+
+    The modification time of an entry is its last use, entries are evicted in
+    least recently used order once the cache exceeds `max_size` bytes. The
+    compiled FMI runtime objects, one per compiler command, are kept in the
+    runtime subfolder and are not evicted.
+    """
+
+    def __init__(
+        self, path: Optional[pathlib.Path] = None, max_size: Optional[int] = None
+    ) -> None:
+        self.path = pathlib.Path(path) if path is not None else default_cache_dir()
+        if max_size is None:
+            max_size = int(os.environ.get("QFMU_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        self.max_size = max_size
+
+    def _entry(self, key: str) -> pathlib.Path:
+        return self.path / f"{key}.fmu"
+
+    def _runtime_entry(self, key: str) -> pathlib.Path:
+        return self.path / "runtime" / f"{key}.o"
+
+    @staticmethod
+    def _touch(entry: pathlib.Path) -> Optional[pathlib.Path]:
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            # An unusable cache directory must not fail the build
+            logging.warning(f"Build cache unavailable, skipping lookup: {e}")
+            return None
+        return entry
+
+    @staticmethod
+    def _store(src_path: pathlib.Path, entry: pathlib.Path) -> bool:
+        """Copy `src_path` to `entry`, False if the cache is not writable"""
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that concurrent builds never
+            # see a partially written entry
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=entry.parent)
+        except OSError as e:
+            logging.warning(f"Build cache unavailable, not storing {entry.name}: {e}")
+            return False
+        try:
+            with os.fdopen(fd, "wb") as dst, open(src_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, entry)
+        except OSError as e:
+            os.unlink(tmp)
+            logging.warning(f"Build cache unavailable, not storing {entry.name}: {e}")
+            return False
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return True
+
+    def get(self, key: str) -> Optional[pathlib.Path]:
+        """Path of the cached FMU for `key`, None on a cache miss"""
+        return self._touch(self._entry(key))
+
+    def put(self, key: str, fmu: pathlib.Path) -> None:
+        """Store a copy of `fmu` under `key`, then evict old entries"""
+        if self._store(fmu, self._entry(key)):
+            self.evict()
+
+    def get_runtime(self, key: str) -> Optional[pathlib.Path]:
+        """Path of the cached runtime object for `key`, None on a cache miss"""
+        return self._touch(self._runtime_entry(key))
+
+    def put_runtime(self, key: str, obj: pathlib.Path) -> None:
+        """Store a copy of the runtime object `obj` under `key`"""
+        self._store(obj, self._runtime_entry(key))
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the size bound holds"""
+        entries = []
+        for entry in self.path.glob("*.fmu"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        size = sum(e[1] for e in entries)
+        for _, entry_size, entry in sorted(entries):
+            if size <= self.max_size:
+                break
+            logging.debug(f"Evicting {entry.name} from the build cache")
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self) -> None:
+        """Remove all entries, including the runtime objects"""
+        for entry in self.path.glob("*.fmu"):
+            entry.unlink()
+        for entry in self.path.glob("runtime/*.o"):
+            entry.unlink()
@@ -1,11 +1,153 @@
+import json
 import logging
 import pathlib
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 
 import click
 
-from qfmu import __version__, model
-from qfmu.utils import build_fmu, str_to_arr, str_to_mat
+from qfmu import __version__
+from qfmu.options import (
+    FLOAT_FORMATS,
+    FMI_VERSIONS,
+    MODEL_TYPES,
+    OPT_PROFILES,
+    REALIZATIONS,
+    SIM_SOLVERS,
+    SOLVERS,
+)
+
+# numpy, scipy and jinja2 are imported by the commands that need them, so that
+# the command line starts fast
+if TYPE_CHECKING:
+    from qfmu.model.lti import LTI
+
+
+# Options of the commands building one FMU, passed on to `build_fmu`
+_BUILD_OPTIONS = [
+    click.option(
+        "--dt",
+        "-dt",
+        type=click.FloatRange(min=0.0, min_open=True),
+        default=0.001,
+        help="Integrator (initial) step size, precomputed step size for zoh",
+    ),
+    click.option(
+        "--solver",
+        "-s",
+        type=click.Choice(SOLVERS),
+        default="euler",
+        help="Co-Simulation state update method",
+    ),
+    click.option(
+        "--sparse/--dense",
+        default=None,
+        help="Store matrices in CSR format, "
+        "detected from the density of A if not given",
+    ),
+    click.option(
+        "--float-format",
+        type=click.Choice(FLOAT_FORMATS),
+        default="dec",
+        help="Floating point literals of the generated code, hex is exact and faster",
+    ),
+    click.option(
+        "--cache/--no-cache",
+        default=False,
+        help="Reuse identical FMUs from the build cache, see QFMU_CACHE_DIR",
+    ),
+    click.option(
+        "--opt",
+        type=click.Choice(OPT_PROFILES),
+        default="O2",
+        help="Compiler optimization profile, native builds only run on this machine",
+    ),
+    click.option(
+        "--unroll/--no-unroll",
+        default=None,
+        help="Generate straight-line code, "
+        "detected from the model size if not given",
+    ),
+    click.option(
+        "--compression",
+        type=click.IntRange(0, 9),
+        default=6,
+        help="Deflate level of the FMU archive, "
+        "0 stores the files for fast local builds",
+    ),
+    click.option(
+        "--fmi-version",
+        type=click.Choice(FMI_VERSIONS),
+        default="2",
+        help="FMI version, FMI 3 exposes x, u, y and A, B, C, D as array variables",
+    ),
+    click.option(
+        "--call-logging/--no-call-logging",
+        default=True,
+        help="Compile the logging of FMI calls into the FMU, "
+        "errors are always logged",
+    ),
+    click.option(
+        "--reduce",
+        type=str,
+        default=None,
+        help="Reduce the model order: minreal, balred:N to keep N states, "
+        "or the largest acceptable error bound",
+    ),
+    click.option(
+        "--realization",
+        type=click.Choice(REALIZATIONS),
+        default=None,
+        help="State coordinates: modal (block-diagonal, O(nx) per step) or schur",
+    ),
+    click.option(
+        "--report",
+        default=None,
+        help="Write the build report as JSON to this path",
+        type=click.Path(
+            writable=True, file_okay=True, dir_okay=False, path_type=pathlib.Path
+        ),
+    ),
+    click.option(
+        "--output",
+        "-o",
+        default="./q.fmu",
+        help="FMU Output path",
+        type=click.Path(
+            writable=True,
+            file_okay=True,
+            dir_okay=False,
+            resolve_path=True,
+            path_type=pathlib.Path,
+        ),
+    ),
+]
+
+
+def build_options(f):
+    """Add the options shared by the ss, tf, zpk and pid commands to `f`"""
+    for option in reversed(_BUILD_OPTIONS):
+        f = option(f)
+    return f
+
+
+def _build(
+    m: "LTI", output: pathlib.Path, report: Optional[pathlib.Path], **options
+) -> None:
+    """Build the FMU of `m` to `output`, writing the build report to `report` if
+    given. The file name of `output` is the model identifier.
+    """
+    from qfmu.utils import BuildError, build_fmu
+
+    if output.suffix != ".fmu":
+        raise ValueError("Output file must be an FMU")
+    try:
+        r = build_fmu(m, output, identifier=output.stem, **options)
+    except BuildError as e:
+        if report is not None:
+            e.report.write(report)
+        raise
+    if report is not None:
+        r.write(report)
 
 
 @click.group(context_settings={"show_default": True})
@@ -57,25 +199,14 @@ def cli():
     help="Initial input vector json str. Zero vector with inferred size if empty",
 )
 @click.option(
-    "--dt",
-    "-dt",
+    "--sample-time",
+    "-Ts",
+    "Ts",
     type=click.FloatRange(min=0.0, min_open=True),
-    default=0.001,
-    help="Euler integrator step size",
-)
-@click.option(
-    "--output",
-    "-o",
-    default="./q.fmu",
-    help="FMU Output path",
-    type=click.Path(
-        writable=True,
-        file_okay=True,
-        dir_okay=False,
-        resolve_path=True,
-        path_type=pathlib.Path,
-    ),
+    default=None,
+    help="Sample time of a discrete-time model, continuous-time if empty",
 )
+@build_options
 def ss(
     A: Optional[str],
     B: Optional[str],
@@ -83,11 +214,11 @@ def ss(
     D: Optional[str],
     x0: Optional[str],
     u0: Optional[str],
-    dt: float,
-    output: pathlib.Path,
+    Ts: Optional[float],
+    **options: Any,
 ):
     """
-    Generate a continuous-time state space system fmu
+    Generate a state space system fmu, discrete-time if a sample time is given
 
     Examples:
 
@@ -97,6 +228,9 @@ def ss(
     - C[2, 2] = [[1.0, 0.0], [0.0, 1.0]]
     - D[2, 0] = [[], []]
     """
+    from qfmu import model
+    from qfmu.utils import str_to_arr, str_to_mat
+
     # Hanlde case where only D is provided
     A = str_to_mat(A) if A is not None else None
     B = str_to_mat(B) if B is not None else None
@@ -105,16 +239,11 @@ def ss(
     x0 = str_to_arr(x0) if x0 is not None else None
     u0 = str_to_arr(u0) if u0 is not None else None
 
-    # Get filename as identifier
-    if output.suffix != ".fmu":
-        raise ValueError("Output file must be an FMU")
-    identifier = output.stem
-
     # Construct a state space model
-    m = model.StateSpace(A, B, C, D, x0, u0)
+    m = model.StateSpace(A, B, C, D, x0, u0, Ts)
 
     # Build FMU
-    build_fmu(m, output, identifier=identifier, dt=dt)
+    _build(m, **options)
 
 
 @cli.command()
@@ -123,14 +252,16 @@ def ss(
     "-n",
     type=str,
     required=True,
-    help="Numerator polynomial coefficients as a json list of floats",
+    help="Numerator polynomial coefficients as a json list of floats, "
+    "or a json ny x nu nested list of them for a transfer function matrix",
 )
 @click.option(
     "--den",
     "-d",
     type=str,
     required=True,
-    help="Denominator polynomial coefficients as json list of floats",
+    help="Denominator polynomial coefficients as json list of floats, "
+    "shared by all entries of a matrix or nested like num",
 )
 @click.option(
     "--x0",
@@ -142,77 +273,78 @@ def ss(
 @click.option(
     "--u0",
     "-u0",
-    type=float,
-    default=0,
-    help="Initial input value",
+    type=str,
+    default=None,
+    help="Initial input value, or json list of them for a matrix. Zero if empty",
 )
 @click.option(
-    "--dt",
-    "-dt",
+    "--sample-time",
+    "-Ts",
+    "Ts",
     type=click.FloatRange(min=0.0, min_open=True),
-    default=0.001,
-    help="Euler integrator step size",
-)
-@click.option(
-    "--output",
-    "-o",
-    default="./q.fmu",
-    help="FMU Output path",
-    type=click.Path(
-        writable=True,
-        file_okay=True,
-        dir_okay=False,
-        resolve_path=True,
-        path_type=pathlib.Path,
-    ),
+    default=None,
+    help="Sample time of a discrete-time model, continuous-time if empty",
 )
+@build_options
 def tf(
     num: str,
     den: str,
     x0: Optional[str],
-    u0: float,
-    dt: float,
-    output: pathlib.Path,
+    u0: Optional[str],
+    Ts: Optional[float],
+    **options: Any,
 ):
-    """Generate a continuous-time transfer function fmu
+    """Generate a transfer function fmu, in z if a sample time is given
 
     tf(num, den) =
 
     num[0]*s**(n-1) + ... + num[n-1]*s + num[n]
     -----------------------------------
     den[0]*s**(n-1) + ... + den[n-1]*s + den[n]
-    """
 
-    # TODO: Check sigle gain case for x0 and u0
-
-    # Get filename as identifier
-    if output.suffix != ".fmu":
-        raise ValueError("Output file must be an FMU")
-    identifier = output.stem
+    A nested NUM is a ny x nu transfer function matrix, realized with states
+    shared by its entries.
+    """
+    from qfmu import model
+    from qfmu.utils import str_to_arr
 
     # Construct a state space model
     m = model.TransferFunction(
-        str_to_arr(num), str_to_arr(den), str_to_arr(x0) if x0 is not None else None, u0
+        json.loads(num),
+        json.loads(den),
+        str_to_arr(x0) if x0 is not None else None,
+        json.loads(u0) if u0 is not None else None,
+        Ts,
     )
 
     # Build FMU
-    build_fmu(m, output, identifier=identifier, dt=dt)
+    _build(m, **options)
 
 
 @cli.command()
 @click.option(
-    "--zeros", "-z", "z", type=str, required=True, help="Transfer function Zeros"
+    "--zeros",
+    "-z",
+    "z",
+    type=str,
+    required=True,
+    help="Transfer function Zeros, a json ny x nu nested list of them if k is a matrix",
 )
 @click.option(
-    "--poles", "-p", "p", type=str, required=True, help="Transfer function Poles"
+    "--poles",
+    "-p",
+    "p",
+    type=str,
+    required=True,
+    help="Transfer function Poles, shared by all entries of a matrix or nested like z",
 )
 @click.option(
     "--k",
     "-k",
     "k",
-    type=float,
-    default=1.0,
-    help="Transfer function gain scalar",
+    type=str,
+    default="1.0",
+    help="Transfer function gain scalar, or json ny x nu gain matrix",
 )
 @click.option(
     "--x0",
@@ -224,52 +356,44 @@ def tf(
 @click.option(
     "--u0",
     "-u0",
-    type=float,
-    default=0,
-    help="Initial input value",
+    type=str,
+    default=None,
+    help="Initial input value, or json list of them for a matrix. Zero if empty",
 )
 @click.option(
-    "--dt",
-    "-dt",
+    "--sample-time",
+    "-Ts",
+    "Ts",
     type=click.FloatRange(min=0.0, min_open=True),
-    default=0.001,
-    help="Euler integrator step size",
-)
-@click.option(
-    "--output",
-    "-o",
-    default="./q.fmu",
-    help="FMU Output path",
-    type=click.Path(
-        writable=True,
-        file_okay=True,
-        dir_okay=False,
-        resolve_path=True,
-        path_type=pathlib.Path,
-    ),
+    default=None,
+    help="Sample time of a discrete-time model, continuous-time if empty",
 )
+@build_options
 def zpk(
     z: str,
     p: str,
-    k: float,
+    k: str,
     x0: Optional[str],
-    u0: float,
-    dt: float,
-    output: pathlib.Path,
+    u0: Optional[str],
+    Ts: Optional[float],
+    **options: Any,
 ):
-    """Generate a continuous-time transfer function fmu using zeros, poles and gain (zpk) representation""" # noqa: E501
-    # Get filename as identifier
-    if output.suffix != ".fmu":
-        raise ValueError("Output file must be an FMU")
-    identifier = output.stem
+    """Generate a transfer function fmu using zeros, poles and gain (zpk) representation, in z if a sample time is given""" # noqa: E501
+    from qfmu import model
+    from qfmu.utils import str_to_arr
 
     # Construct a state space model
     m = model.ZerosPolesGain(
-        str_to_arr(z), str_to_arr(p), k, str_to_arr(x0) if x0 is not None else None, u0
+        json.loads(z),
+        json.loads(p),
+        json.loads(k),
+        str_to_arr(x0) if x0 is not None else None,
+        json.loads(u0) if u0 is not None else None,
+        Ts,
     )
 
     # Build FMU
-    build_fmu(m, output, identifier=identifier, dt=dt)
+    _build(m, **options)
 
 
 @cli.command()
@@ -298,18 +422,73 @@ def zpk(
     default=0,
     help="Initial input value",
 )
+@build_options
+def pid(
+    kp: float,
+    ki: float,
+    kd: float,
+    ts: float,
+    x0: Optional[str],
+    u0: float,
+    **options: Any,
+):
+    """Generate a PID controller fmu
+
+    pid(kp, ki, kd, T) =
+
+    kp + ki/s + kd*s/(T*s + 1)
+
+    """
+    from qfmu import model
+    from qfmu.utils import str_to_arr
+
+    # Construct a state space model
+    m = model.PID(kp, ki, kd, ts, str_to_arr(x0) if x0 is not None else None, u0)
+
+    # Build FMU
+    _build(m, **options)
+
+
+@cli.command()
+@click.argument("kind", type=click.Choice(MODEL_TYPES))
+@click.argument(
+    "table",
+    type=click.Path(
+        exists=True, file_okay=True, dir_okay=False, path_type=pathlib.Path
+    ),
+)
+@click.option(
+    "--u",
+    "-u",
+    type=str,
+    default=None,
+    help="Constant input vector json str, u0 of each variant if empty",
+)
+@click.option(
+    "--stop-time",
+    type=click.FloatRange(min=0.0, min_open=True),
+    default=1.0,
+    help="Simulation stop time",
+)
 @click.option(
     "--dt",
     "-dt",
     type=click.FloatRange(min=0.0, min_open=True),
-    default=0.001,
-    help="Euler integrator step size",
+    default=0.01,
+    help="Output interval",
+)
+@click.option(
+    "--solver",
+    "-s",
+    type=click.Choice(SIM_SOLVERS),
+    default="zoh",
+    help="Input interpolation between samples",
 )
 @click.option(
     "--output",
     "-o",
-    default="./q.fmu",
-    help="FMU Output path",
+    default="./sweep.csv",
+    help="Result csv output path",
     type=click.Path(
         writable=True,
         file_okay=True,
@@ -318,30 +497,221 @@ def zpk(
         path_type=pathlib.Path,
     ),
 )
-def pid(
-    kp: float,
-    ki: float,
-    kd: float,
-    ts: float,
-    x0: Optional[str],
-    u0: float,
+def sweep(
+    kind: str,
+    table: pathlib.Path,
+    u: Optional[str],
+    stop_time: float,
     dt: float,
+    solver: str,
     output: pathlib.Path,
 ):
-    """Generate a PID controller fmu
+    """Simulate parameter variants of a model in one batch, without building fmus
 
-    pid(kp, ki, kd, T) =
+    Each row of the csv TABLE holds the constructor arguments of one variant,
+    arrays are given as json lists. All variants must have the same number of
+    states. The outputs of all variants are written to a single csv file with
+    the columns variant, time, y1, ..., yn.
 
-    kp + ki/s + kd*s/(T*s + 1)
+    Examples:
 
+    qfmu sweep pid gains.csv -u "[1]" -o ./sweep.csv
+
+    with gains.csv
+
+    kp,ki,kd,T
+
+    1.0,0.5,0.1,0.01
+
+    2.0,0.5,0.1,0.01
     """
-    # Get filename as identifier
-    if output.suffix != ".fmu":
-        raise ValueError("Output file must be an FMU")
-    identifier = output.stem
+    import numpy as np
 
-    # Construct a state space model
-    m = model.PID(kp, ki, kd, ts, str_to_arr(x0) if x0 is not None else None, u0)
+    from qfmu import model
+    from qfmu.sim import simulate_batch
+    from qfmu.utils import MODELS, read_parameter_table, str_to_arr
 
-    # Build FMU
-    build_fmu(m, output, identifier=identifier, dt=dt)
+    # Constructing thousands of variants would flood the log
+    level = logging.getLogger().level
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        models = []
+        for i, params in enumerate(read_parameter_table(table)):
+            try:
+                models.append(MODELS[kind](**params))
+            except (TypeError, ValueError) as e:
+                raise click.ClickException(f"Row {i + 1}: {e}")
+        batch = model.LTIBatch.from_models(models)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    finally:
+        logging.getLogger().setLevel(level)
+
+    t = np.linspace(0.0, stop_time, int(round(stop_time / dt)) + 1)
+    inputs = np.tile(str_to_arr(u), (len(t), 1)) if u is not None else None
+    result = simulate_batch(batch, t, inputs, solver=solver)
+
+    names = result.dtype.names[1:]
+    data = np.column_stack(
+        [np.repeat(np.arange(len(batch)), len(t)), result["time"].ravel()]
+        + [result[name].ravel() for name in names]
+    )
+    np.savetxt(
+        output,
+        data,
+        fmt=["%d"] + ["%.17g"] * (len(names) + 1),
+        delimiter=",",
+        header=",".join(["variant", "time", *names]),
+        comments="",
+    )
+    logging.info(f"Simulated {len(batch)} variants, results written to {output}")
+
+
+@cli.command("build-many")
+@click.argument(
+    "manifest",
+    type=click.Path(
+        exists=True, file_okay=True, dir_okay=False, path_type=pathlib.Path
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of parallel builds, number of CPUs if empty",
+)
+@click.option(
+    "--threads",
+    is_flag=True,
+    default=False,
+    help="Build on a thread pool instead of a process pool",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help="Reuse identical FMUs from the build cache, see QFMU_CACHE_DIR",
+)
+@click.option(
+    "--report",
+    default=None,
+    help="Write the build reports as a JSON list to this path",
+    type=click.Path(
+        writable=True, file_okay=True, dir_okay=False, path_type=pathlib.Path
+    ),
+)
+@click.option(
+    "--output",
+    "-o",
+    default=".",
+    help="Output directory of the FMUs",
+    type=click.Path(
+        writable=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True,
+        path_type=pathlib.Path,
+    ),
+)
+def build_many_command(
+    manifest: pathlib.Path,
+    jobs: Optional[int],
+    threads: bool,
+    cache: bool,
+    report: Optional[pathlib.Path],
+    output: pathlib.Path,
+):
+    """Build the fmus listed in a json, yaml or csv MANIFEST in parallel
+
+    Each entry has a name, used as identifier and file name, a type (ss, tf,
+    zpk or pid), the model parameters and optionally the build options dt,
+    solver, sparse, float_format, opt, unroll, compression, fmi_version,
+    call_logging, reduce and realization, named like the arguments of
+    build_fmu. Failed builds are reported at the end.
+
+    Examples:
+
+    qfmu build-many manifest.json -j 8 -o ./fmus
+
+    with manifest.json
+
+    [{"name": "FirstOrder", "type": "tf", "num": [10], "den": [1, 10]},
+     {"name": "Controller", "type": "pid", "kp": 1.0, "ki": 0.5, "solver": "zoh"}]
+    """
+    from qfmu.utils import build_many, read_manifest
+
+    try:
+        entries = read_manifest(manifest)
+        results = build_many(entries, output, jobs=jobs, threads=threads, cache=cache)
+    except (ImportError, ValueError) as e:
+        raise click.ClickException(str(e))
+
+    if report is not None:
+        with open(report, "w") as f:
+            json.dump(
+                [r.report.to_dict() for r in results if r.report is not None],
+                f,
+                indent=2,
+            )
+
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        click.echo(f"{r.name}: {r.error}", err=True)
+    logging.info(
+        f"Built {len(results) - len(failed)} of {len(results)} fmus in {output}"
+    )
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(results)} builds failed")
+
+
+@cli.command("bench-opt")
+@click.option("--nx", type=click.IntRange(min=1), default=100, help="Number of states")
+@click.option("--nu", type=click.IntRange(min=0), default=1, help="Number of inputs")
+@click.option("--ny", type=click.IntRange(min=0), default=1, help="Number of outputs")
+@click.option(
+    "--density",
+    type=click.FloatRange(min=0.0, max=1.0, min_open=True),
+    default=1.0,
+    help="Density of the random A matrix",
+)
+@click.option(
+    "--steps", type=click.IntRange(min=1), default=10000, help="Number of steps"
+)
+@click.option(
+    "--solver",
+    "-s",
+    type=click.Choice(SOLVERS),
+    default="euler",
+    help="Co-Simulation state update method",
+)
+@click.option(
+    "--opt",
+    "profiles",
+    type=click.Choice(OPT_PROFILES),
+    multiple=True,
+    default=OPT_PROFILES,
+    help="Compiler optimization profiles to compare",
+)
+def bench_opt(
+    nx: int,
+    nu: int,
+    ny: int,
+    density: float,
+    steps: int,
+    solver: str,
+    profiles: Tuple[str, ...],
+):
+    """Compare the fmi2DoStep time of a random model across compile profiles
+
+    Examples:
+
+    qfmu bench-opt --nx 200 --opt O2 --opt native
+    """
+    from qfmu.benchmark import compare_opt, random_model
+
+    m = random_model(nx, nu, ny, density)
+    results = compare_opt(m, profiles, n_steps=steps, solver=solver)
+    baseline = results[profiles[0]]
+    click.echo(f"{'profile':<8} {'us/step':>10} {'speedup':>8}")
+    for opt, t in results.items():
+        click.echo(f"{opt:<8} {t * 1e6:>10.3f} {baseline / t:>7.2f}x")
@@ -1,17 +1,154 @@
+///////////////////////////////////////////////////////////////////////////////
+// FMI runtime
+//
+// Independent of the model, this file is compiled once per compiler profile
+// and linked with the generated model code, which defines modelInfo and the
+// model functions declared in fmi2Template.h.
+///////////////////////////////////////////////////////////////////////////////
+
+#include "fmi2Template.h"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define MODEL_GUID (modelInfo.guid)
+#define NR (modelInfo.nr)
+#define NX (modelInfo.nx)
+#define NU (modelInfo.nu)
+#define NY (modelInfo.ny)
+#define VR_X (modelInfo.vrX)
+#define VR_DER (modelInfo.vrDer)
+#define VR_U (modelInfo.vrU)
+#define VR_Y (modelInfo.vrY)
+
+#define DEFAULT_TOLERANCE 1e-4
+
+// macro to be used to log messages. The macro check if current 
+// log category is valid and, if true, call the logger provided by simulator.
+// Errors are always logged. Define DISABLE_CALL_LOGGING to strip all other
+// messages at compile time, otherwise they cost one test of loggingOn.
+#ifdef DISABLE_CALL_LOGGING
+#define IS_LOGGED(instance, status, categoryIndex) (status == fmi2Error || status == fmi2Fatal)
+#else
+#define IS_LOGGED(instance, status, categoryIndex) (status == fmi2Error || status == fmi2Fatal \
+        || (instance->loggingOn && isCategoryLogged(instance, categoryIndex)))
+#endif
+#define FILTERED_LOG(instance, status, categoryIndex, message, ...) if (IS_LOGGED(instance, status, categoryIndex)) \
+        instance->functions->logger(instance->functions->componentEnvironment, instance->instanceName, status, \
+        logCategoriesNames[categoryIndex], message, ##__VA_ARGS__);
+
+static const fmi2String logCategoriesNames[] = {"logAll", "logError", "logFmiCall", "logEvent"};
+
+///////////////////////////////////////////////////////////////////////////////
+// Private functions
+///////////////////////////////////////////////////////////////////////////////
+#ifndef DISABLE_CALL_LOGGING
+static fmi2Boolean isCategoryLogged(ModelInstance *comp, int categoryIndex) {
+    if (categoryIndex < NUMBER_OF_CATEGORIES
+        && (comp->logCategories[categoryIndex] || comp->logCategories[LOG_ALL])) {
+        return fmi2True;
+    }
+    return fmi2False;
+}
+#endif
+
+static fmi2Boolean isInvalidState(ModelInstance *comp, const char *f, int statesExpected) {
+    if (!comp)
+        return fmi2True;
+    if (!(comp->state & statesExpected)) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "%s: Illegal call sequence.", f)
+        return fmi2True;
+    }
+    return fmi2False;
+}
+
+static fmi2Boolean isNullPtr(ModelInstance* comp, const char *f, const char *arg, const void *p) {
+    if (!p) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "%s: Invalid argument %s = NULL.", f, arg)
+        return fmi2True;
+    }
+    return fmi2False;
+}
+
+static fmi2Boolean isVROutOfRange(ModelInstance *comp, const char *f, fmi2ValueReference vr, int end) {
+    if (vr >= end) {
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "%s: Illegal value reference %u.", f, vr)
+        comp->state = modelError;
+        return fmi2True;
+    }
+    return fmi2False;
+}
+
+/**
+ * \brief Check all value references of vr[] (nvr > 0) in a single pass
+ *
+ * *contiguous tells whether vr[] are consecutive value references, like the
+ * blocks of states, inputs and outputs, whose values are copied with memcpy.
+ */
+static fmi2Boolean isAnyVROutOfRange(ModelInstance *comp, const char *f, const fmi2ValueReference vr[], size_t nvr,
+                                       fmi2Boolean *contiguous) {
+    size_t i;
+    fmi2ValueReference last = vr[0];
+    *contiguous = fmi2True;
+    for (i = 1; i < nvr; i++) {
+        if (vr[i] != vr[0] + i)
+            *contiguous = fmi2False;
+        if (vr[i] > last)
+            last = vr[i];
+    }
+    return isVROutOfRange(comp, f, last, NR);
+}
+
+static fmi2Boolean isInvalidNumber(ModelInstance *comp, const char *f, const char *arg, int n, int nExpected) {
+    if (n != nExpected) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "%s: Invalid argument %s = %d. Expected %d.", f, arg, n, nExpected)
+        return fmi2True;
+    }
+    return fmi2False;
+}
+
+static fmi2Status unsupportedFunction(fmi2Component c, const char *fName, int statesExpected) {
+    ModelInstance *comp = (ModelInstance *)c;
+    //fmi2CallbackLogger log = comp->functions->logger;`
+    if (isInvalidState(comp, fName, statesExpected))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, fName);
+    FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "%s: Function not implemented.", fName)
+    return fmi2Error;
+}
+
+void *allocateInstanceMemory(ModelInstance* comp, size_t nobj, size_t size) {
+    return comp->functions->allocateMemory(nobj, size);
+}
+
+void freeInstanceMemory(ModelInstance* comp, void *obj) {
+    comp->functions->freeMemory(obj);
+}
+
 ///////////////////////////////////////////////////////////////////////////////
 // FMI functions (common)
 ///////////////////////////////////////////////////////////////////////////////
 fmi2Component fmi2Instantiate(fmi2String instanceName, fmi2Type fmuType, fmi2String fmuGUID,
                             fmi2String fmuResourceLocation, const fmi2CallbackFunctions *functions,
                             fmi2Boolean visible, fmi2Boolean loggingOn) {
-    // Make a reference to the global instance
-    ModelInstance *comp = &instance;
+    ModelInstance *comp = NULL;
+    size_t size;
 
-    // Logger is required
+    // Logger and memory management functions are required
     if (!functions->logger) {
         return NULL;
     }
 
+    if (!functions->allocateMemory || !functions->freeMemory) {
+        functions->logger(functions->componentEnvironment, instanceName, fmi2Error, "error",
+                "fmi2Instantiate: Missing callback function.");
+        return NULL;
+    }
+
     // InstanceName is require
     if (!instanceName || strlen(instanceName) == 0) {
         functions->logger(functions->componentEnvironment, "?", fmi2Error, "error",
@@ -33,6 +170,21 @@ fmi2Component fmi2Instantiate(fmi2String instanceName, fmi2Type fmuType, fmi2Str
         return NULL;
     }
 
+    // Each instance owns its memory, so instances can be used concurrently.
+    // The value vector, the input derivatives and the solver workspace are
+    // allocated with the instance.
+    size = sizeof(ModelInstance) + (NR + NU) * sizeof(fmi2Real) + modelInfo.solverDataSize;
+    comp = (ModelInstance *)functions->allocateMemory(1, size);
+    if (!comp) {
+        functions->logger(functions->componentEnvironment, instanceName, fmi2Error, "error",
+                "fmi2Instantiate: Out of memory.");
+        return NULL;
+    }
+    memset(comp, 0, size);
+    comp->r = (fmi2Real *)(comp + 1);
+    comp->du = comp->r + NR;
+    comp->solverData = modelInfo.solverDataSize > 0 ? (void *)(comp->du + NU) : NULL;
+
     // Default 
     if (loggingOn){
         int i = 0;
@@ -42,7 +194,8 @@ fmi2Component fmi2Instantiate(fmi2String instanceName, fmi2Type fmuType, fmi2Str
     }
     
     comp->time = 0; // overwrite in fmi2SetupExperiment, fmi2SetTime
-    strcpy((char *)comp->instanceName, (char *)instanceName);
+    comp->tolerance = DEFAULT_TOLERANCE; // overwrite in fmi2SetupExperiment
+    strncpy((char *)comp->instanceName, (char *)instanceName, sizeof(comp->instanceName) - 1);
     comp->type = fmuType;
     comp->functions = functions;
     comp->componentEnvironment = functions->componentEnvironment;
@@ -50,14 +203,14 @@ fmi2Component fmi2Instantiate(fmi2String instanceName, fmi2Type fmuType, fmi2Str
     comp->state = modelInstantiated;
 
     // Reset x to x0, u to u0
-#if NX > 0
-    resetX(comp);
-    updateDerivatives(comp);
-#endif
-#if NU > 0
-    resetU(comp);
-    updateOutputs(comp);
-#endif     
+    if (NX > 0) {
+        resetX(comp);
+        updateDerivatives(comp);
+    }
+    if (NU > 0) {
+        resetU(comp);
+        updateOutputs(comp);
+    }
 
     // Log func call
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2Instantiate: GUID=%s", fmuGUID)
@@ -75,6 +228,9 @@ fmi2Status fmi2SetupExperiment(fmi2Component c, fmi2Boolean toleranceDefined, fm
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetupExperiment: toleranceDefined=%d tolerance=%g",
         toleranceDefined, tolerance)
     comp->time = startTime;
+    if (toleranceDefined && tolerance > 0) {
+        comp->tolerance = tolerance;
+    }
     return fmi2OK;
 }
 
@@ -97,18 +253,18 @@ fmi2Status fmi2ExitInitializationMode(fmi2Component c) {
     // if values were set and no fmi2GetXXX triggered update before,
     // ensure calculated values are updated now
     if (comp->isDirtyValues) {
-#if NX > 0
-        copyX0toX(comp);
-#endif
-#if NU > 0
-        copyU0toU(comp);
-#endif
-#if NX > 0
-        updateDerivatives(comp);
-#endif
-#if NY > 0
-        updateOutputs(comp);
-#endif
+        if (NX > 0) {
+            copyX0toX(comp);
+        }
+        if (NU > 0) {
+            copyU0toU(comp);
+        }
+        if (NX > 0) {
+            updateDerivatives(comp);
+        }
+        if (NY > 0) {
+            updateOutputs(comp);
+        }
         comp->isDirtyValues = fmi2False;
     }
 
@@ -137,12 +293,17 @@ fmi2Status fmi2Reset(fmi2Component c) {
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2Reset")
 
     comp->state = modelInstantiated;
-#if NX > 0
-    resetX(comp);
-#endif
-#if NU > 0
-    resetU(comp);
-#endif
+    comp->time = 0;
+    comp->hNext = 0;
+    comp->tolerance = DEFAULT_TOLERANCE;
+    if (NX > 0) {
+        resetX(comp);
+    }
+    if (NU > 0) {
+        resetU(comp);
+        memset(comp->du, 0, NU * sizeof(fmi2Real));
+        comp->hasInputDerivatives = fmi2False;
+    }
     comp->isDirtyValues = fmi2True; // because we just called setStartValues
     return fmi2OK;
 }
@@ -153,6 +314,7 @@ void fmi2FreeInstance(fmi2Component c) {
     if (isInvalidState(comp, "fmi2FreeInstance", MASK_fmi2FreeInstance))
         return;
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2FreeInstance")
+    comp->functions->freeMemory(comp);
 }
 
 
@@ -212,30 +374,43 @@ fmi2Status fmi2SetDebugLogging(fmi2Component c, fmi2Boolean loggingOn, size_t nC
 }
 
 fmi2Status fmi2GetReal(fmi2Component c, const fmi2ValueReference vr[], size_t nvr, fmi2Real value[]) {
-    int i;
+    size_t i;
+    fmi2Boolean contiguous;
     ModelInstance *comp = (ModelInstance *)c;
     
     if (isInvalidState(comp, "fmi2GetReal", MASK_fmi2GetReal))
         return fmi2Error;
 
-    if (nvr > 0 && isNullPtr(comp, "fmi2GetReal", "vr[]", vr))
+    if (nvr == 0)
+        return fmi2OK;
+
+    if (isNullPtr(comp, "fmi2GetReal", "vr[]", vr))
         return fmi2Error;
 
-    if (nvr > 0 && isNullPtr(comp, "fmi2GetReal", "value[]", value))
+    if (isNullPtr(comp, "fmi2GetReal", "value[]", value))
         return fmi2Error;
 
-    if (nvr > 0 && comp->isDirtyValues) {
+    if (isAnyVROutOfRange(comp, "fmi2GetReal", vr, nvr, &contiguous))
+        return fmi2Error;
+
+    if (comp->isDirtyValues) {
         evaluate(comp);
         comp->isDirtyValues = fmi2False;
     }
 
-    for (i = 0; i < nvr; i++) {
-        if (isVROutOfRange(comp, "fmi2GetReal", vr[i], NR))
-            return fmi2Error;
-        value[i] = comp->r[vr[i]];
-        FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetReal: #r%u# = %.16g", vr[i], value[i])
+    if (contiguous) {
+        memcpy(value, comp->r + vr[0], nvr * sizeof(fmi2Real));
+    } else {
+        for (i = 0; i < nvr; i++) {
+            value[i] = comp->r[vr[i]];
+        }
     }
 
+    if (comp->loggingOn) {
+        for (i = 0; i < nvr; i++) {
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetReal: #r%u# = %.16g", vr[i], value[i])
+        }
+    }
     return fmi2OK;
 }
 
@@ -288,25 +463,37 @@ fmi2Status fmi2GetString(fmi2Component c, const fmi2ValueReference vr[], size_t
 }
 
 fmi2Status fmi2SetReal(fmi2Component c, const fmi2ValueReference vr[], size_t nvr, const fmi2Real value[]) {
-    int i;
+    size_t i;
+    fmi2Boolean contiguous;
     ModelInstance *comp = (ModelInstance *)c;
     if (isInvalidState(comp, "fmi2SetReal", MASK_fmi2SetReal))
         return fmi2Error;
-    if (nvr > 0 && isNullPtr(comp, "fmi2SetReal", "vr[]", vr))
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetReal: nvr = %d", nvr)
+    if (nvr == 0)
+        return fmi2OK;
+    if (isNullPtr(comp, "fmi2SetReal", "vr[]", vr))
         return fmi2Error;
-    if (nvr > 0 && isNullPtr(comp, "fmi2SetReal", "value[]", value))
+    if (isNullPtr(comp, "fmi2SetReal", "value[]", value))
         return fmi2Error;
-    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetReal: nvr = %d", nvr)
 
-    for (i = 0; i < nvr; i++) {
-        if (isVROutOfRange(comp, "fmi2SetReal", vr[i], NR))
-            return fmi2Error;
-        FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetReal: #r%d# = %.16g", vr[i], value[i])
-        comp->r[vr[i]] = value[i];
+    // Nothing is set if any value reference is out of range
+    if (isAnyVROutOfRange(comp, "fmi2SetReal", vr, nvr, &contiguous))
+        return fmi2Error;
+
+    if (comp->loggingOn) {
+        for (i = 0; i < nvr; i++) {
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetReal: #r%d# = %.16g", vr[i], value[i])
+        }
     }
-    if (nvr > 0) {
-        comp->isDirtyValues = fmi2True;
+
+    if (contiguous) {
+        memcpy(comp->r + vr[0], value, nvr * sizeof(fmi2Real));
+    } else {
+        for (i = 0; i < nvr; i++) {
+            comp->r[vr[i]] = value[i];
+        }
     }
+    comp->isDirtyValues = fmi2True;
     return fmi2OK;
 }
 
@@ -364,30 +551,232 @@ fmi2Status fmi2SetString (fmi2Component c, const fmi2ValueReference vr[], size_t
     return fmi2OK;
 }
 
+// ---------------------------------------------------------------------------
+// FMI functions: FMU state snapshots
+// ---------------------------------------------------------------------------
+
+// A snapshot holds everything that changes while simulating: the value
+// vector r, the input derivatives du, the current time and the state machine.
+typedef struct {
+    ModelState state;
+    fmi2Boolean isDirtyValues;
+    fmi2Real time;
+    fmi2Real hNext;
+    fmi2Real r[];  // NR values followed by the NU input derivatives
+} ModelSnapshot;
+
+#define SNAPSHOT_SIZE (sizeof(ModelSnapshot) + (NR + NU) * sizeof(fmi2Real))
+
+// Serialized layout: magic, format version, NR, state, isDirtyValues, time,
+// [hNext,] r[0..NR-1], du[0..NU-1]. hNext is only stored for solvers with a
+// step size estimate. Only valid on the platform it was created on.
+static const char SERIALIZATION_MAGIC[4] = {'q', 'f', 'm', 'u'};
+#define SERIALIZATION_VERSION 2
+#define SERIALIZED_NREALS (NR + NU + (modelInfo.hasStepSize ? 2 : 1))
+#define SERIALIZED_SIZE (sizeof(SERIALIZATION_MAGIC) + 4 * sizeof(int) + SERIALIZED_NREALS * sizeof(fmi2Real))
+
+static fmi2Boolean anyNonzero(const fmi2Real *v, size_t n) {
+    size_t i;
+    for (i = 0; i < n; i++) {
+        if (v[i] != 0.0)
+            return fmi2True;
+    }
+    return fmi2False;
+}
+
+static void saveSnapshot(ModelInstance *comp, ModelSnapshot *snapshot) {
+    snapshot->state = comp->state;
+    snapshot->isDirtyValues = comp->isDirtyValues;
+    snapshot->time = comp->time;
+    snapshot->hNext = comp->hNext;
+    memcpy(snapshot->r, comp->r, NR * sizeof(fmi2Real));
+    memcpy(snapshot->r + NR, comp->du, NU * sizeof(fmi2Real));
+}
+
+static void loadSnapshot(ModelInstance *comp, const ModelSnapshot *snapshot) {
+    comp->state = snapshot->state;
+    comp->isDirtyValues = snapshot->isDirtyValues;
+    comp->time = snapshot->time;
+    comp->hNext = snapshot->hNext;
+    memcpy(comp->r, snapshot->r, NR * sizeof(fmi2Real));
+    memcpy(comp->du, snapshot->r + NR, NU * sizeof(fmi2Real));
+    comp->hasInputDerivatives = anyNonzero(comp->du, NU);
+}
+
 fmi2Status fmi2GetFMUstate (fmi2Component c, fmi2FMUstate* FMUstate) {
-    return unsupportedFunction(c, "fmi2GetFMUstate", MASK_fmi2GetFMUstate);
+    ModelInstance *comp = (ModelInstance *)c;
+    if (isInvalidState(comp, "fmi2GetFMUstate", MASK_fmi2GetFMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2GetFMUstate", "FMUstate", FMUstate))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetFMUstate")
+
+    // Reuse a previously returned snapshot if one is given
+    if (!*FMUstate) {
+        *FMUstate = comp->functions->allocateMemory(1, SNAPSHOT_SIZE);
+        if (!*FMUstate) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "fmi2GetFMUstate: Out of memory.")
+            return fmi2Error;
+        }
+    }
+    saveSnapshot(comp, (ModelSnapshot *)*FMUstate);
+    return fmi2OK;
 }
+
 fmi2Status fmi2SetFMUstate (fmi2Component c, fmi2FMUstate FMUstate) {
-    return unsupportedFunction(c, "fmi2SetFMUstate", MASK_fmi2SetFMUstate);
+    ModelInstance *comp = (ModelInstance *)c;
+    if (isInvalidState(comp, "fmi2SetFMUstate", MASK_fmi2SetFMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2SetFMUstate", "FMUstate", FMUstate))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetFMUstate")
+
+    loadSnapshot(comp, (const ModelSnapshot *)FMUstate);
+    return fmi2OK;
 }
+
 fmi2Status fmi2FreeFMUstate(fmi2Component c, fmi2FMUstate* FMUstate) {
-    return unsupportedFunction(c, "fmi2FreeFMUstate", MASK_fmi2FreeFMUstate);
+    ModelInstance *comp = (ModelInstance *)c;
+    if (isInvalidState(comp, "fmi2FreeFMUstate", MASK_fmi2FreeFMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2FreeFMUstate", "FMUstate", FMUstate))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2FreeFMUstate")
+
+    comp->functions->freeMemory(*FMUstate);
+    *FMUstate = NULL;
+    return fmi2OK;
 }
+
 fmi2Status fmi2SerializedFMUstateSize(fmi2Component c, fmi2FMUstate FMUstate, size_t *size) {
-    return unsupportedFunction(c, "fmi2SerializedFMUstateSize", MASK_fmi2SerializedFMUstateSize);
+    ModelInstance *comp = (ModelInstance *)c;
+    if (isInvalidState(comp, "fmi2SerializedFMUstateSize", MASK_fmi2SerializedFMUstateSize))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2SerializedFMUstateSize", "size", size))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SerializedFMUstateSize")
+
+    *size = SERIALIZED_SIZE;
+    return fmi2OK;
 }
+
 fmi2Status fmi2SerializeFMUstate (fmi2Component c, fmi2FMUstate FMUstate, fmi2Byte serializedState[], size_t size) {
-    return unsupportedFunction(c, "fmi2SerializeFMUstate", MASK_fmi2SerializeFMUstate);
+    const ModelSnapshot *snapshot = (const ModelSnapshot *)FMUstate;
+    ModelInstance *comp = (ModelInstance *)c;
+    int header[4] = {SERIALIZATION_VERSION, 0, 0, 0};
+    fmi2Byte *p = serializedState;
+    if (isInvalidState(comp, "fmi2SerializeFMUstate", MASK_fmi2SerializeFMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2SerializeFMUstate", "FMUstate", FMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2SerializeFMUstate", "serializedState", serializedState))
+        return fmi2Error;
+    if (isInvalidNumber(comp, "fmi2SerializeFMUstate", "size", (int)size, (int)SERIALIZED_SIZE))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SerializeFMUstate")
+
+    header[1] = NR;
+    header[2] = (int)snapshot->state;
+    header[3] = (int)snapshot->isDirtyValues;
+    memcpy(p, SERIALIZATION_MAGIC, sizeof(SERIALIZATION_MAGIC));
+    p += sizeof(SERIALIZATION_MAGIC);
+    memcpy(p, header, sizeof(header));
+    p += sizeof(header);
+    memcpy(p, &snapshot->time, sizeof(fmi2Real));
+    p += sizeof(fmi2Real);
+    if (modelInfo.hasStepSize) {
+        memcpy(p, &snapshot->hNext, sizeof(fmi2Real));
+        p += sizeof(fmi2Real);
+    }
+    memcpy(p, snapshot->r, (NR + NU) * sizeof(fmi2Real));
+    return fmi2OK;
 }
+
 fmi2Status fmi2DeSerializeFMUstate (fmi2Component c, const fmi2Byte serializedState[], size_t size,
                                     fmi2FMUstate* FMUstate) {
-    return unsupportedFunction(c, "fmi2DeSerializeFMUstate", MASK_fmi2DeSerializeFMUstate);
+    ModelSnapshot *snapshot = NULL;
+    ModelInstance *comp = (ModelInstance *)c;
+    int header[4];
+    const fmi2Byte *p = serializedState;
+    if (isInvalidState(comp, "fmi2DeSerializeFMUstate", MASK_fmi2DeSerializeFMUstate))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2DeSerializeFMUstate", "serializedState", serializedState))
+        return fmi2Error;
+    if (isNullPtr(comp, "fmi2DeSerializeFMUstate", "FMUstate", FMUstate))
+        return fmi2Error;
+    if (isInvalidNumber(comp, "fmi2DeSerializeFMUstate", "size", (int)size, (int)SERIALIZED_SIZE))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2DeSerializeFMUstate")
+
+    if (memcmp(p, SERIALIZATION_MAGIC, sizeof(SERIALIZATION_MAGIC)) != 0) {
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "fmi2DeSerializeFMUstate: Invalid serialized state.")
+        return fmi2Error;
+    }
+    p += sizeof(SERIALIZATION_MAGIC);
+    memcpy(header, p, sizeof(header));
+    p += sizeof(header);
+    if (header[0] != SERIALIZATION_VERSION || header[1] != NR) {
+        FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+            "fmi2DeSerializeFMUstate: Incompatible serialized state (version %d, NR = %d).", header[0], header[1])
+        return fmi2Error;
+    }
+
+    snapshot = (ModelSnapshot *)(*FMUstate);
+    if (!snapshot) {
+        snapshot = (ModelSnapshot *)comp->functions->allocateMemory(1, SNAPSHOT_SIZE);
+        if (!snapshot) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "fmi2DeSerializeFMUstate: Out of memory.")
+            return fmi2Error;
+        }
+    }
+    snapshot->state = (ModelState)header[2];
+    snapshot->isDirtyValues = (fmi2Boolean)header[3];
+    memcpy(&snapshot->time, p, sizeof(fmi2Real));
+    p += sizeof(fmi2Real);
+    if (modelInfo.hasStepSize) {
+        memcpy(&snapshot->hNext, p, sizeof(fmi2Real));
+        p += sizeof(fmi2Real);
+    } else {
+        snapshot->hNext = 0.0;
+    }
+    memcpy(snapshot->r, p, (NR + NU) * sizeof(fmi2Real));
+
+    *FMUstate = snapshot;
+    return fmi2OK;
 }
 
 fmi2Status fmi2GetDirectionalDerivative(fmi2Component c, const fmi2ValueReference vUnknown_ref[], size_t nUnknown,
                                         const fmi2ValueReference vKnown_ref[] , size_t nKnown,
                                         const fmi2Real dvKnown[], fmi2Real dvUnknown[]) {
-    return unsupportedFunction(c, "fmi2GetDirectionalDerivative", MASK_fmi2GetDirectionalDerivative);
+    size_t i, j;
+    ModelInstance *comp = (ModelInstance *)c;
+    if (isInvalidState(comp, "fmi2GetDirectionalDerivative", MASK_fmi2GetDirectionalDerivative))
+        return fmi2Error;
+    if (nUnknown > 0 && isNullPtr(comp, "fmi2GetDirectionalDerivative", "vUnknown_ref[]", vUnknown_ref))
+        return fmi2Error;
+    if (nUnknown > 0 && isNullPtr(comp, "fmi2GetDirectionalDerivative", "dvUnknown[]", dvUnknown))
+        return fmi2Error;
+    if (nKnown > 0 && isNullPtr(comp, "fmi2GetDirectionalDerivative", "vKnown_ref[]", vKnown_ref))
+        return fmi2Error;
+    if (nKnown > 0 && isNullPtr(comp, "fmi2GetDirectionalDerivative", "dvKnown[]", dvKnown))
+        return fmi2Error;
+    FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetDirectionalDerivative: nUnknown = %d, nKnown = %d", nUnknown, nKnown)
+
+    for (j = 0; j < nKnown; j++) {
+        if (isVROutOfRange(comp, "fmi2GetDirectionalDerivative", vKnown_ref[j], NR))
+            return fmi2Error;
+    }
+
+    // The system is linear, so the Jacobian is made of the entries of A, B, C, D
+    for (i = 0; i < nUnknown; i++) {
+        if (isVROutOfRange(comp, "fmi2GetDirectionalDerivative", vUnknown_ref[i], NR))
+            return fmi2Error;
+        dvUnknown[i] = 0.0;
+        for (j = 0; j < nKnown; j++) {
+            dvUnknown[i] += jacobianEntry(vUnknown_ref[i], vKnown_ref[j]) * dvKnown[j];
+        }
+    }
+    return fmi2OK;
 }
 
 // ---------------------------------------------------------------------------
@@ -396,27 +785,85 @@ fmi2Status fmi2GetDirectionalDerivative(fmi2Component c, const fmi2ValueReferenc
 /* Simulating the slave */
 fmi2Status fmi2SetRealInputDerivatives(fmi2Component c, const fmi2ValueReference vr[], size_t nvr,
                                      const fmi2Integer order[], const fmi2Real value[]) {
+    size_t i;
+    fmi2Status status = fmi2OK;
     ModelInstance *comp = (ModelInstance *)c;
     if (isInvalidState(comp, "fmi2SetRealInputDerivatives", MASK_fmi2SetRealInputDerivatives)) {
         return fmi2Error;
     }
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetRealInputDerivatives: nvr= %d", nvr)
-    FILTERED_LOG(comp, fmi2Error, LOG_ERROR, "fmi2SetRealInputDerivatives: ignoring function call."
-        " This model cannot interpolate inputs: canInterpolateInputs=\"fmi2False\"")
-    return fmi2Error;
+    if (nvr == 0)
+        return fmi2OK;
+    if (isNullPtr(comp, "fmi2SetRealInputDerivatives", "vr[]", vr)
+        || isNullPtr(comp, "fmi2SetRealInputDerivatives", "order[]", order)
+        || isNullPtr(comp, "fmi2SetRealInputDerivatives", "value[]", value))
+        return fmi2Error;
+
+    // Nothing is set if any value reference is not an input
+    for (i = 0; i < nvr; i++) {
+        if (vr[i] < VR_U || vr[i] >= VR_U + NU) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+                "fmi2SetRealInputDerivatives: #r%d# is not an input.", vr[i])
+            return fmi2Error;
+        }
+        if (order[i] < 1) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+                "fmi2SetRealInputDerivatives: invalid order %d of #r%d#.", order[i], vr[i])
+            return fmi2Error;
+        }
+    }
+
+    // The inputs are interpolated linearly, u(t + tau) = u + tau*du during
+    // the next communication steps, higher derivatives are ignored
+    for (i = 0; i < nvr; i++) {
+        if (order[i] == 1) {
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetRealInputDerivatives: #r%d# = %.16g", vr[i], value[i])
+            comp->du[vr[i] - VR_U] = value[i];
+        } else {
+            FILTERED_LOG(comp, fmi2Warning, LOG_ALL,
+                "fmi2SetRealInputDerivatives: ignoring derivative of order %d of #r%d#.", order[i], vr[i])
+            status = fmi2Warning;
+        }
+    }
+    comp->hasInputDerivatives = anyNonzero(comp->du, NU);
+    return status;
 }
 
 fmi2Status fmi2GetRealOutputDerivatives(fmi2Component c, const fmi2ValueReference vr[], size_t nvr,
                                       const fmi2Integer order[], fmi2Real value[]) {
-    int i;
+    size_t i;
     ModelInstance *comp = (ModelInstance *)c;
     if (isInvalidState(comp, "fmi2GetRealOutputDerivatives", MASK_fmi2GetRealOutputDerivatives))
         return fmi2Error;
     FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetRealOutputDerivatives: nvr= %d", nvr)
-    FILTERED_LOG(comp, fmi2Error, LOG_ERROR,"fmi2GetRealOutputDerivatives: ignoring function call."
-        " This model cannot compute derivatives of outputs: MaxOutputDerivativeOrder=\"0\"")
-    for (i = 0; i < nvr; i++) value[i] = 0;
-    return fmi2Error;
+    if (nvr == 0)
+        return fmi2OK;
+    if (isNullPtr(comp, "fmi2GetRealOutputDerivatives", "vr[]", vr)
+        || isNullPtr(comp, "fmi2GetRealOutputDerivatives", "order[]", order)
+        || isNullPtr(comp, "fmi2GetRealOutputDerivatives", "value[]", value))
+        return fmi2Error;
+
+    for (i = 0; i < nvr; i++) {
+        if (vr[i] < VR_Y || vr[i] >= NR) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+                "fmi2GetRealOutputDerivatives: #r%d# is not an output.", vr[i])
+            return fmi2Error;
+        }
+        // The outputs are linear in x and u, their second derivatives would
+        // need the derivatives of du
+        if (order[i] != 1) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+                "fmi2GetRealOutputDerivatives: order %d of #r%d# is not supported, maxOutputDerivativeOrder=\"1\".", order[i], vr[i])
+            return fmi2Error;
+        }
+    }
+
+    // dy = C*dx + D*du at the current state and inputs
+    updateDerivatives(comp);
+    for (i = 0; i < nvr; i++) {
+        value[i] = outputDerivative(comp, (int)(vr[i] - VR_Y));
+    }
+    return fmi2OK;
 }
 
 fmi2Status fmi2CancelStep(fmi2Component c) {
@@ -452,13 +899,22 @@ fmi2Status fmi2DoStep(fmi2Component c, fmi2Real currentCommunicationPoint,
         return fmi2Error;
     }
 
-    // break the step into n steps and do forward Euler.
     comp->time = currentCommunicationPoint;
+    if (NX > 0) {
+        updateDerivatives(comp);
+        if (updateStates(comp, communicationStepSize) != fmi2OK) {
+            FILTERED_LOG(comp, fmi2Error, LOG_ERROR,
+                "fmi2DoStep: failed to update states at t = %g.", currentCommunicationPoint)
+            comp->state = modelError;
+            return fmi2Error;
+        }
+    }
     comp->time += communicationStepSize;
-#if NX > 0
-    updateDerivatives(comp);
-    updateStates(comp, communicationStepSize);
-#endif
+
+    // Interpolated inputs reach u + h*du at the end of the step
+    if (comp->hasInputDerivatives) {
+        advanceInputs(comp, communicationStepSize);
+    }
 
     // Update outputs based on new state values
     updateOutputs(comp);
@@ -594,17 +1050,17 @@ fmi2Status fmi2SetContinuousStates(fmi2Component c, const fmi2Real x[], size_t n
         return fmi2Error;
     if (isNullPtr(comp, "fmi2SetContinuousStates", "x[]", x))
         return fmi2Error;
-#if NX > 0
-    for (i = 0; i < nx; i++) {
-        fmi2ValueReference vr = vrs_x[i];
-        FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetContinuousStates: #r%d#=%.16g", vr, x[i])
-        assert(vr < NR);
-        comp->r[vr] = x[i];
+    if (NX > 0) {
+        for (i = 0; i < nx; i++) {
+            fmi2ValueReference vr = VR_X + i;
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2SetContinuousStates: #r%d#=%.16g", vr, x[i])
+            assert(vr < NR);
+            comp->r[vr] = x[i];
+        }
+    }
+    if (NY > 0) {
+        updateOutputs(comp);
     }
-#endif
-#if NY > 0
-    updateOutputs(comp);
-#endif
     return fmi2OK;
 }
 
@@ -618,14 +1074,14 @@ fmi2Status fmi2GetDerivatives(fmi2Component c, fmi2Real derivatives[], size_t nx
         return fmi2Error;
     if (isNullPtr(comp, "fmi2GetDerivatives", "derivatives[]", derivatives))
         return fmi2Error;
-#if NX > 0
-    updateDerivatives(comp);
-    for (i = 0; i < NX; ++i){
-        fmi2ValueReference der_i = vrs_der[i];
-        derivatives[i] = comp->r[der_i];
-        FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetDerivatives: #r%d# = %.16g", der_i, derivatives[i])
+    if (NX > 0) {
+        updateDerivatives(comp);
+        for (i = 0; i < NX; ++i){
+            fmi2ValueReference der_i = VR_DER + i;
+            derivatives[i] = comp->r[der_i];
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetDerivatives: #r%d# = %.16g", der_i, derivatives[i])
+        }
     }
-#endif
     return fmi2OK;
 }
 
@@ -648,13 +1104,13 @@ fmi2Status fmi2GetContinuousStates(fmi2Component c, fmi2Real states[], size_t nx
         return fmi2Error;
     if (isNullPtr(comp, "fmi2GetContinuousStates", "states[]", states))
         return fmi2Error;
-#if NX>0
-    for (i = 0; i < nx; i++) {
-        fmi2ValueReference vr = vrs_x[i];
-        states[i] = comp->r[vr]; // to be implemented by the includer of this file
-        FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetContinuousStates: #r%u# = %.16g", vr, states[i])
+    if (NX > 0) {
+        for (i = 0; i < nx; i++) {
+            fmi2ValueReference vr = VR_X + i;
+            states[i] = comp->r[vr]; // to be implemented by the includer of this file
+            FILTERED_LOG(comp, fmi2OK, LOG_FMI_CALL, "fmi2GetContinuousStates: #r%u# = %.16g", vr, states[i])
+        }
     }
-#endif
     return fmi2OK;
 }
 
@@ -671,4 +1127,8 @@ fmi2Status fmi2GetNominalsOfContinuousStates(fmi2Component c, fmi2Real x_nominal
     for (i = 0; i < nx; i++)
         x_nominal[i] = 1;
     return fmi2OK;
-}
\ No newline at end of file
+}
+
+#ifdef __cplusplus
+} // closing brace for extern "C"
+#endif
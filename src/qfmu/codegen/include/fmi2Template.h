@@ -110,6 +110,65 @@ typedef enum {
 #define MASK_fmi2GetBooleanStatus        MASK_fmi2GetStatus
 #define MASK_fmi2GetStringStatus         MASK_fmi2GetStatus
 
+// ---------------------------------------------------------------------------
+// Interface between the FMI runtime (fmi2Template.c), which is compiled once
+// per compiler profile, and the generated model code (fmi2model.c)
+// ---------------------------------------------------------------------------
+typedef struct {
+    ModelState state;
+    fmi2Real *r;  // value vector, indexed by value reference
+    fmi2Real time;
+    fmi2Char instanceName[256]; // TODO: change 256 by a max_str_len parameter from user argv
+    fmi2Type type;
+    fmi2String GUID;
+    const fmi2CallbackFunctions *functions;
+    fmi2Boolean loggingOn;
+    fmi2Boolean logCategories[NUMBER_OF_CATEGORIES];
+    fmi2ComponentEnvironment componentEnvironment;
+    fmi2Boolean isDirtyValues;
+    fmi2Real tolerance;
+    fmi2Real hNext;  // step size estimate of adaptive solvers
+    fmi2Real *du;  // first derivatives of the inputs, see fmi2SetRealInputDerivatives
+    fmi2Boolean hasInputDerivatives;  // whether any of du is nonzero
+    void *solverData;  // solver workspace of modelInfo.solverDataSize bytes
+} ModelInstance;
+
+typedef struct {
+    const char *guid;
+    int nr;
+    int nx;
+    int nu;
+    int ny;
+    // First value reference of the states and of the state derivatives
+    fmi2ValueReference vrX;
+    fmi2ValueReference vrDer;
+    size_t solverDataSize;
+    // Whether hNext is part of the FMU state
+    fmi2Boolean hasStepSize;
+    // First value reference of the inputs and of the outputs
+    fmi2ValueReference vrU;
+    fmi2ValueReference vrY;
+} ModelInfo;
+
+// Defined by the generated model code
+extern const ModelInfo modelInfo;
+
+void resetX(ModelInstance* comp);
+void copyX0toX(ModelInstance* comp);
+void resetU(ModelInstance* comp);
+void copyU0toU(ModelInstance* comp);
+void updateDerivatives(ModelInstance* comp);
+void updateOutputs(ModelInstance* comp);
+fmi2Status updateStates(ModelInstance* comp, fmi2Real h);
+void advanceInputs(ModelInstance* comp, fmi2Real h);
+fmi2Real outputDerivative(ModelInstance* comp, int i);
+void evaluate(ModelInstance* comp);
+fmi2Real jacobianEntry(fmi2ValueReference unknown, fmi2ValueReference known);
+
+// Defined by the runtime, zero-initialized memory for the model code
+void *allocateInstanceMemory(ModelInstance* comp, size_t nobj, size_t size);
+void freeInstanceMemory(ModelInstance* comp, void *obj);
+
 #ifdef __cplusplus
 } // closing brace for extern "C"
 #endif
\ No newline at end of file
@@ -0,0 +1,1202 @@
+///////////////////////////////////////////////////////////////////////////////
+// FMI 3 runtime
+//
+// Independent of the model, this file is compiled once per compiler profile
+// and linked with the generated model code, which defines modelInfo and the
+// model functions declared in fmi3Template.h.
+//
+// The states, derivatives, inputs, outputs and system matrices are exposed as
+// array variables, so that an importer reads or writes each of them with a
+// single call and a single memcpy.
+///////////////////////////////////////////////////////////////////////////////
+
+#include <stdarg.h>
+#include "fmi3Template.h"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define MODEL_GUID (modelInfo.guid)
+#define NR (modelInfo.nr)
+#define NX (modelInfo.nx)
+#define NU (modelInfo.nu)
+#define NY (modelInfo.ny)
+#define VR_X (modelInfo.vrX)
+#define VR_DER (modelInfo.vrDer)
+
+#define DEFAULT_TOLERANCE 1e-4
+#define MAX_MESSAGE_SIZE 1024
+
+// Value references of the variables in fmi3modelDescription.jinja
+enum {
+    VAR_TIME = 0,
+    VAR_X,
+    VAR_DER,
+    VAR_X0,
+    VAR_U,
+    VAR_U0,
+    VAR_Y,
+    VAR_A,
+    VAR_B,
+    VAR_C,
+    VAR_D,
+};
+
+// macro to be used to log messages. The macro check if current
+// log category is valid and, if true, call the logger provided by simulator.
+// Errors are always logged. Define DISABLE_CALL_LOGGING to strip all other
+// messages at compile time, otherwise they cost one test of loggingOn.
+#ifdef DISABLE_CALL_LOGGING
+#define IS_LOGGED(instance, status, categoryIndex) (status == fmi3Error || status == fmi3Fatal)
+#else
+#define IS_LOGGED(instance, status, categoryIndex) (status == fmi3Error || status == fmi3Fatal \
+        || (instance->loggingOn && isCategoryLogged(instance, categoryIndex)))
+#endif
+#define FILTERED_LOG(instance, status, categoryIndex, message, ...) if (IS_LOGGED(instance, status, categoryIndex)) \
+        logFormatted(instance, status, categoryIndex, message, ##__VA_ARGS__);
+
+static const fmi3String logCategoriesNames[] = {"logAll", "logError", "logFmiCall", "logEvent"};
+
+///////////////////////////////////////////////////////////////////////////////
+// Private functions
+///////////////////////////////////////////////////////////////////////////////
+#ifndef DISABLE_CALL_LOGGING
+static fmi3Boolean isCategoryLogged(ModelInstance *comp, int categoryIndex) {
+    if (categoryIndex < NUMBER_OF_CATEGORIES
+        && (comp->logCategories[categoryIndex] || comp->logCategories[LOG_ALL])) {
+        return fmi3True;
+    }
+    return fmi3False;
+}
+#endif
+
+// The FMI 3 logger takes a complete message, format it here
+static void logFormatted(ModelInstance *comp, fmi3Status status, int categoryIndex, const char *message, ...) {
+    char buffer[MAX_MESSAGE_SIZE];
+    va_list args;
+    if (!comp->logMessage)
+        return;
+    va_start(args, message);
+    vsnprintf(buffer, sizeof(buffer), message, args);
+    va_end(args);
+    comp->logMessage(comp->instanceEnvironment, status, logCategoriesNames[categoryIndex], buffer);
+}
+
+static fmi3Boolean isInvalidState(ModelInstance *comp, const char *f, int statesExpected) {
+    if (!comp)
+        return fmi3True;
+    if (!(comp->state & statesExpected)) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Illegal call sequence.", f)
+        return fmi3True;
+    }
+    return fmi3False;
+}
+
+static fmi3Boolean isNullPtr(ModelInstance* comp, const char *f, const char *arg, const void *p) {
+    if (!p) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Invalid argument %s = NULL.", f, arg)
+        return fmi3True;
+    }
+    return fmi3False;
+}
+
+static fmi3Boolean isInvalidNumber(ModelInstance *comp, const char *f, const char *arg, size_t n, size_t nExpected) {
+    if (n != nExpected) {
+        comp->state = modelError;
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Invalid argument %s = %zu. Expected %zu.", f, arg, n, nExpected)
+        return fmi3True;
+    }
+    return fmi3False;
+}
+
+static fmi3Status unsupportedFunction(fmi3Instance instance, const char *fName) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, fName, MASK_fmi3Unsupported))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, fName)
+    FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Function not implemented.", fName)
+    return fmi3Error;
+}
+
+// All variables are Float64, accessors of other types only accept empty calls
+static fmi3Status noVariables(fmi3Instance instance, const char *f, int statesExpected, size_t nValueReferences) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, f, statesExpected))
+        return fmi3Error;
+    if (nValueReferences != 0) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: The model has no variables of this type.", f)
+        comp->state = modelError;
+        return fmi3Error;
+    }
+    return fmi3OK;
+}
+
+/**
+ * \brief Values of the variable `vr` and their number
+ *
+ * Returns NULL for unknown value references and for the system matrices,
+ * which are not stored in r, see matrixBlock.
+ */
+static const fmi3Float64 *variableValues(ModelInstance *comp, fmi3ValueReference vr, size_t *n) {
+    switch (vr) {
+        case VAR_TIME: *n = 1; return &comp->time;
+        case VAR_X: *n = NX; return comp->r + VR_X;
+        case VAR_DER: *n = NX; return comp->r + VR_DER;
+        case VAR_X0: *n = NX; return comp->r + modelInfo.vrX0;
+        case VAR_U: *n = NU; return comp->r + modelInfo.vrU;
+        case VAR_U0: *n = NU; return comp->r + modelInfo.vrU0;
+        case VAR_Y: *n = NY; return comp->r + modelInfo.vrY;
+        default: *n = 0; return NULL;
+    }
+}
+
+/**
+ * \brief Block of the Jacobian that is the system matrix `vr`
+ *
+ * The rows of A, B, C and D are the state derivatives or the outputs, their
+ * columns the states or the inputs. The matrices are read with jacobianEntry,
+ * so that they are exposed the same way whatever their storage in the model
+ * code: dense, CSR, band or unrolled. Returns fmi3False for other variables.
+ */
+static fmi3Boolean matrixBlock(fmi3ValueReference vr, fmi3ValueReference *row0, size_t *nRows,
+                               fmi3ValueReference *col0, size_t *nCols) {
+    switch (vr) {
+        case VAR_A: *row0 = VR_DER; *nRows = NX; *col0 = VR_X; *nCols = NX; return fmi3True;
+        case VAR_B: *row0 = VR_DER; *nRows = NX; *col0 = modelInfo.vrU; *nCols = NU; return fmi3True;
+        case VAR_C: *row0 = modelInfo.vrY; *nRows = NY; *col0 = VR_X; *nCols = NX; return fmi3True;
+        case VAR_D: *row0 = modelInfo.vrY; *nRows = NY; *col0 = modelInfo.vrU; *nCols = NU; return fmi3True;
+        default: return fmi3False;
+    }
+}
+
+// Writes the system matrix in row-major order
+static void getMatrix(fmi3ValueReference row0, size_t nRows, fmi3ValueReference col0, size_t nCols,
+                      fmi3Float64 values[]) {
+    size_t i, j;
+    for (i = 0; i < nRows; i++) {
+        for (j = 0; j < nCols; j++) {
+            values[i * nCols + j] = jacobianEntry((fmi3ValueReference)(row0 + i), (fmi3ValueReference)(col0 + j));
+        }
+    }
+}
+
+static fmi3Boolean isUnknownVariable(ModelInstance *comp, const char *f, fmi3ValueReference vr, const void *values) {
+    if (!values) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Illegal value reference %u.", f, vr)
+        comp->state = modelError;
+        return fmi3True;
+    }
+    return fmi3False;
+}
+
+static fmi3Boolean isTooFewValues(ModelInstance *comp, const char *f, size_t n, size_t nValues) {
+    if (n > nValues) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Expected more than nValues = %zu values.", f, nValues)
+        comp->state = modelError;
+        return fmi3True;
+    }
+    return fmi3False;
+}
+
+// Only the start values and the inputs can be set, all other variables are
+// calculated or constant
+static fmi3Boolean isSettable(fmi3ValueReference vr) {
+    return vr == VAR_X0 || vr == VAR_U || vr == VAR_U0;
+}
+
+static ModelInstance *instantiate(const char *f, InterfaceType type, fmi3String instanceName,
+                                  fmi3String instantiationToken, fmi3Boolean loggingOn,
+                                  fmi3InstanceEnvironment instanceEnvironment,
+                                  fmi3LogMessageCallback logMessage) {
+    ModelInstance *comp = NULL;
+    char message[MAX_MESSAGE_SIZE];
+    size_t size;
+
+    // InstanceName is required
+    if (!instanceName || strlen(instanceName) == 0) {
+        if (logMessage) {
+            snprintf(message, sizeof(message), "%s: Missing instance name.", f);
+            logMessage(instanceEnvironment, fmi3Error, "logError", message);
+        }
+        return NULL;
+    }
+
+    // Compare the instantiation token
+    if (!instantiationToken || strcmp(instantiationToken, MODEL_GUID)) {
+        if (logMessage) {
+            snprintf(message, sizeof(message), "%s: Wrong instantiation token %s. Expected %s.",
+                f, instantiationToken ? instantiationToken : "NULL", MODEL_GUID);
+            logMessage(instanceEnvironment, fmi3Error, "logError", message);
+        }
+        return NULL;
+    }
+
+    // Each instance owns its memory, so instances can be used concurrently.
+    // The value vector and the solver workspace are allocated with the instance.
+    size = sizeof(ModelInstance) + NR * sizeof(fmi3Float64) + modelInfo.solverDataSize;
+    comp = (ModelInstance *)calloc(1, size);
+    if (!comp) {
+        if (logMessage) {
+            snprintf(message, sizeof(message), "%s: Out of memory.", f);
+            logMessage(instanceEnvironment, fmi3Error, "logError", message);
+        }
+        return NULL;
+    }
+    comp->r = (fmi3Float64 *)(comp + 1);
+    comp->solverData = modelInfo.solverDataSize > 0 ? (void *)(comp->r + NR) : NULL;
+
+    if (loggingOn) {
+        int i = 0;
+        for (i = 0; i < NUMBER_OF_CATEGORIES; i++) {
+            comp->logCategories[i] = loggingOn;
+        }
+    }
+
+    comp->time = 0; // overwrite in fmi3EnterInitializationMode, fmi3SetTime
+    comp->tolerance = DEFAULT_TOLERANCE; // overwrite in fmi3EnterInitializationMode
+    strncpy((char *)comp->instanceName, (char *)instanceName, sizeof(comp->instanceName) - 1);
+    comp->type = type;
+    comp->instanceEnvironment = instanceEnvironment;
+    comp->logMessage = logMessage;
+    comp->loggingOn = loggingOn;
+    comp->state = modelInstantiated;
+
+    // Reset x to x0, u to u0
+    if (NX > 0) {
+        resetX(comp);
+        updateDerivatives(comp);
+    }
+    if (NU > 0) {
+        resetU(comp);
+        updateOutputs(comp);
+    }
+
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "%s: instantiationToken=%s", f, instantiationToken)
+    return comp;
+}
+
+void *allocateInstanceMemory(ModelInstance* comp, size_t nobj, size_t size) {
+    return calloc(nobj, size);
+}
+
+void freeInstanceMemory(ModelInstance* comp, void *obj) {
+    free(obj);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: inquire version numbers and set debug logging
+///////////////////////////////////////////////////////////////////////////////
+const char* fmi3GetVersion(void) {
+    return fmi3Version;
+}
+
+fmi3Status fmi3SetDebugLogging(fmi3Instance instance, fmi3Boolean loggingOn, size_t nCategories,
+                               const fmi3String categories[]) {
+    size_t i;
+    int j;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SetDebugLogging", MASK_fmi3SetDebugLogging))
+        return fmi3Error;
+    comp->loggingOn = loggingOn;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetDebugLogging")
+
+    // reset all categories
+    for (j = 0; j < NUMBER_OF_CATEGORIES; j++) {
+        comp->logCategories[j] = fmi3False;
+    }
+
+    if (nCategories == 0) {
+        // no category specified, set all categories to have loggingOn value
+        for (j = 0; j < NUMBER_OF_CATEGORIES; j++) {
+            comp->logCategories[j] = loggingOn;
+        }
+    } else {
+        // set specific categories on
+        for (i = 0; i < nCategories; i++) {
+            fmi3Boolean categoryFound = fmi3False;
+            for (j = 0; j < NUMBER_OF_CATEGORIES; j++) {
+                if (strcmp(logCategoriesNames[j], categories[i]) == 0) {
+                    comp->logCategories[j] = loggingOn;
+                    categoryFound = fmi3True;
+                    break;
+                }
+            }
+            if (!categoryFound) {
+                logFormatted(comp, fmi3Warning, LOG_ERROR,
+                    "logging category '%s' is not supported by model", categories[i]);
+            }
+        }
+    }
+    return fmi3OK;
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: creation and destruction of instances
+///////////////////////////////////////////////////////////////////////////////
+fmi3Instance fmi3InstantiateModelExchange(fmi3String instanceName, fmi3String instantiationToken,
+                                          fmi3String resourcePath, fmi3Boolean visible,
+                                          fmi3Boolean loggingOn,
+                                          fmi3InstanceEnvironment instanceEnvironment,
+                                          fmi3LogMessageCallback logMessage) {
+    return instantiate("fmi3InstantiateModelExchange", modelExchange, instanceName,
+                       instantiationToken, loggingOn, instanceEnvironment, logMessage);
+}
+
+fmi3Instance fmi3InstantiateCoSimulation(fmi3String instanceName, fmi3String instantiationToken,
+                                         fmi3String resourcePath, fmi3Boolean visible,
+                                         fmi3Boolean loggingOn, fmi3Boolean eventModeUsed,
+                                         fmi3Boolean earlyReturnAllowed,
+                                         const fmi3ValueReference requiredIntermediateVariables[],
+                                         size_t nRequiredIntermediateVariables,
+                                         fmi3InstanceEnvironment instanceEnvironment,
+                                         fmi3LogMessageCallback logMessage,
+                                         fmi3IntermediateUpdateCallback intermediateUpdate) {
+    return instantiate("fmi3InstantiateCoSimulation", coSimulation, instanceName,
+                       instantiationToken, loggingOn, instanceEnvironment, logMessage);
+}
+
+fmi3Instance fmi3InstantiateScheduledExecution(fmi3String instanceName, fmi3String instantiationToken,
+                                               fmi3String resourcePath, fmi3Boolean visible,
+                                               fmi3Boolean loggingOn,
+                                               fmi3InstanceEnvironment instanceEnvironment,
+                                               fmi3LogMessageCallback logMessage,
+                                               fmi3ClockUpdateCallback clockUpdate,
+                                               fmi3LockPreemptionCallback lockPreemption,
+                                               fmi3UnlockPreemptionCallback unlockPreemption) {
+    if (logMessage) {
+        logMessage(instanceEnvironment, fmi3Error, "logError",
+            "fmi3InstantiateScheduledExecution: Scheduled Execution is not supported.");
+    }
+    return NULL;
+}
+
+void fmi3FreeInstance(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (!comp) return;
+    if (isInvalidState(comp, "fmi3FreeInstance", MASK_fmi3FreeInstance))
+        return;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3FreeInstance")
+    free(comp);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: enter and exit initialization mode, terminate and reset
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3EnterInitializationMode(fmi3Instance instance, fmi3Boolean toleranceDefined,
+                                       fmi3Float64 tolerance, fmi3Float64 startTime,
+                                       fmi3Boolean stopTimeDefined, fmi3Float64 stopTime) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3EnterInitializationMode", MASK_fmi3EnterInitializationMode))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3EnterInitializationMode: toleranceDefined=%d tolerance=%g",
+        toleranceDefined, tolerance)
+
+    comp->time = startTime;
+    if (toleranceDefined && tolerance > 0) {
+        comp->tolerance = tolerance;
+    }
+    comp->state = modelInitializationMode;
+    return fmi3OK;
+}
+
+fmi3Status fmi3ExitInitializationMode(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3ExitInitializationMode", MASK_fmi3ExitInitializationMode))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3ExitInitializationMode")
+
+    // if values were set and no fmi3GetXXX triggered update before,
+    // ensure calculated values are updated now
+    if (comp->isDirtyValues) {
+        if (NX > 0) {
+            copyX0toX(comp);
+        }
+        if (NU > 0) {
+            copyU0toU(comp);
+        }
+        if (NX > 0) {
+            updateDerivatives(comp);
+        }
+        if (NY > 0) {
+            updateOutputs(comp);
+        }
+        comp->isDirtyValues = fmi3False;
+    }
+
+    if (comp->type == modelExchange) {
+        comp->state = modelEventMode;
+    } else {
+        comp->state = modelStepMode;
+    }
+    return fmi3OK;
+}
+
+fmi3Status fmi3EnterEventMode(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3EnterEventMode", MASK_fmi3EnterEventMode))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3EnterEventMode")
+
+    comp->state = modelEventMode;
+    return fmi3OK;
+}
+
+fmi3Status fmi3Terminate(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3Terminate", MASK_fmi3Terminate))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3Terminate")
+
+    comp->state = modelTerminated;
+    return fmi3OK;
+}
+
+fmi3Status fmi3Reset(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3Reset", MASK_fmi3Reset))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3Reset")
+
+    comp->state = modelInstantiated;
+    comp->time = 0;
+    comp->hNext = 0;
+    comp->tolerance = DEFAULT_TOLERANCE;
+    if (NX > 0) {
+        resetX(comp);
+    }
+    if (NU > 0) {
+        resetU(comp);
+    }
+    comp->isDirtyValues = fmi3True; // because we just called setStartValues
+    return fmi3OK;
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: getting and setting variable values
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3GetFloat64(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                          size_t nValueReferences, fmi3Float64 values[], size_t nValues) {
+    size_t i, n, nRows, nCols, index = 0;
+    fmi3ValueReference row0, col0;
+    const fmi3Float64 *v;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetFloat64", MASK_fmi3GetValues))
+        return fmi3Error;
+    if (nValueReferences > 0 && isNullPtr(comp, "fmi3GetFloat64", "valueReferences[]", valueReferences))
+        return fmi3Error;
+    if (nValues > 0 && isNullPtr(comp, "fmi3GetFloat64", "values[]", values))
+        return fmi3Error;
+
+    if (nValueReferences > 0 && comp->isDirtyValues) {
+        evaluate(comp);
+        comp->isDirtyValues = fmi3False;
+    }
+
+    for (i = 0; i < nValueReferences; i++) {
+        if (matrixBlock(valueReferences[i], &row0, &nRows, &col0, &nCols)) {
+            n = nRows * nCols;
+            if (isTooFewValues(comp, "fmi3GetFloat64", index + n, nValues))
+                return fmi3Error;
+            getMatrix(row0, nRows, col0, nCols, values + index);
+            FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetFloat64: #r%u# (%zu values)", valueReferences[i], n)
+            index += n;
+            continue;
+        }
+        v = variableValues(comp, valueReferences[i], &n);
+        if (isUnknownVariable(comp, "fmi3GetFloat64", valueReferences[i], v))
+            return fmi3Error;
+        if (isTooFewValues(comp, "fmi3GetFloat64", index + n, nValues))
+            return fmi3Error;
+        memcpy(values + index, v, n * sizeof(fmi3Float64));
+        FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetFloat64: #r%u# (%zu values)", valueReferences[i], n)
+        index += n;
+    }
+    if (isInvalidNumber(comp, "fmi3GetFloat64", "nValues", nValues, index))
+        return fmi3Error;
+    return fmi3OK;
+}
+
+fmi3Status fmi3SetFloat64(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                          size_t nValueReferences, const fmi3Float64 values[], size_t nValues) {
+    size_t i, n, index = 0;
+    const fmi3Float64 *v;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SetFloat64", MASK_fmi3SetValues))
+        return fmi3Error;
+    if (nValueReferences > 0 && isNullPtr(comp, "fmi3SetFloat64", "valueReferences[]", valueReferences))
+        return fmi3Error;
+    if (nValues > 0 && isNullPtr(comp, "fmi3SetFloat64", "values[]", values))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetFloat64: nValueReferences = %zu", nValueReferences)
+
+    for (i = 0; i < nValueReferences; i++) {
+        v = variableValues(comp, valueReferences[i], &n);
+        if (isUnknownVariable(comp, "fmi3SetFloat64", valueReferences[i], isSettable(valueReferences[i]) ? v : NULL))
+            return fmi3Error;
+        if (isTooFewValues(comp, "fmi3SetFloat64", index + n, nValues))
+            return fmi3Error;
+        // Settable variables are stored in r
+        memcpy((fmi3Float64 *)v, values + index, n * sizeof(fmi3Float64));
+        FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetFloat64: #r%u# (%zu values)", valueReferences[i], n)
+        index += n;
+    }
+    if (isInvalidNumber(comp, "fmi3SetFloat64", "nValues", nValues, index))
+        return fmi3Error;
+    if (nValueReferences > 0) {
+        comp->isDirtyValues = fmi3True;
+    }
+    return fmi3OK;
+}
+
+#define NO_GETTER(name, type) \
+fmi3Status name(fmi3Instance instance, const fmi3ValueReference valueReferences[], \
+                size_t nValueReferences, type values[], size_t nValues) { \
+    return noVariables(instance, #name, MASK_fmi3GetValues, nValueReferences); \
+}
+
+#define NO_SETTER(name, type) \
+fmi3Status name(fmi3Instance instance, const fmi3ValueReference valueReferences[], \
+                size_t nValueReferences, const type values[], size_t nValues) { \
+    return noVariables(instance, #name, MASK_fmi3SetValues, nValueReferences); \
+}
+
+NO_GETTER(fmi3GetFloat32, fmi3Float32)
+NO_GETTER(fmi3GetInt8, fmi3Int8)
+NO_GETTER(fmi3GetUInt8, fmi3UInt8)
+NO_GETTER(fmi3GetInt16, fmi3Int16)
+NO_GETTER(fmi3GetUInt16, fmi3UInt16)
+NO_GETTER(fmi3GetInt32, fmi3Int32)
+NO_GETTER(fmi3GetUInt32, fmi3UInt32)
+NO_GETTER(fmi3GetInt64, fmi3Int64)
+NO_GETTER(fmi3GetUInt64, fmi3UInt64)
+NO_GETTER(fmi3GetBoolean, fmi3Boolean)
+NO_GETTER(fmi3GetString, fmi3String)
+
+NO_SETTER(fmi3SetFloat32, fmi3Float32)
+NO_SETTER(fmi3SetInt8, fmi3Int8)
+NO_SETTER(fmi3SetUInt8, fmi3UInt8)
+NO_SETTER(fmi3SetInt16, fmi3Int16)
+NO_SETTER(fmi3SetUInt16, fmi3UInt16)
+NO_SETTER(fmi3SetInt32, fmi3Int32)
+NO_SETTER(fmi3SetUInt32, fmi3UInt32)
+NO_SETTER(fmi3SetInt64, fmi3Int64)
+NO_SETTER(fmi3SetUInt64, fmi3UInt64)
+NO_SETTER(fmi3SetBoolean, fmi3Boolean)
+NO_SETTER(fmi3SetString, fmi3String)
+
+fmi3Status fmi3GetBinary(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                         size_t nValueReferences, size_t valueSizes[], fmi3Binary values[],
+                         size_t nValues) {
+    return noVariables(instance, "fmi3GetBinary", MASK_fmi3GetValues, nValueReferences);
+}
+
+fmi3Status fmi3SetBinary(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                         size_t nValueReferences, const size_t valueSizes[], const fmi3Binary values[],
+                         size_t nValues) {
+    return noVariables(instance, "fmi3SetBinary", MASK_fmi3SetValues, nValueReferences);
+}
+
+fmi3Status fmi3GetClock(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                        size_t nValueReferences, fmi3Clock values[]) {
+    return noVariables(instance, "fmi3GetClock", MASK_fmi3GetValues, nValueReferences);
+}
+
+fmi3Status fmi3SetClock(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                        size_t nValueReferences, const fmi3Clock values[]) {
+    return noVariables(instance, "fmi3SetClock", MASK_fmi3SetValues, nValueReferences);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: variable dependencies
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3GetNumberOfVariableDependencies(fmi3Instance instance, fmi3ValueReference valueReference,
+                                               size_t* nDependencies) {
+    return unsupportedFunction(instance, "fmi3GetNumberOfVariableDependencies");
+}
+
+fmi3Status fmi3GetVariableDependencies(fmi3Instance instance, fmi3ValueReference dependent,
+                                       size_t elementIndicesOfDependent[], fmi3ValueReference independents[],
+                                       size_t elementIndicesOfIndependents[],
+                                       fmi3DependencyKind dependencyKinds[], size_t nDependencies) {
+    return unsupportedFunction(instance, "fmi3GetVariableDependencies");
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: FMU state snapshots
+///////////////////////////////////////////////////////////////////////////////
+
+// A snapshot holds everything that changes while simulating: the value
+// vector r, the current time and the state machine.
+typedef struct {
+    ModelState state;
+    fmi3Boolean isDirtyValues;
+    fmi3Float64 time;
+    fmi3Float64 hNext;
+    fmi3Float64 r[];  // NR values
+} ModelSnapshot;
+
+#define SNAPSHOT_SIZE (sizeof(ModelSnapshot) + NR * sizeof(fmi3Float64))
+
+// Serialized layout: magic, format version, NR, state, isDirtyValues, time,
+// [hNext,] r[0..NR-1]. hNext is only stored for solvers with a step size
+// estimate. Only valid on the platform it was created on.
+static const char SERIALIZATION_MAGIC[4] = {'q', 'f', 'm', 'u'};
+#define SERIALIZATION_VERSION 1
+#define SERIALIZED_NREALS (NR + (modelInfo.hasStepSize ? 2 : 1))
+#define SERIALIZED_SIZE (sizeof(SERIALIZATION_MAGIC) + 4 * sizeof(int) + SERIALIZED_NREALS * sizeof(fmi3Float64))
+
+static void saveSnapshot(ModelInstance *comp, ModelSnapshot *snapshot) {
+    snapshot->state = comp->state;
+    snapshot->isDirtyValues = comp->isDirtyValues;
+    snapshot->time = comp->time;
+    snapshot->hNext = comp->hNext;
+    memcpy(snapshot->r, comp->r, NR * sizeof(fmi3Float64));
+}
+
+static void loadSnapshot(ModelInstance *comp, const ModelSnapshot *snapshot) {
+    comp->state = snapshot->state;
+    comp->isDirtyValues = snapshot->isDirtyValues;
+    comp->time = snapshot->time;
+    comp->hNext = snapshot->hNext;
+    memcpy(comp->r, snapshot->r, NR * sizeof(fmi3Float64));
+}
+
+fmi3Status fmi3GetFMUState(fmi3Instance instance, fmi3FMUState* FMUState) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetFMUState", MASK_fmi3GetFMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3GetFMUState", "FMUState", FMUState))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetFMUState")
+
+    // Reuse a previously returned snapshot if one is given
+    if (!*FMUState) {
+        *FMUState = calloc(1, SNAPSHOT_SIZE);
+        if (!*FMUState) {
+            FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "fmi3GetFMUState: Out of memory.")
+            return fmi3Error;
+        }
+    }
+    saveSnapshot(comp, (ModelSnapshot *)*FMUState);
+    return fmi3OK;
+}
+
+fmi3Status fmi3SetFMUState(fmi3Instance instance, fmi3FMUState FMUState) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SetFMUState", MASK_fmi3SetFMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3SetFMUState", "FMUState", FMUState))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetFMUState")
+
+    loadSnapshot(comp, (const ModelSnapshot *)FMUState);
+    return fmi3OK;
+}
+
+fmi3Status fmi3FreeFMUState(fmi3Instance instance, fmi3FMUState* FMUState) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3FreeFMUState", MASK_fmi3FreeFMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3FreeFMUState", "FMUState", FMUState))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3FreeFMUState")
+
+    free(*FMUState);
+    *FMUState = NULL;
+    return fmi3OK;
+}
+
+fmi3Status fmi3SerializedFMUStateSize(fmi3Instance instance, fmi3FMUState FMUState, size_t* size) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SerializedFMUStateSize", MASK_fmi3SerializedFMUStateSize))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3SerializedFMUStateSize", "size", size))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SerializedFMUStateSize")
+
+    *size = SERIALIZED_SIZE;
+    return fmi3OK;
+}
+
+fmi3Status fmi3SerializeFMUState(fmi3Instance instance, fmi3FMUState FMUState,
+                                 fmi3Byte serializedState[], size_t size) {
+    const ModelSnapshot *snapshot = (const ModelSnapshot *)FMUState;
+    ModelInstance *comp = (ModelInstance *)instance;
+    int header[4] = {SERIALIZATION_VERSION, 0, 0, 0};
+    fmi3Byte *p = serializedState;
+    if (isInvalidState(comp, "fmi3SerializeFMUState", MASK_fmi3SerializeFMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3SerializeFMUState", "FMUState", FMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3SerializeFMUState", "serializedState", serializedState))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3SerializeFMUState", "size", size, SERIALIZED_SIZE))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SerializeFMUState")
+
+    header[1] = NR;
+    header[2] = (int)snapshot->state;
+    header[3] = (int)snapshot->isDirtyValues;
+    memcpy(p, SERIALIZATION_MAGIC, sizeof(SERIALIZATION_MAGIC));
+    p += sizeof(SERIALIZATION_MAGIC);
+    memcpy(p, header, sizeof(header));
+    p += sizeof(header);
+    memcpy(p, &snapshot->time, sizeof(fmi3Float64));
+    p += sizeof(fmi3Float64);
+    if (modelInfo.hasStepSize) {
+        memcpy(p, &snapshot->hNext, sizeof(fmi3Float64));
+        p += sizeof(fmi3Float64);
+    }
+    memcpy(p, snapshot->r, NR * sizeof(fmi3Float64));
+    return fmi3OK;
+}
+
+fmi3Status fmi3DeserializeFMUState(fmi3Instance instance, const fmi3Byte serializedState[],
+                                   size_t size, fmi3FMUState* FMUState) {
+    ModelSnapshot *snapshot = NULL;
+    ModelInstance *comp = (ModelInstance *)instance;
+    int header[4];
+    const fmi3Byte *p = serializedState;
+    if (isInvalidState(comp, "fmi3DeserializeFMUState", MASK_fmi3DeserializeFMUState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3DeserializeFMUState", "serializedState", serializedState))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3DeserializeFMUState", "FMUState", FMUState))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3DeserializeFMUState", "size", size, SERIALIZED_SIZE))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3DeserializeFMUState")
+
+    if (memcmp(p, SERIALIZATION_MAGIC, sizeof(SERIALIZATION_MAGIC)) != 0) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "fmi3DeserializeFMUState: Invalid serialized state.")
+        return fmi3Error;
+    }
+    p += sizeof(SERIALIZATION_MAGIC);
+    memcpy(header, p, sizeof(header));
+    p += sizeof(header);
+    if (header[0] != SERIALIZATION_VERSION || header[1] != NR) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR,
+            "fmi3DeserializeFMUState: Incompatible serialized state (version %d, NR = %d).", header[0], header[1])
+        return fmi3Error;
+    }
+
+    snapshot = (ModelSnapshot *)(*FMUState);
+    if (!snapshot) {
+        snapshot = (ModelSnapshot *)calloc(1, SNAPSHOT_SIZE);
+        if (!snapshot) {
+            FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "fmi3DeserializeFMUState: Out of memory.")
+            return fmi3Error;
+        }
+    }
+    snapshot->state = (ModelState)header[2];
+    snapshot->isDirtyValues = (fmi3Boolean)header[3];
+    memcpy(&snapshot->time, p, sizeof(fmi3Float64));
+    p += sizeof(fmi3Float64);
+    if (modelInfo.hasStepSize) {
+        memcpy(&snapshot->hNext, p, sizeof(fmi3Float64));
+        p += sizeof(fmi3Float64);
+    } else {
+        snapshot->hNext = 0.0;
+    }
+    memcpy(snapshot->r, p, NR * sizeof(fmi3Float64));
+
+    *FMUState = snapshot;
+    return fmi3OK;
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: partial derivatives
+///////////////////////////////////////////////////////////////////////////////
+
+// Total number of elements of the variables vr[], which must be one of
+// `first` and `second`. Returns 0 and logs an error for other variables.
+static size_t jacobianSize(ModelInstance *comp, const char *f, const fmi3ValueReference vr[], size_t nvr,
+                           fmi3ValueReference first, fmi3ValueReference second, fmi3Boolean *ok) {
+    size_t i, n, size = 0;
+    for (i = 0; i < nvr; i++) {
+        if (vr[i] != first && vr[i] != second) {
+            FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "%s: Illegal value reference %u.", f, vr[i])
+            comp->state = modelError;
+            *ok = fmi3False;
+            return 0;
+        }
+        variableValues(comp, vr[i], &n);
+        size += n;
+    }
+    return size;
+}
+
+/**
+ * \brief Product of the Jacobian of the unknowns w.r.t. the knowns with the seed
+ *
+ * Unknowns are state derivatives and outputs, knowns are states and inputs.
+ * The directional derivative multiplies the Jacobian from the right, the
+ * adjoint derivative multiplies its transpose.
+ */
+static fmi3Status jacobianProduct(fmi3Instance instance, const char *f, int adjoint,
+                                  const fmi3ValueReference unknowns[], size_t nUnknowns,
+                                  const fmi3ValueReference knowns[], size_t nKnowns,
+                                  const fmi3Float64 seed[], size_t nSeed,
+                                  fmi3Float64 sensitivity[], size_t nSensitivity) {
+    size_t i, j, k, l, ni, nj, row = 0, col;
+    size_t nRows, nCols;
+    fmi3Boolean ok = fmi3True;
+    const fmi3Float64 *vUnknown, *vKnown;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, f, MASK_fmi3GetDirectionalDerivative))
+        return fmi3Error;
+    if (nUnknowns > 0 && isNullPtr(comp, f, "unknowns[]", unknowns))
+        return fmi3Error;
+    if (nKnowns > 0 && isNullPtr(comp, f, "knowns[]", knowns))
+        return fmi3Error;
+    if (nSeed > 0 && isNullPtr(comp, f, "seed[]", seed))
+        return fmi3Error;
+    if (nSensitivity > 0 && isNullPtr(comp, f, "sensitivity[]", sensitivity))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "%s: nUnknowns = %zu, nKnowns = %zu", f, nUnknowns, nKnowns)
+
+    nRows = jacobianSize(comp, f, unknowns, nUnknowns, VAR_DER, VAR_Y, &ok);
+    nCols = jacobianSize(comp, f, knowns, nKnowns, VAR_X, VAR_U, &ok);
+    if (!ok)
+        return fmi3Error;
+    if (isInvalidNumber(comp, f, "nSeed", nSeed, adjoint ? nRows : nCols))
+        return fmi3Error;
+    if (isInvalidNumber(comp, f, "nSensitivity", nSensitivity, adjoint ? nCols : nRows))
+        return fmi3Error;
+
+    // The system is linear, so the Jacobian is made of the entries of A, B, C, D
+    memset(sensitivity, 0, nSensitivity * sizeof(fmi3Float64));
+    for (i = 0; i < nUnknowns; i++) {
+        vUnknown = variableValues(comp, unknowns[i], &ni);
+        for (k = 0; k < ni; k++, row++) {
+            const fmi3ValueReference unknown = (fmi3ValueReference)(vUnknown - comp->r + k);
+            col = 0;
+            for (j = 0; j < nKnowns; j++) {
+                vKnown = variableValues(comp, knowns[j], &nj);
+                for (l = 0; l < nj; l++, col++) {
+                    const fmi3Float64 a = jacobianEntry(unknown, (fmi3ValueReference)(vKnown - comp->r + l));
+                    if (adjoint) {
+                        sensitivity[col] += seed[row] * a;
+                    } else {
+                        sensitivity[row] += a * seed[col];
+                    }
+                }
+            }
+        }
+    }
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetDirectionalDerivative(fmi3Instance instance, const fmi3ValueReference unknowns[],
+                                        size_t nUnknowns, const fmi3ValueReference knowns[],
+                                        size_t nKnowns, const fmi3Float64 seed[], size_t nSeed,
+                                        fmi3Float64 sensitivity[], size_t nSensitivity) {
+    return jacobianProduct(instance, "fmi3GetDirectionalDerivative", 0, unknowns, nUnknowns,
+                           knowns, nKnowns, seed, nSeed, sensitivity, nSensitivity);
+}
+
+fmi3Status fmi3GetAdjointDerivative(fmi3Instance instance, const fmi3ValueReference unknowns[],
+                                    size_t nUnknowns, const fmi3ValueReference knowns[],
+                                    size_t nKnowns, const fmi3Float64 seed[], size_t nSeed,
+                                    fmi3Float64 sensitivity[], size_t nSensitivity) {
+    return jacobianProduct(instance, "fmi3GetAdjointDerivative", 1, unknowns, nUnknowns,
+                           knowns, nKnowns, seed, nSeed, sensitivity, nSensitivity);
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// FMI functions: clocks and configuration mode, not supported
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3EnterConfigurationMode(fmi3Instance instance) {
+    return unsupportedFunction(instance, "fmi3EnterConfigurationMode");
+}
+
+fmi3Status fmi3ExitConfigurationMode(fmi3Instance instance) {
+    return unsupportedFunction(instance, "fmi3ExitConfigurationMode");
+}
+
+fmi3Status fmi3GetIntervalDecimal(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                  size_t nValueReferences, fmi3Float64 intervals[],
+                                  fmi3IntervalQualifier qualifiers[]) {
+    return unsupportedFunction(instance, "fmi3GetIntervalDecimal");
+}
+
+fmi3Status fmi3GetIntervalFraction(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                   size_t nValueReferences, fmi3UInt64 counters[],
+                                   fmi3UInt64 resolutions[], fmi3IntervalQualifier qualifiers[]) {
+    return unsupportedFunction(instance, "fmi3GetIntervalFraction");
+}
+
+fmi3Status fmi3GetShiftDecimal(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                               size_t nValueReferences, fmi3Float64 shifts[]) {
+    return unsupportedFunction(instance, "fmi3GetShiftDecimal");
+}
+
+fmi3Status fmi3GetShiftFraction(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                size_t nValueReferences, fmi3UInt64 counters[], fmi3UInt64 resolutions[]) {
+    return unsupportedFunction(instance, "fmi3GetShiftFraction");
+}
+
+fmi3Status fmi3SetIntervalDecimal(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                  size_t nValueReferences, const fmi3Float64 intervals[]) {
+    return unsupportedFunction(instance, "fmi3SetIntervalDecimal");
+}
+
+fmi3Status fmi3SetIntervalFraction(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                   size_t nValueReferences, const fmi3UInt64 counters[],
+                                   const fmi3UInt64 resolutions[]) {
+    return unsupportedFunction(instance, "fmi3SetIntervalFraction");
+}
+
+fmi3Status fmi3SetShiftDecimal(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                               size_t nValueReferences, const fmi3Float64 shifts[]) {
+    return unsupportedFunction(instance, "fmi3SetShiftDecimal");
+}
+
+fmi3Status fmi3SetShiftFraction(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                size_t nValueReferences, const fmi3UInt64 counters[],
+                                const fmi3UInt64 resolutions[]) {
+    return unsupportedFunction(instance, "fmi3SetShiftFraction");
+}
+
+fmi3Status fmi3EvaluateDiscreteStates(fmi3Instance instance) {
+    return unsupportedFunction(instance, "fmi3EvaluateDiscreteStates");
+}
+
+fmi3Status fmi3ActivateModelPartition(fmi3Instance instance, fmi3ValueReference clockReference,
+                                      fmi3Float64 activationTime) {
+    return unsupportedFunction(instance, "fmi3ActivateModelPartition");
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// Functions for FMI 3 for Model Exchange
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3UpdateDiscreteStates(fmi3Instance instance, fmi3Boolean* discreteStatesNeedUpdate,
+                                    fmi3Boolean* terminateSimulation,
+                                    fmi3Boolean* nominalsOfContinuousStatesChanged,
+                                    fmi3Boolean* valuesOfContinuousStatesChanged,
+                                    fmi3Boolean* nextEventTimeDefined, fmi3Float64* nextEventTime) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3UpdateDiscreteStates", MASK_fmi3UpdateDiscreteStates))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3UpdateDiscreteStates")
+
+    // The model has no discrete states and no events
+    if (discreteStatesNeedUpdate) *discreteStatesNeedUpdate = fmi3False;
+    if (terminateSimulation) *terminateSimulation = fmi3False;
+    if (nominalsOfContinuousStatesChanged) *nominalsOfContinuousStatesChanged = fmi3False;
+    if (valuesOfContinuousStatesChanged) *valuesOfContinuousStatesChanged = fmi3False;
+    if (nextEventTimeDefined) *nextEventTimeDefined = fmi3False;
+    if (nextEventTime) *nextEventTime = 0.0;
+    return fmi3OK;
+}
+
+fmi3Status fmi3EnterContinuousTimeMode(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3EnterContinuousTimeMode", MASK_fmi3EnterContinuousTimeMode))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3EnterContinuousTimeMode")
+
+    comp->state = modelContinuousTimeMode;
+    return fmi3OK;
+}
+
+fmi3Status fmi3CompletedIntegratorStep(fmi3Instance instance, fmi3Boolean noSetFMUStatePriorToCurrentPoint,
+                                       fmi3Boolean* enterEventMode, fmi3Boolean* terminateSimulation) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3CompletedIntegratorStep", MASK_fmi3CompletedIntegratorStep))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3CompletedIntegratorStep", "enterEventMode", enterEventMode))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3CompletedIntegratorStep", "terminateSimulation", terminateSimulation))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3CompletedIntegratorStep")
+    *enterEventMode = fmi3False;
+    *terminateSimulation = fmi3False;
+    return fmi3OK;
+}
+
+fmi3Status fmi3SetTime(fmi3Instance instance, fmi3Float64 time) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SetTime", MASK_fmi3SetTime))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetTime: time=%.16g", time)
+    comp->time = time;
+    return fmi3OK;
+}
+
+fmi3Status fmi3SetContinuousStates(fmi3Instance instance, const fmi3Float64 continuousStates[],
+                                   size_t nContinuousStates) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3SetContinuousStates", MASK_fmi3SetContinuousStates))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3SetContinuousStates", "nContinuousStates", nContinuousStates, NX))
+        return fmi3Error;
+    if (NX > 0 && isNullPtr(comp, "fmi3SetContinuousStates", "continuousStates[]", continuousStates))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3SetContinuousStates")
+    if (NX > 0) {
+        memcpy(comp->r + VR_X, continuousStates, NX * sizeof(fmi3Float64));
+    }
+    if (NY > 0) {
+        updateOutputs(comp);
+    }
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetContinuousStateDerivatives(fmi3Instance instance, fmi3Float64 derivatives[],
+                                             size_t nContinuousStates) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetContinuousStateDerivatives", MASK_fmi3GetContinuousStateDerivatives))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3GetContinuousStateDerivatives", "nContinuousStates", nContinuousStates, NX))
+        return fmi3Error;
+    if (NX > 0 && isNullPtr(comp, "fmi3GetContinuousStateDerivatives", "derivatives[]", derivatives))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetContinuousStateDerivatives")
+    if (NX > 0) {
+        updateDerivatives(comp);
+        memcpy(derivatives, comp->r + VR_DER, NX * sizeof(fmi3Float64));
+    }
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetEventIndicators(fmi3Instance instance, fmi3Float64 eventIndicators[],
+                                  size_t nEventIndicators) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetEventIndicators", MASK_fmi3GetEventIndicators))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3GetEventIndicators", "nEventIndicators", nEventIndicators, 0))
+        return fmi3Error;
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetContinuousStates(fmi3Instance instance, fmi3Float64 continuousStates[],
+                                   size_t nContinuousStates) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetContinuousStates", MASK_fmi3GetContinuousStates))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3GetContinuousStates", "nContinuousStates", nContinuousStates, NX))
+        return fmi3Error;
+    if (NX > 0 && isNullPtr(comp, "fmi3GetContinuousStates", "continuousStates[]", continuousStates))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetContinuousStates")
+    if (NX > 0) {
+        memcpy(continuousStates, comp->r + VR_X, NX * sizeof(fmi3Float64));
+    }
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetNominalsOfContinuousStates(fmi3Instance instance, fmi3Float64 nominals[],
+                                             size_t nContinuousStates) {
+    size_t i;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetNominalsOfContinuousStates", MASK_fmi3GetNominalsOfContinuousStates))
+        return fmi3Error;
+    if (isInvalidNumber(comp, "fmi3GetNominalsOfContinuousStates", "nContinuousStates", nContinuousStates, NX))
+        return fmi3Error;
+    if (NX > 0 && isNullPtr(comp, "fmi3GetNominalsOfContinuousStates", "nominals[]", nominals))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetNominalsOfContinuousStates: nominals[0..%zu] = 1.0",
+        nContinuousStates)
+    for (i = 0; i < nContinuousStates; i++)
+        nominals[i] = 1;
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetNumberOfEventIndicators(fmi3Instance instance, size_t* nEventIndicators) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetNumberOfEventIndicators", MASK_fmi3GetNumberOfEventIndicators))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3GetNumberOfEventIndicators", "nEventIndicators", nEventIndicators))
+        return fmi3Error;
+    *nEventIndicators = 0;
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetNumberOfContinuousStates(fmi3Instance instance, size_t* nContinuousStates) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetNumberOfContinuousStates", MASK_fmi3GetNumberOfContinuousStates))
+        return fmi3Error;
+    if (isNullPtr(comp, "fmi3GetNumberOfContinuousStates", "nContinuousStates", nContinuousStates))
+        return fmi3Error;
+    *nContinuousStates = NX;
+    return fmi3OK;
+}
+
+///////////////////////////////////////////////////////////////////////////////
+// Functions for FMI 3 for Co-Simulation
+///////////////////////////////////////////////////////////////////////////////
+fmi3Status fmi3EnterStepMode(fmi3Instance instance) {
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3EnterStepMode", MASK_fmi3EnterStepMode))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3EnterStepMode")
+
+    comp->state = modelStepMode;
+    return fmi3OK;
+}
+
+fmi3Status fmi3GetOutputDerivatives(fmi3Instance instance, const fmi3ValueReference valueReferences[],
+                                    size_t nValueReferences, const fmi3Int32 orders[],
+                                    fmi3Float64 values[], size_t nValues) {
+    size_t i;
+    ModelInstance *comp = (ModelInstance *)instance;
+    if (isInvalidState(comp, "fmi3GetOutputDerivatives", MASK_fmi3GetOutputDerivatives))
+        return fmi3Error;
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3GetOutputDerivatives: nValueReferences = %zu", nValueReferences)
+    FILTERED_LOG(comp, fmi3Error, LOG_ERROR, "fmi3GetOutputDerivatives: ignoring function call."
+        " This model cannot compute derivatives of outputs: maxOutputDerivativeOrder=\"0\"")
+    for (i = 0; i < nValues; i++) values[i] = 0;
+    return fmi3Error;
+}
+
+fmi3Status fmi3DoStep(fmi3Instance instance, fmi3Float64 currentCommunicationPoint,
+                      fmi3Float64 communicationStepSize, fmi3Boolean noSetFMUStatePriorToCurrentPoint,
+                      fmi3Boolean* eventHandlingNeeded, fmi3Boolean* terminateSimulation,
+                      fmi3Boolean* earlyReturn, fmi3Float64* lastSuccessfulTime) {
+    ModelInstance *comp = (ModelInstance *)instance;
+
+    if (isInvalidState(comp, "fmi3DoStep", MASK_fmi3DoStep))
+        return fmi3Error;
+
+    FILTERED_LOG(comp, fmi3OK, LOG_FMI_CALL, "fmi3DoStep: "
+        "currentCommunicationPoint = %g, "
+        "communicationStepSize = %g, "
+        "noSetFMUStatePriorToCurrentPoint = fmi3%s",
+        currentCommunicationPoint, communicationStepSize, noSetFMUStatePriorToCurrentPoint ? "True" : "False")
+
+    if (communicationStepSize <= 0) {
+        FILTERED_LOG(comp, fmi3Error, LOG_ERROR,
+            "fmi3DoStep: communication step size must be > 0. Found %g.", communicationStepSize)
+        comp->state = modelError;
+        return fmi3Error;
+    }
+
+    comp->time = currentCommunicationPoint;
+    if (NX > 0) {
+        updateDerivatives(comp);
+        if (updateStates(comp, communicationStepSize) != fmi3OK) {
+            FILTERED_LOG(comp, fmi3Error, LOG_ERROR,
+                "fmi3DoStep: failed to update states at t = %g.", currentCommunicationPoint)
+            comp->state = modelError;
+            return fmi3Error;
+        }
+    }
+    comp->time += communicationStepSize;
+
+    // Update outputs based on new state values
+    updateOutputs(comp);
+
+    if (eventHandlingNeeded) *eventHandlingNeeded = fmi3False;
+    if (terminateSimulation) *terminateSimulation = fmi3False;
+    if (earlyReturn) *earlyReturn = fmi3False;
+    if (lastSuccessfulTime) *lastSuccessfulTime = comp->time;
+    return fmi3OK;
+}
+
+#ifdef __cplusplus
+} // closing brace for extern "C"
+#endif
@@ -0,0 +1,172 @@
+/* ---------------------------------------------------------------------------*
+ * fmi3Template.h
+ * Interface between the FMI 3 runtime (fmi3Template.c) and the generated
+ * model code (fmi3model.c)
+ * ---------------------------------------------------------------------------*/
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <assert.h>
+
+// C-code FMUs have functions names prefixed with MODEL_IDENTIFIER_.
+// Define DISABLE_PREFIX to build a binary FMU.
+#ifndef DISABLE_PREFIX
+#define pasteA(a,b)     a ## b
+#define pasteB(a,b)    pasteA(a,b)
+#define FMI3_FUNCTION_PREFIX pasteB(MODEL_IDENTIFIER, _)
+#endif
+#include "fmi3Functions.h"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// The generated model code is shared with FMI 2, its types map to FMI 3 types
+typedef fmi3Float64 fmi2Real;
+typedef fmi3Boolean fmi2Boolean;
+typedef fmi3Status fmi2Status;
+typedef fmi3ValueReference fmi2ValueReference;
+#define fmi2True  fmi3True
+#define fmi2False fmi3False
+#define fmi2OK    fmi3OK
+#define fmi2Error fmi3Error
+
+// macros used to define variables
+#define  r(vr) comp->r[vr]
+
+// categories of logging supported by model.
+// Value is the index in logCategories of a ModelInstance.
+#define LOG_ALL       0
+#define LOG_ERROR     1
+#define LOG_FMI_CALL  2
+#define LOG_EVENT     3
+
+#define NUMBER_OF_CATEGORIES 4
+
+typedef enum {
+    modelStartAndEnd        = 1<<0,
+    modelInstantiated       = 1<<1,
+    modelInitializationMode = 1<<2,
+
+    // ME states
+    modelEventMode          = 1<<3,
+    modelContinuousTimeMode = 1<<4,
+    // CS states
+    modelStepMode           = 1<<5,
+
+    modelTerminated         = 1<<6,
+    modelError              = 1<<7,
+    modelFatal              = 1<<8,
+} ModelState;
+
+typedef enum {
+    modelExchange,
+    coSimulation,
+} InterfaceType;
+
+// ---------------------------------------------------------------------------
+// Function calls allowed state masks for both Model-exchange and Co-simulation
+// ---------------------------------------------------------------------------
+#define MASK_fmi3SetDebugLogging         (modelInstantiated | modelInitializationMode | modelEventMode | modelContinuousTimeMode | modelStepMode | modelTerminated | modelError)
+#define MASK_fmi3FreeInstance            MASK_fmi3SetDebugLogging
+#define MASK_fmi3EnterInitializationMode modelInstantiated
+#define MASK_fmi3ExitInitializationMode  modelInitializationMode
+#define MASK_fmi3EnterEventMode          (modelEventMode | modelContinuousTimeMode)
+#define MASK_fmi3Terminate               (modelEventMode | modelContinuousTimeMode | modelStepMode)
+#define MASK_fmi3Reset                   MASK_fmi3FreeInstance
+#define MASK_fmi3GetValues               (modelInitializationMode | modelEventMode | modelContinuousTimeMode | modelStepMode | modelTerminated | modelError)
+#define MASK_fmi3SetValues               (modelInstantiated | modelInitializationMode | modelEventMode | modelContinuousTimeMode | modelStepMode)
+#define MASK_fmi3GetFMUState             MASK_fmi3FreeInstance
+#define MASK_fmi3SetFMUState             MASK_fmi3FreeInstance
+#define MASK_fmi3FreeFMUState            MASK_fmi3FreeInstance
+#define MASK_fmi3SerializedFMUStateSize  MASK_fmi3FreeInstance
+#define MASK_fmi3SerializeFMUState       MASK_fmi3FreeInstance
+#define MASK_fmi3DeserializeFMUState     MASK_fmi3FreeInstance
+#define MASK_fmi3GetDirectionalDerivative (modelInitializationMode | modelEventMode | modelContinuousTimeMode | modelStepMode | modelTerminated | modelError)
+#define MASK_fmi3GetAdjointDerivative    MASK_fmi3GetDirectionalDerivative
+#define MASK_fmi3Unsupported             MASK_fmi3FreeInstance
+
+// ---------------------------------------------------------------------------
+// Function calls allowed state masks for Model-exchange
+// ---------------------------------------------------------------------------
+#define MASK_fmi3UpdateDiscreteStates    modelEventMode
+#define MASK_fmi3EnterContinuousTimeMode modelEventMode
+#define MASK_fmi3CompletedIntegratorStep modelContinuousTimeMode
+#define MASK_fmi3SetTime                 (modelEventMode | modelContinuousTimeMode)
+#define MASK_fmi3SetContinuousStates     modelContinuousTimeMode
+#define MASK_fmi3GetContinuousStateDerivatives (modelInitializationMode | modelEventMode | modelContinuousTimeMode | modelTerminated | modelError)
+#define MASK_fmi3GetEventIndicators      MASK_fmi3GetContinuousStateDerivatives
+#define MASK_fmi3GetContinuousStates     MASK_fmi3GetContinuousStateDerivatives
+#define MASK_fmi3GetNominalsOfContinuousStates (modelInstantiated | modelEventMode | modelContinuousTimeMode | modelTerminated | modelError)
+#define MASK_fmi3GetNumberOfEventIndicators MASK_fmi3FreeInstance
+#define MASK_fmi3GetNumberOfContinuousStates MASK_fmi3FreeInstance
+
+// ---------------------------------------------------------------------------
+// Function calls allowed state masks for Co-simulation
+// ---------------------------------------------------------------------------
+#define MASK_fmi3EnterStepMode           (modelInitializationMode | modelEventMode)
+#define MASK_fmi3GetOutputDerivatives    (modelStepMode | modelTerminated | modelError)
+#define MASK_fmi3DoStep                  modelStepMode
+
+typedef struct {
+    ModelState state;
+    fmi3Float64 *r;  // value vector, indexed by the FMI 2 value reference
+    fmi3Float64 time;
+    fmi3Char instanceName[256];
+    InterfaceType type;
+    fmi3InstanceEnvironment instanceEnvironment;
+    fmi3LogMessageCallback logMessage;
+    fmi3Boolean loggingOn;
+    fmi3Boolean logCategories[NUMBER_OF_CATEGORIES];
+    fmi3Boolean isDirtyValues;
+    fmi3Float64 tolerance;
+    fmi3Float64 hNext;  // step size estimate of adaptive solvers
+    // FMI 3 has no input derivatives, du stays NULL and the model code never
+    // interpolates the inputs
+    fmi3Float64 *du;
+    fmi3Boolean hasInputDerivatives;
+    void *solverData;  // solver workspace of modelInfo.solverDataSize bytes
+} ModelInstance;
+
+typedef struct {
+    const char *guid;
+    int nr;
+    int nx;
+    int nu;
+    int ny;
+    // First index in r of the states and of the state derivatives
+    fmi3ValueReference vrX;
+    fmi3ValueReference vrDer;
+    size_t solverDataSize;
+    // Whether hNext is part of the FMU state
+    fmi3Boolean hasStepSize;
+    // First index in r of the remaining variable blocks
+    fmi3ValueReference vrX0;
+    fmi3ValueReference vrU;
+    fmi3ValueReference vrU0;
+    fmi3ValueReference vrY;
+} ModelInfo;
+
+// Defined by the generated model code
+extern const ModelInfo modelInfo;
+
+void resetX(ModelInstance* comp);
+void copyX0toX(ModelInstance* comp);
+void resetU(ModelInstance* comp);
+void copyU0toU(ModelInstance* comp);
+void updateDerivatives(ModelInstance* comp);
+void updateOutputs(ModelInstance* comp);
+fmi3Status updateStates(ModelInstance* comp, fmi3Float64 h);
+void evaluate(ModelInstance* comp);
+void advanceInputs(ModelInstance* comp, fmi3Float64 h);
+fmi3Float64 outputDerivative(ModelInstance* comp, int i);
+fmi3Float64 jacobianEntry(fmi3ValueReference unknown, fmi3ValueReference known);
+
+// Defined by the runtime, zero-initialized memory for the model code
+void *allocateInstanceMemory(ModelInstance* comp, size_t nobj, size_t size);
+void freeInstanceMemory(ModelInstance* comp, void *obj);
+
+#ifdef __cplusplus
+} // closing brace for extern "C"
+#endif
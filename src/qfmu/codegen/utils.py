@@ -1,10 +1,185 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterator, List, Sequence
+
 import numpy as np
 
+from qfmu.model.lti import issparse, to_dense
+from qfmu.options import FLOAT_FORMATS
+
+# Number of values formatted at once when emitting 1-D C arrays
+CHUNK_SIZE = 4096
+
+
+@dataclass
+class CsrMatrix:
+    """Compressed sparse row storage of a matrix"""
+
+    row_ptr: np.ndarray
+    col_idx: np.ndarray
+    values: np.ndarray
+
+    @property
+    def nnz(self) -> int:
+        return self.values.shape[0]
+
+
+def _float_formatter(float_format: str) -> Callable[[float], str]:
+    if float_format == "dec":
+        return "%.17g".__mod__
+    elif float_format == "hex":
+        return float.hex
+    raise ValueError(
+        f"Unknown float format {float_format}, expected one of {FLOAT_FORMATS}"
+    )
+
+
+@lru_cache(maxsize=16)
+def _dec_format(n: int) -> str:
+    return ",".join(["%.17g"] * n)
+
+
+def _nonfinite2cstr(value: float, formatter: Callable[[float], str]) -> str:
+    if np.isnan(value):
+        return "NAN"
+    elif np.isinf(value):
+        return "INFINITY" if value > 0 else "-INFINITY"
+    return formatter(value)
+
+
+def _values2cstr(values: np.ndarray, float_format: str) -> str:
+    if np.issubdtype(values.dtype, np.integer) or values.dtype == bool:
+        return ",".join(map(str, values.astype(int).tolist()))
+
+    formatter = _float_formatter(float_format)
+    values = values.astype(float)
+    if not np.all(np.isfinite(values)):
+        return ",".join(_nonfinite2cstr(v, formatter) for v in values.tolist())
+    if float_format == "dec":
+        # A single %-format call per chunk is noticeably faster than one per value
+        return _dec_format(values.shape[0]) % tuple(values.tolist())
+    return ",".join(map(formatter, values.tolist()))
+
+
+def iter_carray(
+    arr: np.ndarray, float_format: str = "dec", chunk_size: int = CHUNK_SIZE
+) -> Iterator[str]:
+    """Yield the C initializer list of `arr` in chunks
+
+    Floats are written as round-trippable `%.17g` literals, or as C99 hex float
+    literals with `float_format="hex"`. 2-D arrays are yielded row by row, so
+    rendering a template with `Template.stream` keeps memory bounded.
+    """
+    if issparse(arr):
+        arr = arr.tocsr()
+        rows = (arr.getrow(i).toarray()[0] for i in range(arr.shape[0]))
+    else:
+        arr = np.asarray(arr)
+        if arr.ndim == 1:
+            yield "{"
+            for start in range(0, arr.shape[0], chunk_size):
+                if start > 0:
+                    yield ","
+                yield _values2cstr(arr[start : start + chunk_size], float_format)
+            yield "}"
+            return
+        rows = iter(arr)
+
+    yield "{"
+    for i, row in enumerate(rows):
+        if i > 0:
+            yield ","
+        yield from iter_carray(row, float_format, chunk_size)
+    yield "}"
+
+
+def array2cstr(arr: np.ndarray, float_format: str = "dec") -> str:
+    return "".join(iter_carray(arr, float_format))
+
+
+def _value2xml(value: float) -> str:
+    if np.isnan(value):
+        return "NaN"
+    elif np.isinf(value):
+        return "INF" if value > 0 else "-INF"
+    return "%.17g" % value
+
+
+def array2xml(arr: np.ndarray) -> str:
+    """Space separated values of `arr`, the start attribute of FMI 3 arrays
+
+    Floats are written as round-trippable `%.17g` literals, non-finite values
+    with their xs:double spelling.
+    """
+    return " ".join(map(_value2xml, np.asarray(arr, dtype=float).ravel().tolist()))
+
+
+def to_csr(arr: np.ndarray) -> CsrMatrix:
+    from scipy import sparse
+
+    m = sparse.csr_matrix(arr, dtype=float, copy=True)
+    m.eliminate_zeros()
+    m.sort_indices()
+    return CsrMatrix(
+        row_ptr=m.indptr.astype(int),
+        col_idx=m.indices.astype(int),
+        values=m.data.astype(float),
+    )
+
+
+def density(arr: np.ndarray) -> float:
+    """Fraction of nonzero entries, 1.0 for empty matrices"""
+    size = arr.shape[0] * arr.shape[1]
+    if size == 0:
+        return 1.0
+    nnz = arr.count_nonzero() if issparse(arr) else np.count_nonzero(arr)
+    return nnz / size
+
+
+@dataclass
+class UnrolledModel:
+    """C expressions of each state derivative and output"""
+
+    derivatives: List[str]
+    outputs: List[str]
+
+
+def linear_combination(
+    coefficients: Sequence[float], operands: Sequence[str], float_format: str = "dec"
+) -> str:
+    """C expression of the sum of `coefficients[i] * operands[i]`
+
+    Zero coefficients are dropped and coefficients of +-1 become plain
+    additions and subtractions. The expression is "0.0" if all coefficients
+    are zero.
+    """
+    formatter = _float_formatter(float_format)
+    terms = []
+    for c, v in zip(coefficients, operands):
+        if c == 0.0:
+            continue
+        term = v if abs(c) == 1.0 else f"{_nonfinite2cstr(abs(c), formatter)} * {v}"
+        terms.append(("-" if c < 0.0 else "+", term))
+
+    if not terms:
+        return "0.0"
+    sign, term = terms[0]
+    expr = term if sign == "+" else f"-{term}"
+    return expr + "".join(f" {sign} {term}" for sign, term in terms[1:])
+
+
+def unroll_model(model, float_format: str = "dec") -> UnrolledModel:
+    """Straight-line expressions of dx = A x + B u and y = C x + D u
+
+    States and inputs are referred to as `x[j]` and `u[j]`.
+    """
+    x = [f"x[{j}]" for j in range(model.nx)]
+    u = [f"u[{j}]" for j in range(model.nu)]
+
+    def rows(M, N) -> List[str]:
+        M = np.hstack([to_dense(M), to_dense(N)])
+        return [linear_combination(row, x + u, float_format) for row in M.tolist()]
 
-def array2cstr(arr: np.ndarray) -> str:
-    return (
-        np.array2string(arr, separator=",")
-        .replace("[", "{")
-        .replace("]", "}")
-        .replace("\n", "")
+    return UnrolledModel(
+        derivatives=rows(model.A, model.B), outputs=rows(model.C, model.D)
     )
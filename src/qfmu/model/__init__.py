@@ -1,8 +1,9 @@
 # expose the model classes
 
+from .batch import LTIBatch
 from .pid import PID
 from .ss import StateSpace
 from .tf import TransferFunction
 from .zpk import ZerosPolesGain
 
-__all__ = ["StateSpace", "PID", "TransferFunction", "ZerosPolesGain"]
+__all__ = ["StateSpace", "PID", "TransferFunction", "ZerosPolesGain", "LTIBatch"]
@@ -0,0 +1,106 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from qfmu.model.lti import LTI, to_dense
+
+
+class LTIBatch:
+    """Stack of LTI models sharing the same number of states, inputs and outputs
+
+    The matrices are stored as 3-D arrays with the variant along the first axis,
+    e.g. A has the shape (batch, nx, nx).
+    """
+
+    def __init__(
+        self,
+        A: npt.NDArray[np.float64],
+        B: npt.NDArray[np.float64],
+        C: npt.NDArray[np.float64],
+        D: npt.NDArray[np.float64],
+        x0: Optional[npt.NDArray[np.float64]] = None,
+        u0: Optional[npt.NDArray[np.float64]] = None,
+    ) -> None:
+        self._A, self._B, self._C, self._D = (
+            np.asarray(m, dtype=float) for m in (A, B, C, D)
+        )
+        if any(m.ndim != 3 for m in (self._A, self._B, self._C, self._D)):
+            raise ValueError("A, B, C, D must be 3-D arrays")
+
+        n, nx = self._A.shape[:2]
+        nu, ny = self._B.shape[2], self._C.shape[1]
+        if self._A.shape != (n, nx, nx):
+            raise ValueError("A must be a stack of square matrices")
+        if self._B.shape != (n, nx, nu):
+            raise ValueError("B has invalid shape")
+        if self._C.shape != (n, ny, nx):
+            raise ValueError("C has invalid shape")
+        if self._D.shape != (n, ny, nu):
+            raise ValueError("D has invalid shape")
+
+        self._x0 = np.zeros((n, nx)) if x0 is None else np.asarray(x0, dtype=float)
+        self._u0 = np.zeros((n, nu)) if u0 is None else np.asarray(u0, dtype=float)
+        if self._x0.shape != (n, nx):
+            raise ValueError("x0 has invalid shape")
+        if self._u0.shape != (n, nu):
+            raise ValueError("u0 has invalid shape")
+
+    @classmethod
+    def from_models(cls, models: Sequence[LTI]) -> "LTIBatch":
+        """Stack `models`, which must all have the same nx, nu and ny"""
+        if len(models) == 0:
+            raise ValueError("At least one model is required")
+        shapes = {(m.nx, m.nu, m.ny) for m in models}
+        if len(shapes) != 1:
+            raise ValueError(f"Models have different (nx, nu, ny): {sorted(shapes)}")
+        if any(m.is_discrete() for m in models):
+            raise ValueError("Discrete-time models cannot be batched")
+
+        return cls(
+            *(
+                np.stack([to_dense(getattr(m, name)) for m in models])
+                for name in "ABCD"
+            ),
+            x0=np.stack([m.x0 for m in models]).astype(float),
+            u0=np.stack([m.u0 for m in models]).astype(float),
+        )
+
+    def __len__(self) -> int:
+        return self._A.shape[0]
+
+    @property
+    def nx(self) -> int:
+        return self._A.shape[1]
+
+    @property
+    def nu(self) -> int:
+        return self._B.shape[2]
+
+    @property
+    def ny(self) -> int:
+        return self._C.shape[1]
+
+    @property
+    def A(self) -> np.ndarray:
+        return self._A
+
+    @property
+    def B(self) -> np.ndarray:
+        return self._B
+
+    @property
+    def C(self) -> np.ndarray:
+        return self._C
+
+    @property
+    def D(self) -> np.ndarray:
+        return self._D
+
+    @property
+    def x0(self) -> np.ndarray:
+        return self._x0
+
+    @property
+    def u0(self) -> np.ndarray:
+        return self._u0
@@ -0,0 +1,238 @@
+"""NumPy-only conversions between LTI representations
+
+Importing `scipy.signal` dominates the start-up time of qfmu, so the single
+input single output conversions the models need are implemented here. They
+return the same realizations as their `scipy.signal` counterparts.
+
+Transfer function matrices are realized entry by entry and reduced to a
+minimal realization, whose states are shared by the entries.
+"""
+
+import logging
+from typing import Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+ABCD = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def normalize(num: npt.ArrayLike, den: npt.ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    """Strip leading zeros and scale `den` to be monic, like `signal.normalize`"""
+    num = np.atleast_1d(np.asarray(num, dtype=float))
+    den = np.atleast_1d(np.asarray(den, dtype=float))
+    if num.ndim != 1 or den.ndim != 1:
+        raise ValueError("Numerator and denominator must be rank-1 arrays")
+    if np.all(den == 0.0):
+        raise ValueError("Denominator must have at least one nonzero element")
+
+    den = np.trim_zeros(den, "f")
+    num, den = num / den[0], den / den[0]
+
+    # Leading coefficients that are zero up to round-off are dropped, keeping
+    # at least one coefficient
+    nonzero = np.flatnonzero(~np.isclose(num, 0.0, rtol=0.0, atol=1e-14))
+    leading_zeros = nonzero[0] if len(nonzero) > 0 else max(len(num) - 1, 0)
+    if leading_zeros > 0:
+        logging.warning(
+            "Badly conditioned filter coefficients (numerator): the results may "
+            "be meaningless"
+        )
+    return num[leading_zeros:], den
+
+
+def tf2ss(num: npt.ArrayLike, den: npt.ArrayLike) -> ABCD:
+    """Controllable canonical realization of a transfer function, see `signal.tf2ss`
+
+    Only single output numerators are handled here, others are passed on to
+    `scipy.signal`.
+    """
+    if np.ndim(num) > 1:
+        from scipy import signal
+
+        return signal.tf2ss(num, den)
+
+    num, den = normalize(num, den)
+    M, K = len(num), len(den)
+    if M > K:
+        raise ValueError("Improper transfer function. `num` is longer than `den`.")
+    if M == 0 or K == 0:
+        return (
+            np.array([], dtype=float),
+            np.array([], dtype=float),
+            np.array([], dtype=float),
+            np.array([], dtype=float),
+        )
+
+    num = np.hstack((np.zeros(K - M), num))
+    D = np.array([[num[0]]])
+    if K == 1:
+        return np.zeros((1, 1)), np.zeros((1, 1)), np.zeros((1, 1)), D
+
+    A = np.vstack((-den[np.newaxis, 1:], np.eye(K - 2, K - 1)))
+    B = np.eye(K - 1, 1)
+    C = num[np.newaxis, 1:] - num[0] * den[np.newaxis, 1:]
+    return A, B, C, D
+
+
+def zpk2tf(
+    z: npt.ArrayLike, p: npt.ArrayLike, k: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Polynomial coefficients of a zero-pole-gain model, see `signal.zpk2tf`
+
+    `np.poly` returns real coefficients when the roots come in complex
+    conjugate pairs.
+    """
+    return np.atleast_1d(k * np.poly(z)), np.atleast_1d(np.poly(p))
+
+
+def zpk2ss(z: npt.ArrayLike, p: npt.ArrayLike, k: float) -> ABCD:
+    """Controllable canonical realization of a zero-pole-gain model"""
+    return tf2ss(*zpk2tf(z, p, k))
+
+
+def depth(x: Any) -> int:
+    """Nesting depth of lists, tuples and arrays, 1 for a flat list of numbers"""
+    d = 0
+    while isinstance(x, (list, tuple, np.ndarray)):
+        d += 1
+        if len(x) == 0:
+            break
+        x = x[0]
+    return d
+
+
+def _matrix_entries(m: Any, name: str, shape: Tuple[int, int]) -> List[List[Any]]:
+    """Rows of the ny x nu nested list `m`, checking its shape"""
+    rows = [list(row) for row in m]
+    if len(rows) != shape[0] or any(len(row) != shape[1] for row in rows):
+        raise ValueError(f"{name} must be a {shape[0]} x {shape[1]} matrix")
+    return rows
+
+
+def tfm2ss(num: Any, den: Any) -> ABCD:
+    """Minimal realization of a transfer function matrix
+
+    `num` is a ny x nu nested list of numerator polynomials, `den` a
+    denominator shared by all entries or a nested list like `num`. Entries
+    with a zero numerator have no states.
+    """
+    from qfmu.model.reduction import minreal
+
+    if len(num) == 0 or len(num[0]) == 0:
+        raise ValueError("num must have at least one row and one column")
+    ny, nu = len(num), len(num[0])
+    nums = _matrix_entries(num, "num", (ny, nu))
+    dens = (
+        [[den] * nu for _ in range(ny)]
+        if depth(den) == 1
+        else _matrix_entries(den, "den", (ny, nu))
+    )
+
+    D = np.zeros((ny, nu))
+    blocks = []
+    for i in range(ny):
+        for j in range(nu):
+            n = np.atleast_1d(np.asarray(nums[i][j], dtype=float))
+            if n.ndim != 1 or len(n) == 0:
+                raise ValueError(f"num[{i}][{j}] must be a non-empty polynomial")
+            if not np.any(n):
+                continue
+            # Static gains come with a dummy state, which minreal removes
+            Ai, Bi, Ci, Di = tf2ss(n, dens[i][j])
+            D[i, j] = Di[0, 0]
+            blocks.append((i, j, Ai, Bi, Ci))
+
+    nx = sum(Ai.shape[0] for _, _, Ai, _, _ in blocks)
+    A, B, C = np.zeros((nx, nx)), np.zeros((nx, nu)), np.zeros((ny, nx))
+    k = 0
+    for i, j, Ai, Bi, Ci in blocks:
+        n = Ai.shape[0]
+        A[k : k + n, k : k + n] = Ai
+        B[k : k + n, j] = Bi[:, 0]
+        C[i, k : k + n] = Ci[0]
+        k += n
+
+    A, B, C, _ = minreal(A, B, C, np.zeros(nx))
+    return A, B, C, D
+
+
+def zpkm2ss(z: Any, p: Any, k: npt.ArrayLike) -> ABCD:
+    """Minimal realization of a zero-pole-gain matrix, see `tfm2ss`
+
+    `k` is the ny x nu gain matrix, `z` a nested list of the zeros of each
+    entry and `p` the poles shared by all entries or a nested list like `z`.
+    """
+    k = np.atleast_2d(np.asarray(k, dtype=float))
+    if k.ndim != 2:
+        raise ValueError("k must be a matrix")
+    ny, nu = k.shape
+    zeros = _matrix_entries(z, "z", (ny, nu))
+    poles = (
+        [[p] * nu for _ in range(ny)]
+        if depth(p) <= 1
+        else _matrix_entries(p, "p", (ny, nu))
+    )
+    tfs = [
+        [zpk2tf(zeros[i][j], poles[i][j], k[i, j]) for j in range(nu)]
+        for i in range(ny)
+    ]
+    return tfm2ss(
+        [[num for num, _ in row] for row in tfs],
+        [[den for _, den in row] for row in tfs],
+    )
+
+
+def _first(dims: Iterator[int]) -> Optional[int]:
+    return next(dims, None)
+
+
+def _restore(m: Optional[np.ndarray], shape: Tuple[int, int]) -> np.ndarray:
+    if m is None or m.shape == (0, 0):
+        return np.zeros(shape)
+    if m.shape != shape:
+        raise ValueError("The input arrays have incompatible shapes.")
+    return m
+
+
+def abcd_normalize(
+    A: Optional[npt.ArrayLike] = None,
+    B: Optional[npt.ArrayLike] = None,
+    C: Optional[npt.ArrayLike] = None,
+    D: Optional[npt.ArrayLike] = None,
+) -> ABCD:
+    """Fill in missing matrices with zeros and check their shapes
+
+    Same as `signal.abcd_normalize`, except that the matrices are converted to
+    float.
+    """
+    A, B, C, D = (
+        np.atleast_2d(np.asarray(m, dtype=float)) if m is not None else None
+        for m in (A, B, C, D)
+    )
+
+    nx = _first(m.shape[i] for m, i in ((A, 0), (B, 0), (C, 1)) if m is not None)
+    nu = _first(m.shape[1] for m in (B, D) if m is not None)
+    ny = _first(m.shape[0] for m in (C, D) if m is not None)
+    if nx is None or nu is None or ny is None:
+        raise ValueError("Not enough information on the system.")
+
+    return (
+        _restore(A, (nx, nx)),
+        _restore(B, (nx, nu)),
+        _restore(C, (ny, nx)),
+        _restore(D, (ny, nu)),
+    )
+
+
+def parallel(*systems: ABCD) -> ABCD:
+    """Sum of the outputs of `systems` driven by the same inputs"""
+    As, Bs, Cs, Ds = zip(*systems)
+    nx = sum(A.shape[0] for A in As)
+    A = np.zeros((nx, nx))
+    i = 0
+    for Ai in As:
+        n = Ai.shape[0]
+        A[i : i + n, i : i + n] = Ai
+        i += n
+    return A, np.vstack(Bs), np.hstack(Cs), sum(Ds[1:], Ds[0])
@@ -1,12 +1,44 @@
+import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
 import numpy.typing as npt
 from annotated_types import Ge
 from typing_extensions import Annotated
 
+if TYPE_CHECKING:
+    from qfmu.model.reduction import Reduction
+
+
+def issparse(m) -> bool:
+    """`scipy.sparse.issparse` without importing scipy.sparse
+
+    Sparse matrices can only exist once scipy.sparse has been imported, dense
+    models never pay for the import.
+    """
+    module = sys.modules.get("scipy.sparse")
+    return module is not None and module.issparse(m)
+
+
+def to_dense(m) -> np.ndarray:
+    """Return `m` as a dense array, converting `scipy.sparse` matrices"""
+    return m.toarray() if issparse(m) else np.asarray(m)
+
+
+def nonzero_columns(m) -> List[np.ndarray]:
+    """Column indices of the nonzero entries of each row of `m`"""
+    if not issparse(m):
+        return [np.flatnonzero(row) for row in np.asarray(m)]
+
+    from scipy import sparse
+
+    m = sparse.csr_matrix(m, copy=True)
+    m.eliminate_zeros()
+    m.sort_indices()
+    return [m.indices[m.indptr[i] : m.indptr[i + 1]] for i in range(m.shape[0])]
+
 
 @dataclass
 class VR0:
@@ -28,7 +60,25 @@ class VR:
     y: np.ndarray
 
 
+@dataclass
+class Dependencies:
+    """Value references each unknown depends on, one list per unknown"""
+
+    derivatives: List[List[int]]
+    outputs: List[List[int]]
+    initial_states: List[List[int]]
+    initial_derivatives: List[List[int]]
+    initial_outputs: List[List[int]]
+
+
 class LTI(ABC):
+    """Linear time-invariant model
+
+    Continuous-time unless a sample time `Ts` is given, the model is then the
+    difference equation x[k+1] = A x[k] + B u[k], y[k] = C x[k] + D u[k] with
+    the samples at t = k * Ts.
+    """
+
     def __init__(
         self,
         nx: Annotated[int, Ge(0)],
@@ -36,10 +86,15 @@ class LTI(ABC):
         ny: Annotated[int, Ge(0)],
         x0: Optional[npt.NDArray[np.float64]] = None,
         u0: Optional[npt.NDArray[np.float64]] = None,
+        Ts: Optional[float] = None,
     ) -> None:
         self._nx = nx
         self._nu = nu
         self._ny = ny
+        self._Ts = None if Ts is None else float(Ts)
+
+        if self._Ts is not None and not self._Ts > 0.0:
+            raise ValueError("Ts must be greater than zero")
 
         self._x0 = np.zeros(nx, dtype=float) if x0 is None else x0
         self._u0 = np.zeros(nu, dtype=float) if u0 is None else u0
@@ -88,6 +143,14 @@ class LTI(ABC):
             y=np.array(range(self.vr0.y, self.nr), dtype=int),
         )
 
+    @property
+    def Ts(self) -> Optional[float]:
+        """Sample time of a discrete-time model, None if continuous-time"""
+        return self._Ts
+
+    def is_discrete(self) -> bool:
+        return self._Ts is not None
+
     def has_states(self) -> bool:
         return self.nx > 0
 
@@ -120,3 +183,79 @@ class LTI(ABC):
     @abstractmethod
     def D(self) -> np.ndarray:
         raise NotImplementedError("D not implemented")
+
+    def discretize(self, dt: float, foh: bool = False) -> Tuple[np.ndarray, ...]:
+        """Zero-order-hold discretization with sample time `dt`
+
+        Returns (Ad, Bd) such that x(t + dt) = Ad x(t) + Bd u(t) holds exactly
+        for inputs that are constant over the sample interval. With `foh`,
+        returns (Ad, Bd, Bd1) such that x(t + dt) = Ad x(t) + Bd u(t) + Bd1 du
+        holds exactly for inputs u(t) + s du that change linearly over it.
+        """
+        if dt <= 0.0:
+            raise ValueError("dt must be greater than zero")
+        if self.is_discrete():
+            raise ValueError("Discrete-time models cannot be discretized")
+
+        # scipy.linalg is only needed by zoh builds, keep it off the import path
+        from scipy import linalg
+
+        nx, nu = self.nx, self.nu
+        nz = nx + 2 * nu if foh else nx + nu
+        M = np.zeros((nz, nz), dtype=float)
+        M[:nx, :nx] = to_dense(self.A)
+        M[:nx, nx : nx + nu] = to_dense(self.B)
+        if not foh:
+            E = linalg.expm(M * dt)
+            return E[:nx, :nx], E[:nx, nx:]
+
+        # The third block row integrates the input slope once more
+        M[nx : nx + nu, nx + nu :] = np.eye(nu)
+        E = linalg.expm(M * dt)
+        return E[:nx, :nx], E[:nx, nx : nx + nu], E[:nx, nx + nu :]
+
+    def reduce(self, method: str) -> Tuple["LTI", "Reduction"]:
+        """Reduced order model, see `qfmu.model.reduction.reduce_model`
+
+        `method` is "minreal", "balred:N" or an error tolerance. Returns the
+        reduced state space model and the achieved error bound.
+        """
+        from qfmu.model.reduction import reduce_model
+
+        return reduce_model(self, method)
+
+    def realize(self, form: str) -> "LTI":
+        """Equivalent model in the state coordinates `form`, "modal" or "schur"
+
+        See `qfmu.model.realization`, x0 and C are mapped to the new states.
+        """
+        from qfmu.model.realization import realize
+
+        return realize(self, form)
+
+    @property
+    def dependencies(self) -> Dependencies:
+        """Structure of the Jacobian, derived from the nonzero pattern of A, B, C, D
+
+        At runtime the derivatives and outputs depend on the states and inputs.
+        During initialization, the states are taken from the x0 parameters and
+        the inputs may be reset to the u0 parameters.
+        """
+        vr = self.vr
+        A, B = nonzero_columns(self.A), nonzero_columns(self.B)
+        C, D = nonzero_columns(self.C), nonzero_columns(self.D)
+
+        def deps(*parts: np.ndarray) -> List[int]:
+            return sorted(np.concatenate(parts).astype(int).tolist())
+
+        return Dependencies(
+            derivatives=[deps(vr.x[A[i]], vr.u[B[i]]) for i in range(self.nx)],
+            outputs=[deps(vr.x[C[i]], vr.u[D[i]]) for i in range(self.ny)],
+            initial_states=[[int(vr.x0[i])] for i in range(self.nx)],
+            initial_derivatives=[
+                deps(vr.x0[A[i]], vr.u[B[i]], vr.u0[B[i]]) for i in range(self.nx)
+            ],
+            initial_outputs=[
+                deps(vr.x0[C[i]], vr.u[D[i]], vr.u0[D[i]]) for i in range(self.ny)
+            ],
+        )
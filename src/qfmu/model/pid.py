@@ -3,9 +3,10 @@ import math
 from typing import Optional
 
 import numpy as np
-from scipy import signal
 
+from qfmu.model.convert import parallel, tf2ss
 from qfmu.model.lti import LTI
+from qfmu.model.ss import StateSpace
 
 
 class PID(LTI):
@@ -25,43 +26,38 @@ class PID(LTI):
         if has_D and math.isclose(T, 0.0) or T < 0.0:
             raise ValueError("T must be greater than zero")
 
-        P = signal.TransferFunction([kp], [1.0]) if has_P else None  # noqa: E741
-        I = signal.TransferFunction([ki], [1.0, 0.0]) if has_I else None  # noqa: E741
-        D = (  # noqa: E741
-            signal.TransferFunction([kd, 0.0], [T, 1.0]) if has_D else None
-        )
+        # Transfer functions as (num, den)
+        P = ([kp], [1.0]) if has_P else None  # noqa: E741
+        I = ([ki], [1.0, 0.0]) if has_I else None  # noqa: E741
+        D = ([kd, 0.0], [T, 1.0]) if has_D else None  # noqa: E741
 
         if sum([has_P, has_I, has_D]) == 0:
             raise ValueError("At least one of kp, ki, kd must be non-zero")
         elif sum([has_P, has_I, has_D]) == 1:
-            self.m = (
-                P.to_ss()
-                if P is not None
-                else I.to_ss()
-                if I is not None
-                else D.to_ss()
-            )
+            abcd = tf2ss(*(P if P is not None else I if I is not None else D))
         elif sum([has_P, has_I, has_D]) == 2:
             if has_P and has_I:
-                self.m = signal.TransferFunction([kp, ki], [1.0, 0.0]).to_ss()
+                abcd = tf2ss([kp, ki], [1.0, 0.0])
             elif has_P and has_D:
-                self.m = signal.TransferFunction([kp * T + kd, kd], [T, 1.0]).to_ss()
+                abcd = tf2ss([kp * T + kd, kd], [T, 1.0])
             else:
-                self.m = I.to_ss() + D.to_ss()
+                abcd = parallel(tf2ss(*I), tf2ss(*D))
         else:
-            self.m = signal.TransferFunction([kp, ki], [1.0, 0.0]).to_ss() + D.to_ss()
+            abcd = parallel(tf2ss([kp, ki], [1.0, 0.0]), tf2ss(*D))
+        self.m = StateSpace(*abcd)
 
+        nx = self.m.A.shape[0]
         super().__init__(
-            self.m.A.shape[0],
+            nx,
             1,
             1,
-            x0 if x0 is not None else np.zeros(self.m.A.shape[0]),
+            x0 if x0 is not None else np.zeros(nx),
             np.array([u0]) if u0 is not None else np.zeros(1),
         )
 
-        logging.info(f"P = {P}")
-        logging.info(f"I = {I}")
-        logging.info(f"D = {D}")
+        for name, tf in (("P", P), ("I", I), ("D", D)):
+            if tf is not None:
+                logging.info(f"{name}: num = {tf[0]}, den = {tf[1]}")
 
     @property
     def A(self) -> np.ndarray:
@@ -0,0 +1,128 @@
+"""State coordinates of the generated code
+
+The companion forms of `tf2ss` and `zpk2ss` are dense and badly conditioned.
+A similarity transform x = T z changes the states of a model, not its
+input-output behavior: A, B, C and x0 become T^-1 A T, T^-1 B, C T and
+T^-1 x0.
+
+- modal: real block-diagonal form with 1x1 blocks [a] for real eigenvalues and
+  2x2 blocks [[s, w], [-w, s]] for the complex pairs s +/- iw. The generated
+  code propagates each block on its own, O(nx) instead of O(nx^2).
+- schur: real Schur form, quasi upper triangular with an orthogonal T, for
+  models whose eigenvectors are nearly dependent.
+"""
+
+import logging
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+from qfmu.model.lti import LTI, issparse, to_dense
+from qfmu.options import REALIZATIONS
+
+if TYPE_CHECKING:
+    from qfmu.model.ss import StateSpace
+
+# Largest condition number of the eigenvector matrix of the modal form
+MAX_MODAL_CONDITION = 1.0 / np.sqrt(np.finfo(float).eps)
+
+
+def modal_form(
+    A: np.ndarray, B: np.ndarray, C: np.ndarray, x0: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Real modal form of (A, B, C) and its initial state `x0`"""
+    from scipy import linalg
+
+    n = A.shape[0]
+    w, V = linalg.eig(A)
+    T = np.zeros((n, n))
+    Am = np.zeros((n, n))
+    i = 0
+    while i < n:
+        if w[i].imag == 0.0:
+            T[:, i] = V[:, i].real
+            Am[i, i] = w[i].real
+            i += 1
+        else:
+            # LAPACK returns s + iw, w > 0, followed by its conjugate. With
+            # v = a + ib, A [a, b] = [a, b] [[s, w], [-w, s]]
+            v = V[:, i] / np.linalg.norm(V[:, i])
+            T[:, i], T[:, i + 1] = v.real, v.imag
+            Am[i, i] = Am[i + 1, i + 1] = w[i].real
+            Am[i, i + 1], Am[i + 1, i] = w[i].imag, -w[i].imag
+            i += 2
+
+    condition = np.linalg.cond(T)
+    if not condition <= MAX_MODAL_CONDITION:
+        raise ValueError(
+            f"A is close to defective, the condition number of its eigenvectors "
+            f"is {condition:.3g}, use the schur realization instead"
+        )
+    logging.info(f"Modal form with eigenvector condition number {condition:.3g}")
+    lu = linalg.lu_factor(T)
+    return Am, linalg.lu_solve(lu, B), C @ T, linalg.lu_solve(lu, x0)
+
+
+def schur_form(
+    A: np.ndarray, B: np.ndarray, C: np.ndarray, x0: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Real Schur form of (A, B, C) and its initial state `x0`"""
+    from scipy import linalg
+
+    As, Z = linalg.schur(A, output="real")
+    return As, Z.T @ B, C @ Z, Z.T @ x0
+
+
+def modal_blocks(A) -> Optional[List[int]]:
+    """Sizes of the diagonal blocks of `A` if it is in real modal form, else None
+
+    Dense and `scipy.sparse` matrices are accepted, a diagonal matrix has only
+    1x1 blocks.
+    """
+    n = A.shape[0]
+    diag, upper, lower = (np.asarray(A.diagonal(k)) for k in (0, 1, -1))
+    nnz = A.count_nonzero() if issparse(A) else np.count_nonzero(A)
+    if nnz != sum(np.count_nonzero(d) for d in (diag, upper, lower)):
+        return None
+
+    blocks = []
+    i = 0
+    while i < n:
+        if i + 1 < n and (upper[i] != 0.0 or lower[i] != 0.0):
+            is_pair = diag[i] == diag[i + 1] and upper[i] == -lower[i]
+            # The block must not be coupled to the next state
+            if not is_pair or (i + 2 < n and (upper[i + 1] or lower[i + 1])):
+                return None
+            blocks.append(2)
+            i += 2
+        else:
+            blocks.append(1)
+            i += 1
+    return blocks
+
+
+def band(m) -> np.ndarray:
+    """Diagonal, upper and lower diagonal of `m` as the rows of a (3, n) array
+
+    The off-diagonals are padded with a trailing zero.
+    """
+    n = m.shape[0]
+    rows = np.zeros((3, n))
+    for row, k in zip(rows, (0, 1, -1)):
+        d = np.asarray(m.diagonal(k))
+        row[: len(d)] = d
+    return rows
+
+
+def realize(model: LTI, form: str) -> "StateSpace":
+    """State space model of `model` in the coordinates `form`, see REALIZATIONS"""
+    from qfmu.model.ss import StateSpace
+
+    if form not in REALIZATIONS:
+        raise ValueError(f"Unknown realization {form}, expected one of {REALIZATIONS}")
+    A, B, C, D = (to_dense(getattr(model, name)) for name in "ABCD")
+    x0 = np.asarray(model.x0, dtype=float)
+    if model.nx > 0:
+        transform = modal_form if form == "modal" else schur_form
+        A, B, C, x0 = transform(A, B, C, x0)
+    return StateSpace(A, B, C, D, x0=x0, u0=model.u0, Ts=model.Ts)
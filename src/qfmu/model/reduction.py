@@ -0,0 +1,204 @@
+"""Model order reduction before code generation
+
+`minreal` removes the uncontrollable and unobservable states with orthogonal
+projections, the input-output behavior is unchanged. Balanced truncation
+(`balred:N`, or an error tolerance) keeps the states with the largest Hankel
+singular values of a stable model. The H-infinity norm of the error is then
+bounded by twice the sum of the discarded Hankel singular values. The
+Gramians of discrete-time models solve the discrete Lyapunov equations.
+
+A nonzero initial state is treated as an additional input, so that the free
+response of the model is kept as well.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+import numpy as np
+
+from qfmu.model.lti import LTI, to_dense
+
+if TYPE_CHECKING:
+    from qfmu.model.ss import StateSpace
+
+# Relative tolerance below which a direction is neither reachable nor
+# observable, same default as MATLAB's minreal
+MINREAL_TOL = np.sqrt(np.finfo(float).eps)
+
+
+@dataclass
+class Reduction:
+    """Outcome of reducing a model, see `reduce_model`
+
+    `error_bound` bounds the H-infinity norm of the difference between the
+    full and the reduced model, `hsv` holds the Hankel singular values of the
+    full model for balanced truncation.
+    """
+
+    method: str
+    nx_before: int
+    nx_after: int
+    error_bound: float
+    hsv: List[float] = field(default_factory=list)
+
+
+def parse_method(method: Union[str, float]) -> Tuple[str, Optional[int], float]:
+    """Split `method` into its kind, the number of states and the tolerance
+
+    `method` is "minreal", "balred:N" or an error tolerance.
+    """
+    text = str(method).strip()
+    if text == "minreal":
+        return "minreal", None, 0.0
+    if text.startswith("balred:"):
+        try:
+            order = int(text[len("balred:") :])
+        except ValueError:
+            order = -1
+        if order < 0:
+            raise ValueError(f"Invalid reduction {text!r}, expected balred:N, N >= 0")
+        return "balred", order, 0.0
+    try:
+        tol = float(text)
+    except ValueError:
+        raise ValueError(
+            f"Unknown reduction {text!r}, expected minreal, balred:N or a tolerance"
+        ) from None
+    if not tol >= 0.0:
+        raise ValueError(f"Invalid reduction tolerance {tol}, expected >= 0")
+    return "balred", None, tol
+
+
+def _reachable_basis(A: np.ndarray, B: np.ndarray, tol: float) -> np.ndarray:
+    """Orthonormal basis of the smallest A-invariant subspace containing range(B)
+
+    Block Krylov iteration with reorthogonalization, new directions whose norm
+    is below `tol` are dropped.
+    """
+    n = A.shape[0]
+    V = np.zeros((n, 0))
+    W = B
+    while V.shape[1] < n and W.shape[1] > 0:
+        for _ in range(2):
+            W = W - V @ (V.T @ W)
+        U, s, _ = np.linalg.svd(W, full_matrices=False)
+        rank = int(np.sum(s > tol))
+        if rank == 0:
+            break
+        new = U[:, :rank]
+        V = np.hstack((V, new))
+        W = A @ new
+    return V
+
+
+def _gramian_factor(A: np.ndarray, BB: np.ndarray, discrete: bool) -> np.ndarray:
+    """L with L L^T = P, where A P + P A^T + BB = 0, or A P A^T - P + BB = 0"""
+    from scipy import linalg
+
+    if discrete:
+        P = linalg.solve_discrete_lyapunov(A, BB)
+    else:
+        P = linalg.solve_continuous_lyapunov(A, -BB)
+    w, U = np.linalg.eigh((P + P.T) / 2.0)
+    return U * np.sqrt(np.clip(w, 0.0, None))
+
+
+def minreal(
+    A: np.ndarray, B: np.ndarray, C: np.ndarray, x0: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Minimal realization of (A, B, C) and its initial state `x0`"""
+    scale = max(np.linalg.norm(m, 2) if m.size else 0.0 for m in (A, B, C))
+    tol = MINREAL_TOL * max(scale, np.linalg.norm(x0))
+    # Reachable subspace from the inputs and the initial state
+    V = _reachable_basis(A, np.column_stack((B, x0)), tol)
+    A, B, C, x0 = V.T @ A @ V, V.T @ B, C @ V, V.T @ x0
+    # Observable subspace of the reachable part
+    W = _reachable_basis(A.T, C.T, tol)
+    return W.T @ A @ W, W.T @ B, C @ W, W.T @ x0
+
+
+def balanced_truncation(
+    A: np.ndarray,
+    B: np.ndarray,
+    C: np.ndarray,
+    x0: np.ndarray,
+    order: Optional[int] = None,
+    tol: float = 0.0,
+    discrete: bool = False,
+) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+    """Balanced truncation of (A, B, C) with the square root method
+
+    Keeps `order` states, or the fewest states whose error bound does not
+    exceed `tol`. States with a zero Hankel singular value are always removed.
+    Returns the reduced matrices and initial state, and the Hankel singular
+    values. The eigenvalues of a stable `discrete` model are inside the unit
+    circle.
+    """
+    from scipy import linalg
+
+    eigvals = linalg.eigvals(A)
+    if np.any(np.abs(eigvals) >= 1.0 if discrete else eigvals.real >= 0.0):
+        raise ValueError(
+            "Balanced truncation requires a stable model, use minreal instead"
+        )
+
+    Bx = np.column_stack((B, x0)) if np.any(x0) else B
+    Lc = _gramian_factor(A, Bx @ Bx.T, discrete)
+    Lo = _gramian_factor(A.T, C.T @ C, discrete)
+    Z, hsv, Yt = linalg.svd(Lo.T @ Lc)
+
+    # Bound of the error when keeping r states, for r = 0..n
+    tail = 2.0 * np.concatenate((np.cumsum(hsv[::-1])[::-1], [0.0]))
+    if order is None:
+        order = int(np.flatnonzero(tail <= tol)[0])
+    nonzero = int(np.sum(hsv > hsv[0] * A.shape[0] * np.finfo(float).eps))
+    r = min(order, nonzero)
+
+    scale = hsv[:r] ** -0.5
+    T = (Lc @ Yt[:r].T) * scale
+    Ti = scale[:, np.newaxis] * (Z[:, :r].T @ Lo.T)
+    return (Ti @ A @ T, Ti @ B, C @ T, Ti @ x0), hsv
+
+
+def reduce_model(
+    model: LTI, method: Union[str, float]
+) -> Tuple["StateSpace", Reduction]:
+    """Reduced order state space model of `model`
+
+    `method` is "minreal", "balred:N" to keep N states, or the largest
+    acceptable error bound. The matrices of the reduced model are dense.
+    """
+    from qfmu.model.ss import StateSpace
+
+    kind, order, tol = parse_method(method)
+    A, B, C, D = (to_dense(getattr(model, name)) for name in "ABCD")
+    x0 = np.asarray(model.x0, dtype=float)
+
+    hsv = np.zeros(0)
+    if model.nx == 0:
+        Ar, Br, Cr, x0r = A, B, C, x0
+    elif kind == "minreal":
+        Ar, Br, Cr, x0r = minreal(A, B, C, x0)
+    else:
+        (Ar, Br, Cr, x0r), hsv = balanced_truncation(
+            A, B, C, x0, order, tol, model.is_discrete()
+        )
+    nx = Ar.shape[0]
+    error_bound = 2.0 * float(np.sum(hsv[nx:]))
+
+    reduction = Reduction(str(method), model.nx, nx, error_bound, hsv.tolist())
+    logging.info(
+        f"Reduced {model.nx} to {nx} states with {reduction.method}, "
+        f"error bound {error_bound:.6g}"
+    )
+    reduced = StateSpace(
+        Ar.reshape(nx, nx),
+        Br.reshape(nx, model.nu),
+        Cr.reshape(model.ny, nx),
+        D,
+        x0=x0r.reshape(nx),
+        u0=model.u0,
+        Ts=model.Ts,
+    )
+    return reduced, reduction
@@ -1,27 +1,70 @@
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Union
 
 import numpy as np
 import numpy.typing as npt
-from scipy import signal
 
-from qfmu.model.lti import LTI
+from qfmu.model.convert import abcd_normalize
+from qfmu.model.lti import LTI, issparse
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+Matrix = Union[npt.NDArray[np.float64], "sparse.spmatrix"]
+
+
+def _sparse_abcd_normalize(
+    A: Optional[Matrix],
+    B: Optional[Matrix],
+    C: Optional[Matrix],
+    D: Optional[Matrix],
+):
+    """Sparse counterpart of `abcd_normalize`
+
+    Missing matrices are filled with zeros, all matrices are returned in CSR
+    format.
+    """
+    from scipy import sparse
+
+    nx = A.shape[0] if A is not None else B.shape[0] if B is not None else C.shape[1]
+    nu = B.shape[1] if B is not None else D.shape[1] if D is not None else 0
+    ny = C.shape[0] if C is not None else D.shape[0] if D is not None else 0
+
+    A, B, C, D = (
+        sparse.csr_matrix(m, dtype=float) if m is not None else sparse.csr_matrix(shape)
+        for m, shape in zip((A, B, C, D), ((nx, nx), (nx, nu), (ny, nx), (ny, nu)))
+    )
+
+    if A.shape != (nx, nx):
+        raise ValueError("A must be square")
+    if B.shape != (nx, nu):
+        raise ValueError("B has invalid shape")
+    if C.shape != (ny, nx):
+        raise ValueError("C has invalid shape")
+    if D.shape != (ny, nu):
+        raise ValueError("D has invalid shape")
+
+    return A, B, C, D
 
 
 class StateSpace(LTI):
-    """Continuous-time state space system"""
+    """State space system, discrete-time if a sample time `Ts` is given"""
 
     def __init__(
         self,
-        A: Optional[npt.NDArray[np.float64]] = None,
-        B: Optional[npt.NDArray[np.float64]] = None,
-        C: Optional[npt.NDArray[np.float64]] = None,
-        D: Optional[npt.NDArray[np.float64]] = None,
+        A: Optional[Matrix] = None,
+        B: Optional[Matrix] = None,
+        C: Optional[Matrix] = None,
+        D: Optional[Matrix] = None,
         x0: Optional[npt.NDArray[np.float64]] = None,
         u0: Optional[npt.NDArray[np.float64]] = None,
+        Ts: Optional[float] = None,
     ) -> None:
         """
         State space system constructor
+
+        A, B, C and D can be given as dense arrays or as `scipy.sparse`
+        matrices. If any of them is sparse, all four are kept in CSR format.
         """
         if all([A is None, B is None, C is None, D is None]):
             raise ValueError("A, B, C, D matrices cannot be all None")
@@ -42,27 +85,35 @@ class StateSpace(LTI):
         elif all([A is not None, C is not None, B is None, D is None]):
             B = np.zeros((A.shape[0], 0))
 
-        self.m = signal.StateSpace(A, B, C, D)
-        nx, nu, ny = self.m.A.shape[0], self.m.inputs, self.m.outputs
-        super().__init__(nx=nx, nu=nu, ny=ny, x0=x0, u0=u0)
+        if any(issparse(m) for m in (A, B, C, D)):
+            self._A, self._B, self._C, self._D = _sparse_abcd_normalize(A, B, C, D)
+            nx, nu, ny = self._A.shape[0], self._B.shape[1], self._C.shape[0]
+            for name, mat in zip("ABCD", (self._A, self._B, self._C, self._D)):
+                logging.info(
+                    f"{name}[{mat.shape[0]}, {mat.shape[1]}] with {mat.nnz} nonzeros"
+                )
+        else:
+            self._A, self._B, self._C, self._D = abcd_normalize(A, B, C, D)
+            nx, nu, ny = self._A.shape[0], self._B.shape[1], self._C.shape[0]
+            for name, mat in zip("ABCD", (self._A, self._B, self._C, self._D)):
+                # Large matrices are summarized rather than printed in full
+                values = mat.tolist() if mat.size <= 1000 else np.array2string(mat)
+                logging.info(f"{name}[{mat.shape[0]}, {mat.shape[1]}] = {values}")
 
-        logging.info(f"A[{self.A.shape[0]}, {self.A.shape[1]}] = {self.A.tolist()}")
-        logging.info(f"B[{self.B.shape[0]}, {self.B.shape[1]}] = {self.B.tolist()}")
-        logging.info(f"C[{self.C.shape[0]}, {self.C.shape[1]}] = {self.C.tolist()}")
-        logging.info(f"D[{self.D.shape[0]}, {self.D.shape[1]}] = {self.D.tolist()}")
+        super().__init__(nx=nx, nu=nu, ny=ny, x0=x0, u0=u0, Ts=Ts)
 
     @property
-    def A(self) -> np.ndarray:
-        return self.m.A
+    def A(self) -> Matrix:
+        return self._A
 
     @property
-    def B(self) -> np.ndarray:
-        return self.m.B
+    def B(self) -> Matrix:
+        return self._B
 
     @property
-    def C(self) -> np.ndarray:
-        return self.m.C
+    def C(self) -> Matrix:
+        return self._C
 
     @property
-    def D(self) -> np.ndarray:
-        return self.m.D
+    def D(self) -> Matrix:
+        return self._D
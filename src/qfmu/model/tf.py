@@ -1,31 +1,59 @@
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 import numpy as np
 import numpy.typing as npt
-from scipy import signal
 
+from qfmu.model.convert import depth, tf2ss, tfm2ss
 from qfmu.model.lti import LTI
 
 
 class TransferFunction(LTI):
+    """Transfer function, or ny x nu matrix of transfer functions
+
+    `num` is a polynomial, or a ny x nu nested list of polynomials with a
+    `den` shared by all entries or nested like `num`. A 2-D `num` is a column
+    with a common denominator, like in `scipy.signal.tf2ss`. Matrices are
+    realized with the states shared between the entries, see `tfm2ss`.
+
+    With a sample time `Ts`, the polynomials are in z instead of s.
+    """
+
     def __init__(
         self,
-        num: npt.NDArray[np.float64],
-        den: npt.NDArray[np.float64],
+        num: Any,
+        den: Any,
         x0: Optional[npt.NDArray[np.float64]] = None,
-        u0: Optional[float] = None,
+        u0: Optional[npt.ArrayLike] = None,
+        Ts: Optional[float] = None,
     ):
-        self._A, self._B, self._C, self._D = signal.tf2ss(num, den)
+        if depth(num) <= 1:
+            self._A, self._B, self._C, self._D = tf2ss(num, den)
+            nu = ny = 1
+        else:
+            if depth(num) == 2:
+                num = [[row] for row in num]
+            self._A, self._B, self._C, self._D = tfm2ss(num, den)
+            ny, nu = self._D.shape
         super().__init__(
             nx=self._A.shape[0],
-            nu=1,
-            ny=1,
+            nu=nu,
+            ny=ny,
             x0=np.array(x0) if x0 is not None else np.zeros(self._A.shape[0]),
-            u0=np.array([u0]) if u0 is not None else np.zeros(1),
+            u0=(
+                np.atleast_1d(np.asarray(u0, dtype=float))
+                if u0 is not None
+                else np.zeros(nu)
+            ),
+            Ts=Ts,
         )
 
-        logging.info(f"{signal.TransferFunction(num, den)}")
+        if nu == ny == 1:
+            logging.info(
+                f"num = {np.asarray(num).tolist()}, den = {np.asarray(den).tolist()}"
+            )
+        else:
+            logging.info(f"{ny}x{nu} transfer function matrix with {self.nx} states")
 
     @property
     def A(self) -> np.ndarray:
@@ -1,32 +1,57 @@
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 import numpy as np
 import numpy.typing as npt
-from scipy import signal
 
+from qfmu.model.convert import zpk2ss, zpk2tf, zpkm2ss
 from qfmu.model.lti import LTI
 
 
 class ZerosPolesGain(LTI):
+    """Zero-pole-gain model, or ny x nu matrix of them
+
+    A matrix `k` gives the gains of the entries, `z` is then a ny x nu nested
+    list of zeros and `p` the poles shared by all entries or nested like `z`.
+    Matrices are realized with the states shared between the entries, see
+    `zpkm2ss`.
+
+    With a sample time `Ts`, the zeros and poles are in the z-plane.
+    """
+
     def __init__(
         self,
-        z: npt.NDArray[np.float64],
-        p: npt.NDArray[np.float64],
-        k: float,
+        z: Any,
+        p: Any,
+        k: npt.ArrayLike,
         x0: Optional[npt.NDArray[np.float64]] = None,
-        u0: Optional[float] = None,
+        u0: Optional[npt.ArrayLike] = None,
+        Ts: Optional[float] = None,
     ):
-        self._A, self._B, self._C, self._D = signal.zpk2ss(z=z, p=p, k=k)
+        if np.ndim(k) == 0:
+            self._A, self._B, self._C, self._D = zpk2ss(z=z, p=p, k=k)
+            nu = ny = 1
+        else:
+            self._A, self._B, self._C, self._D = zpkm2ss(z, p, k)
+            ny, nu = self._D.shape
         super().__init__(
             nx=self._A.shape[0],
-            nu=1,
-            ny=1,
+            nu=nu,
+            ny=ny,
             x0=np.array(x0) if x0 is not None else np.zeros(self._A.shape[0]),
-            u0=np.array([u0]) if u0 is not None else np.zeros(1),
+            u0=(
+                np.atleast_1d(np.asarray(u0, dtype=float))
+                if u0 is not None
+                else np.zeros(nu)
+            ),
+            Ts=Ts,
         )
 
-        logging.info(f"{signal.TransferFunction(*signal.zpk2tf(z, p, k))}")
+        if nu == ny == 1:
+            num, den = zpk2tf(z, p, k)
+            logging.info(f"num = {num.tolist()}, den = {den.tolist()}")
+        else:
+            logging.info(f"{ny}x{nu} zero-pole-gain matrix with {self.nx} states")
 
     @property
     def A(self) -> np.ndarray:
@@ -0,0 +1,47 @@
+"""Choices of the build and simulation options
+
+Kept free of numpy, scipy and jinja2 imports so that the command line
+interface can declare its options without loading them.
+"""
+
+# Model types of the command line, manifests and parameter tables
+MODEL_TYPES = ("ss", "tf", "zpk", "pid")
+
+# Available state update methods for Co-Simulation
+# - euler: forward Euler with fixed step size dt
+# - rk4: classical Runge-Kutta with fixed step size dt
+# - dopri45: adaptive Dormand-Prince 5(4), initial step size dt, honors the
+#   tolerance passed to fmi2SetupExperiment
+# - zoh: exact zero-order-hold discretization, one mat-vec per step
+SOLVERS = ("euler", "rk4", "dopri45", "zoh")
+
+# Compiler optimization profiles
+# - debug: no optimization, with debug symbols
+# - O2: optimized, without multiply-add contraction so that floating point
+#   results match the debug build
+# - O3: aggressive optimization with link-time optimization
+# - native: O3 tuned to the build machine, contracts multiply-adds and
+#   reassociates sums so that inner products vectorize. The shared library
+#   only runs on machines with the same instruction set.
+OPT_PROFILES = ("debug", "O2", "O3", "native")
+
+# Formats of the floating point literals in the generated C code
+# - dec: shortest decimal with 17 significant digits, round-trips exactly
+# - hex: C99 hexadecimal floating point, exact and faster to emit and parse
+FLOAT_FORMATS = ("dec", "hex")
+
+# Supported FMI versions of the generated FMUs
+# - 2: FMI 2.0, one scalar variable per state, input and output
+# - 3: FMI 3.0, states, inputs, outputs and system matrices are array variables
+FMI_VERSIONS = ("2", "3")
+
+# State coordinates of the generated code
+# - modal: real block-diagonal form, each 1x1 or 2x2 block is propagated on
+#   its own
+# - schur: real Schur form, orthogonal transformation for nearly defective A
+REALIZATIONS = ("modal", "schur")
+
+# Available input interpolation methods of the in-process simulation
+# - zoh: inputs are held constant between samples, like in a Co-Simulation FMU
+# - foh: inputs are interpolated linearly between samples, like scipy.signal.lsim
+SIM_SOLVERS = ("zoh", "foh")
@@ -0,0 +1,188 @@
+"""In-process simulation of LTI models, without generating an FMU"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+from scipy import linalg
+
+from qfmu.model.batch import LTIBatch
+from qfmu.model.lti import LTI
+from qfmu.options import SIM_SOLVERS
+
+# Relative tolerance on the sample intervals for a time grid to count as uniform
+UNIFORM_GRID_RTOL = 1e-9
+
+
+def is_uniform(t: np.ndarray) -> bool:
+    """Whether the time grid `t` has a constant sample interval"""
+    dt = np.diff(t)
+    return len(dt) == 0 or np.allclose(dt, dt[0], rtol=UNIFORM_GRID_RTOL, atol=0.0)
+
+
+def _input_array(
+    batch: LTIBatch, t: np.ndarray, u: Optional[npt.ArrayLike]
+) -> np.ndarray:
+    """Input samples as a (batch, len(t), nu) array, `u0` is used if `u` is None
+
+    Inputs of shape (len(t), nu), or (len(t),) for single input models, are
+    shared by all variants.
+    """
+    n, nt, nu = len(batch), len(t), batch.nu
+    if u is None:
+        return np.broadcast_to(batch.u0[:, np.newaxis, :], (n, nt, nu))
+    u = np.asarray(u, dtype=float)
+    if u.ndim == 1 and nu == 1:
+        u = u[:, np.newaxis]
+    if u.shape == (nt, nu):
+        return np.broadcast_to(u, (n, nt, nu))
+    if u.shape != (n, nt, nu):
+        raise ValueError(
+            f"u must have shape ({nt}, {nu}) or ({n}, {nt}, {nu}), got {u.shape}"
+        )
+    return u
+
+
+def _discretize(
+    A: np.ndarray, B: np.ndarray, dt: float, solver: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Exact discretization of a stack of systems over one interval of length `dt`
+
+    Returns (Ad, B0, B1) such that x[k+1] = Ad x[k] + B0 u[k] + B1 u[k+1]. B1 is
+    zero for a zero-order hold. The exponentials of all variants are computed
+    in a single stacked call.
+    """
+    n, nx, nu = B.shape
+    if solver == "zoh":
+        M = np.zeros((n, nx + nu, nx + nu), dtype=float)
+        M[:, :nx, :nx] = A
+        M[:, :nx, nx:] = B
+        E = linalg.expm(M * dt)
+        return E[:, :nx, :nx], E[:, :nx, nx:], np.zeros((n, nx, nu), dtype=float)
+
+    # The third block row integrates the input slope once more
+    M = np.zeros((n, nx + 2 * nu, nx + 2 * nu), dtype=float)
+    M[:, :nx, :nx] = A
+    M[:, :nx, nx : nx + nu] = B
+    M[:, nx : nx + nu, nx + nu :] = np.eye(nu)
+    E = linalg.expm(M * dt)
+    B1 = E[:, :nx, nx + nu :] / dt
+    return E[:, :nx, :nx], E[:, :nx, nx : nx + nu] - B1, B1
+
+
+def _propagate(
+    A: np.ndarray,
+    B: np.ndarray,
+    x0: np.ndarray,
+    t: np.ndarray,
+    u: np.ndarray,
+    solver: str,
+) -> np.ndarray:
+    """State trajectories of a stack of systems, shape (batch, len(t), nx)
+
+    On uniform grids the systems are discretized once and the input
+    contribution of all steps is computed with a single product, only the state
+    recursion remains serial. Otherwise each distinct sample interval is
+    discretized once.
+    """
+    x = np.empty((len(x0), len(t), x0.shape[1]), dtype=float)
+    x[:, 0] = x0
+    if len(t) < 2:
+        return x
+
+    dts = np.diff(t)
+    if is_uniform(t):
+        Ad, B0, B1 = _discretize(A, B, dts[0], solver)
+        w = np.einsum("bij,bkj->bki", B0, u[:, :-1]) + np.einsum(
+            "bij,bkj->bki", B1, u[:, 1:]
+        )
+        for k in range(len(dts)):
+            x[:, k + 1] = np.einsum("bij,bj->bi", Ad, x[:, k]) + w[:, k]
+        return x
+
+    cache: Dict[float, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    for k, dt in enumerate(dts):
+        if dt not in cache:
+            cache[dt] = _discretize(A, B, dt, solver)
+        Ad, B0, B1 = cache[dt]
+        x[:, k + 1] = (
+            np.einsum("bij,bj->bi", Ad, x[:, k])
+            + np.einsum("bij,bj->bi", B0, u[:, k])
+            + np.einsum("bij,bj->bi", B1, u[:, k + 1])
+        )
+    return x
+
+
+def _check_time(t: npt.ArrayLike) -> np.ndarray:
+    t = np.asarray(t, dtype=float)
+    if t.ndim != 1 or len(t) == 0:
+        raise ValueError("t must be a non-empty 1-D array")
+    if np.any(np.diff(t) <= 0.0):
+        raise ValueError("t must be strictly increasing")
+    return t
+
+
+def simulate_batch(
+    batch: LTIBatch,
+    t: npt.ArrayLike,
+    u: Optional[npt.ArrayLike] = None,
+    solver: str = "zoh",
+) -> np.ndarray:
+    """Simulate all variants of `batch` on the time grid `t` at once
+
+    Args:
+        batch: the model variants to simulate, starting from their `x0`
+        t: strictly increasing sample times, not necessarily uniform
+        u: input samples of shape (batch, len(t), nu), or (len(t), nu) to share
+            the inputs between variants. The `u0` of each variant is used if
+            omitted.
+        solver: input interpolation between samples, one of SIM_SOLVERS
+
+    Returns:
+        A structured array of shape (batch, len(t)) with the fields `time`,
+        `y1`, ..., `yn`
+    """
+    if solver not in SIM_SOLVERS:
+        raise ValueError(f"Unknown solver {solver}, expected one of {SIM_SOLVERS}")
+
+    t = _check_time(t)
+    u = _input_array(batch, t, u)
+    x = _propagate(batch.A, batch.B, batch.x0, t, u, solver)
+    y = np.einsum("bij,bkj->bki", batch.C, x) + np.einsum("bij,bkj->bki", batch.D, u)
+
+    names = [f"y{i + 1}" for i in range(batch.ny)]
+    result = np.empty(
+        (len(batch), len(t)), dtype=[(name, np.float64) for name in ["time"] + names]
+    )
+    result["time"] = t
+    for i, name in enumerate(names):
+        result[name] = y[:, :, i]
+    return result
+
+
+def simulate(
+    model: LTI,
+    t: npt.ArrayLike,
+    u: Optional[npt.ArrayLike] = None,
+    solver: str = "zoh",
+) -> np.ndarray:
+    """Simulate `model` on the time grid `t`, starting from its `x0`
+
+    Args:
+        model: the model to simulate
+        t: strictly increasing sample times, not necessarily uniform
+        u: input samples of shape (len(t), nu), or (len(t),) for single input
+            models. The `u0` of the model is used if omitted.
+        solver: input interpolation between samples, one of SIM_SOLVERS
+
+    Returns:
+        A structured array with the fields `time`, `y1`, ..., `yn`, laid out like
+        the results of `fmpy.simulate_fmu`
+    """
+    if u is not None:
+        u = np.asarray(u, dtype=float)
+        if u.ndim == 1 and model.nu == 1:
+            u = u[:, np.newaxis]
+        if u.ndim != 2:
+            raise ValueError(f"u must have shape (len(t), {model.nu}), got {u.shape}")
+    return simulate_batch(LTIBatch.from_models([model]), t, u, solver)[0]
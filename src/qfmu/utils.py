@@ -1,3 +1,4 @@
+import csv
 import datetime
 import json
 import logging
@@ -8,20 +9,115 @@ import subprocess
 import tempfile
 import time
 import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from itertools import repeat
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from qfmu import __include_path__, __platform__, __template_path__, __version__
-from qfmu.codegen.utils import array2cstr
+from qfmu import (
+    __include_path__,
+    __platform__,
+    __platform_tuple__,
+    __template_path__,
+    __version__,
+)
+from qfmu.cache import BuildCache, build_key, key_to_guid, runtime_key
+from qfmu.codegen.utils import (
+    array2cstr,
+    array2xml,
+    density,
+    iter_carray,
+    to_csr,
+    unroll_model,
+)
+from qfmu.model import PID, StateSpace, TransferFunction, ZerosPolesGain
 from qfmu.model.lti import LTI
+from qfmu.model.realization import band, modal_blocks
+from qfmu.model.reduction import Reduction
+from qfmu.options import (
+    FLOAT_FORMATS,
+    FMI_VERSIONS,
+    MODEL_TYPES,
+    OPT_PROFILES,
+    SOLVERS,
+)
+
+# Deflate level of the FMU archives, 0 stores the files uncompressed
+DEFAULT_COMPRESSION = 6
+
+# Models with at most UNROLL_MAX_DIM states, inputs and outputs are generated
+# as straight-line code by default
+UNROLL_MAX_DIM = 10
+
+# Compiler flags of the optimization profiles
+GCC_OPT_FLAGS = {
+    "debug": "-O0 -g",
+    "O2": "-O2 -ffp-contract=off",
+    "O3": "-O3 -ffp-contract=off -flto",
+    "native": "-O3 -march=native -ffp-contract=fast -fno-math-errno "
+    "-fno-trapping-math -fno-signed-zeros -fassociative-math -flto",
+}
+VC_OPT_FLAGS = {
+    "debug": "/Od /Zi",
+    "O2": "/O2 /fp:precise",
+    "O3": "/O2 /Oi /GL /fp:precise",
+    "native": "/O2 /Oi /GL /arch:AVX2 /fp:fast",
+}
+
+# Model types of manifests and parameter tables, the remaining entries are
+# passed to the constructors as keyword arguments
+MODELS = dict(zip(MODEL_TYPES, (StateSpace, TransferFunction, ZerosPolesGain, PID)))
 
-env = Environment(
-    loader=FileSystemLoader(__template_path__),
-    autoescape=select_autoescape(),
-    trim_blocks=True,
+# Manifest entries that are passed to `build_fmu` instead of the model
+BUILD_OPTIONS = (
+    "dt",
+    "solver",
+    "sparse",
+    "float_format",
+    "opt",
+    "unroll",
+    "compression",
+    "fmi_version",
+    "call_logging",
+    "reduce",
+    "realization",
 )
-env.filters["array2cstr"] = array2cstr
+
+# Models with at least SPARSE_MIN_STATES states and an A matrix with a density
+# of at most SPARSE_MAX_DENSITY are generated with CSR matrices by default
+SPARSE_MIN_STATES = 16
+SPARSE_MAX_DENSITY = 0.2
+
+
+@lru_cache(maxsize=None)
+def template_env():
+    """Jinja environment of the FMU templates, created on first use"""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    env = Environment(
+        loader=FileSystemLoader(__template_path__),
+        autoescape=select_autoescape(),
+        trim_blocks=True,
+    )
+    env.filters["array2cstr"] = array2cstr
+    env.filters["array2xml"] = array2xml
+    env.filters["carray"] = iter_carray
+    return env
 
 
 def str_to_mat(data: str) -> np.ndarray:
@@ -38,6 +134,67 @@ def str_to_arr(data: str) -> np.ndarray:
     return m
 
 
+def read_parameter_table(path: pathlib.Path) -> List[Dict[str, Any]]:
+    """Read one set of model parameters per row of a csv file
+
+    The header holds the parameter names. Cells are parsed as json if possible
+    and kept as strings otherwise, lists become arrays, e.g. `"[1, 2]"` for a
+    numerator. Empty cells are omitted so that the parameter keeps its default
+    value.
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    params = []
+    for row in rows:
+        p = {}
+        for name, value in row.items():
+            if value is None or value.strip() == "":
+                continue
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                value = value.strip()
+            p[name.strip()] = _to_array(value)
+        params.append(p)
+    return params
+
+
+def _to_array(value: Any) -> Any:
+    return np.array(value, dtype=float) if isinstance(value, list) else value
+
+
+def read_manifest(path: pathlib.Path) -> List[Dict[str, Any]]:
+    """Read the entries of a json, yaml or csv build manifest
+
+    json and yaml manifests hold a list of entries, or a mapping with the list
+    under `models`. csv manifests hold one entry per row, see
+    `read_parameter_table`.
+    """
+    path = pathlib.Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return read_parameter_table(path)
+    elif suffix == ".json":
+        with open(path) as f:
+            data = json.load(f)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is required to read yaml manifests")
+        with open(path) as f:
+            data = yaml.safe_load(f)
+    else:
+        raise ValueError(f"Unsupported manifest format {path.suffix}")
+
+    if isinstance(data, dict):
+        data = data.get("models")
+    if not isinstance(data, list) or not all(isinstance(e, dict) for e in data):
+        raise ValueError("A manifest must be a list of models")
+    return [{k: _to_array(v) for k, v in entry.items()} for entry in data]
+
+
 def find_vcvarsall_location():
     try:
         # Find vswhere.exe
@@ -75,41 +232,310 @@ def find_vcvarsall_location():
     return None
 
 
-def compile_dll(src_dir: pathlib.Path, identifier: str) -> pathlib.Path:
+def _compiler() -> str:
     if __platform__.startswith("win"):
-        compiler = "vc"
+        return "vc"
     elif __platform__.startswith("darwin"):
-        compiler = "clang"
+        return "clang"
+    return "gcc"
+
+
+def _vcvars() -> str:
+    toolset = "x86_amd64" if "64" in __platform__ else "x86"
+    return rf'call "{find_vcvarsall_location()}" {toolset}'
+
+
+def _check_profile(opt: str) -> None:
+    if opt not in OPT_PROFILES:
+        raise ValueError(f"Unknown profile {opt}, expected one of {OPT_PROFILES}")
+
+
+def _check_fmi_version(fmi_version: str) -> None:
+    if fmi_version not in FMI_VERSIONS:
+        raise ValueError(
+            f"Unknown FMI version {fmi_version}, expected one of {FMI_VERSIONS}"
+        )
+
+
+def runtime_compile_command(
+    opt: str = "O2", fmi_version: str = "2", call_logging: bool = True
+) -> Tuple[str, str]:
+    """Object file name and shell command compiling the FMI runtime with `opt`
+
+    The runtime (include/fmi{fmi_version}Template.c) does not depend on the
+    model, its object is cached and linked with each model compiled with the
+    same profile. Without `call_logging`, FMI calls are not logged, only
+    errors are reported to the logger.
+    """
+    _check_profile(opt)
+    _check_fmi_version(fmi_version)
+    runtime = f"fmi{fmi_version}Template"
+    macros = ["DISABLE_PREFIX"]
+    if not call_logging:
+        macros.append("DISABLE_CALL_LOGGING")
+    compiler = _compiler()
+    if compiler == "vc":
+        target = f"{runtime}.obj"
+        defines = " ".join(f"/D{m}" for m in macros)
+        cmd = _vcvars()
+        cmd += f" && cl /c {VC_OPT_FLAGS[opt]} /I./include {defines} /Fo{target} include\\{runtime}.c"  # noqa: E501
+    elif compiler == "gcc":
+        target = f"{runtime}.o"
+        flags = f"{GCC_OPT_FLAGS[opt]} -fvisibility=hidden"
+        defines = " ".join(f"-D{m}" for m in macros)
+        cmd = f"gcc -c {flags} -I ./include -fPIC {defines} -o {target} include/{runtime}.c"  # noqa: E501
     else:
-        compiler = "gcc"
+        target = f"{runtime}.o"
+        flags = f"{GCC_OPT_FLAGS[opt]} -fvisibility=hidden"
+        defines = " ".join(f"-D{m}" for m in macros)
+        arch = "" if opt == "native" else "-arch x86_64 -arch arm64"
+        cmd = f"clang -c {arch} {flags} -I ./include {defines} -o {target} include/{runtime}.c"  # noqa: E501
+    return target, cmd
+
+
+def compile_command(
+    identifier: str, opt: str = "O2", fmi_version: str = "2"
+) -> Tuple[str, str]:
+    """Shared library file name and shell command compiling it with profile `opt`
+
+    The command compiles the model code and links it with the runtime object
+    of `runtime_compile_command`, which must be in the same folder.
+    """
+    runtime, _ = runtime_compile_command(opt, fmi_version)
+    source = f"fmi{fmi_version}model"
+    compiler = _compiler()
 
     if compiler == "vc":
         target = identifier + ".dll"
-        toolset = "x86_amd64" if "64" in __platform__ else "x86"
-        compiler_options = "/Oy /Ob1 /Oi /LD"
-        cmd = rf'call "{find_vcvarsall_location()}" {toolset}'
-        cmd += f" && cl {compiler_options} /I./include /DDISABLE_PREFIX /Fe{target} shlwapi.lib fmi2model.c"  # noqa: E501
+        compiler_options = f"{VC_OPT_FLAGS[opt]} /LD"
+        cmd = _vcvars()
+        cmd += f" && cl {compiler_options} /I./include /DDISABLE_PREFIX /Fe{target} shlwapi.lib {source}.c {runtime}"  # noqa: E501
     elif compiler == "gcc":
         target = identifier + ".so"
-        cmd = "gcc -c -I ./include -fPIC -DDISABLE_PREFIX fmi2model.c "
-        cmd += f" && gcc -static-libgcc -shared -o{target} *.o -lm"
-    elif "darwin" in __platform__:
+        flags = f"{GCC_OPT_FLAGS[opt]} -fvisibility=hidden"
+        cmd = f"gcc -c {flags} -I ./include -fPIC -DDISABLE_PREFIX {source}.c "
+        cmd += f" && gcc {flags} -static-libgcc -shared -o{target} {source}.o {runtime} -lm"  # noqa: E501
+    else:
         target = identifier + ".dylib"
-        cmd = "clang -c -arch x86_64 -arch arm64 -I ./include -DDISABLE_PREFIX fmi2model.c"  # noqa: E501
-        cmd += f" && clang -shared -arch x86_64 -arch arm64 -o{target} *.o -lm"
+        flags = f"{GCC_OPT_FLAGS[opt]} -fvisibility=hidden"
+        # -march=native only makes sense for the architecture of the build machine
+        arch = "" if opt == "native" else "-arch x86_64 -arch arm64"
+        cmd = f"clang -c {arch} {flags} -I ./include -DDISABLE_PREFIX {source}.c"
+        cmd += f" && clang {flags} -shared {arch} -o{target} {source}.o {runtime} -lm"  # noqa: E501
+
+    return target, cmd
+
+
+@lru_cache(maxsize=None)
+def compiler_version() -> str:
+    """Version banner of the C compiler, empty if it cannot be queried
+
+    Part of the FMU and runtime cache keys, objects compiled with link time
+    optimization cannot be linked by another compiler version. Queried once
+    per process.
+    """
+    compiler = _compiler()
+    if compiler == "vc":
+        # cl is only on the path after running vcvarsall
+        return ""
+    try:
+        proc = subprocess.run(
+            [compiler, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+    except OSError:
+        return ""
+    return proc.stdout.decode(errors="replace")
+
+
+@dataclass
+class CompileResult:
+    """Outcome of one compiler invocation"""
+
+    command: str
+    returncode: int
+    output: str
+    target: pathlib.Path
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and self.target.exists()
+
+
+def run_compiler(src_dir: pathlib.Path, command: str, target: str) -> CompileResult:
+    """Run `command` building `target` in `src_dir`, failures are reported in the
+    result"""
+    # Run in src_dir without changing the working directory of the process, so
+    # that several models can be compiled in parallel
+    proc = subprocess.run(
+        command,
+        shell=True,
+        cwd=src_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    output = proc.stdout.decode(errors="replace")
+    if output:
+        logging.debug(output)
+
+    return CompileResult(command, proc.returncode, output, src_dir / target)
+
+
+def prepare_runtime(
+    src_dir: pathlib.Path,
+    opt: str = "O2",
+    cache: Optional[BuildCache] = None,
+    fmi_version: str = "2",
+    call_logging: bool = True,
+) -> Optional[CompileResult]:
+    """Put the FMI runtime object compiled with profile `opt` into `src_dir`
+
+    The object is copied from `cache` if it holds one, otherwise it is compiled
+    and added to `cache`. Returns the compiler result, None on a cache hit.
+    """
+    target, command = runtime_compile_command(opt, fmi_version, call_logging)
+    key = runtime_key(
+        platform=__platform__, command=command, version=compiler_version()
+    )
+    if cache:
+        cached = cache.get_runtime(key)
+        if cached is not None:
+            shutil.copyfile(cached, src_dir / target)
+            return None
+
+    result = run_compiler(src_dir, command, target)
+    if result.ok and cache:
+        cache.put_runtime(key, result.target)
+    return result
+
+
+def compile_dll(
+    src_dir: pathlib.Path,
+    identifier: str,
+    opt: str = "O2",
+    fmi_version: str = "2",
+    call_logging: bool = True,
+) -> pathlib.Path:
+    for target, command in (
+        runtime_compile_command(opt, fmi_version, call_logging),
+        compile_command(identifier, opt, fmi_version),
+    ):
+        result = run_compiler(src_dir, command, target)
+        if not result.ok:
+            raise Exception(f"Failed to compile shared library\n{result.output}")
+
+    return result.target
+
+
+def is_sparse(model: LTI) -> bool:
+    """Whether `model` benefits from CSR matrix storage"""
+    return model.nx >= SPARSE_MIN_STATES and density(model.A) <= SPARSE_MAX_DENSITY
+
+
+def is_small(model: LTI) -> bool:
+    """Whether `model` benefits from unrolled, constant-folded code"""
+    return max(model.nx, model.nu, model.ny) <= UNROLL_MAX_DIM
+
+
+@dataclass
+class BuildReport:
+    """What happened while building one FMU
+
+    Timings are wall times in seconds per phase, sizes are in bytes. The
+    compiler fields are None when the FMU was copied from the build cache.
+    `runtime_cached` tells whether the compiled FMI runtime was reused and
+    `reduction` holds the states removed and the error bound of `--reduce`.
+    """
+
+    identifier: str
+    output: pathlib.Path
+    guid: str
+    key: str
+    cached: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+    source_size: Optional[int] = None
+    library_size: Optional[int] = None
+    fmu_size: Optional[int] = None
+    compile_command: Optional[str] = None
+    compile_status: Optional[int] = None
+    compile_output: Optional[str] = None
+    runtime_cached: Optional[bool] = None
+    reduction: Optional[Reduction] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.fmu_size is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["output"] = str(self.output)
+        return d
+
+    def write(self, path: pathlib.Path) -> None:
+        """Write the report as JSON to `path`"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class BuildError(Exception):
+    """Failed FMU build, `report` holds what was recorded up to the failure"""
+
+    def __init__(self, message: str, report: BuildReport) -> None:
+        super().__init__(message)
+        self.report = report
+
+
+@contextmanager
+def atomic_write(path: pathlib.Path) -> Iterator[BinaryIO]:
+    """Binary file that replaces `path` once it is completely written
+
+    Concurrent builds of the same FMU never see a partially written file.
+    """
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "xb") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+
+def package_fmu(
+    path: pathlib.Path,
+    description: str,
+    library: pathlib.Path,
+    src_dir: pathlib.Path,
+    compression: int = DEFAULT_COMPRESSION,
+    platform: str = __platform__,
+) -> None:
+    """Write the FMU archive of the compiled `library` and the sources in `src_dir`
+
+    The entries are written straight into the archive, which replaces `path`
+    atomically. `compression` is the deflate level, 0 stores the entries.
+    `platform` is the folder of the library below binaries/, FMI 3 FMUs use
+    the platform tuple.
+    """
+    if compression not in range(10):
+        raise ValueError(f"Invalid compression level {compression}, expected 0-9")
+    if compression == 0:
+        options = dict(compression=zipfile.ZIP_STORED)
     else:
-        raise RuntimeError("Unknown compiler")
+        options = dict(compression=zipfile.ZIP_DEFLATED, compresslevel=compression)
 
-    wd = os.getcwd()
-    os.chdir(src_dir)
-    status = os.system(cmd)
-    os.chdir(wd)
+    with atomic_write(path) as f, zipfile.ZipFile(f, "w", **options) as fmu:
+        fmu.writestr("modelDescription.xml", description)
+        fmu.write(library, f"binaries/{platform}/{library.name}")
+        for source in sorted(src_dir.rglob("*")):
+            if source.suffix in (".c", ".h"):
+                fmu.write(source, f"sources/{source.relative_to(src_dir).as_posix()}")
 
-    dll_path = src_dir / target
-    if status != 0 or not dll_path.exists():
-        raise Exception("Failed to compile shared library")
 
-    return dll_path
+def _lap(timings: Dict[str, float], phase: str, start: float) -> float:
+    """Add the time since `start` to `phase`, return the current time"""
+    now = time.perf_counter()
+    timings[phase] = timings.get(phase, 0.0) + now - start
+    return now
 
 
 def build_fmu(
@@ -117,70 +543,315 @@ def build_fmu(
     output: pathlib.Path = pathlib.Path("."),
     identifier: str = "model",
     dt: float = 0.001,
-) -> None:
-    _guid = str(uuid.uuid1())
+    solver: str = "euler",
+    sparse: Optional[bool] = None,
+    float_format: str = "dec",
+    cache: Union[bool, BuildCache] = False,
+    opt: str = "O2",
+    unroll: Optional[bool] = None,
+    compression: int = DEFAULT_COMPRESSION,
+    fmi_version: str = "2",
+    call_logging: bool = True,
+    reduce: Optional[str] = None,
+    realization: Optional[str] = None,
+) -> BuildReport:
+    """Generate, compile and package the FMU of `model`
+
+    Returns a report with the time spent in each phase (reduce, realize, key,
+    render, includes, runtime, compile, description, zip, cache and total),
+    the size of the generated source, library and FMU, and the compiler
+    command and exit status. Raises BuildError carrying the partial report if
+    the compilation fails.
+
+    With `cache`, an identical FMU is copied from the build cache instead of
+    being built, and the compiled FMI runtime is reused across models. `True`
+    uses the BuildCache in the default cache directory, otherwise nothing is
+    written outside `output`.
+
+    `compression` is the deflate level of the FMU archive, 0 stores the files
+    uncompressed, which is the fastest for local builds.
+
+    `fmi_version` "3" generates an FMI 3.0 FMU that exposes the states,
+    derivatives, inputs, outputs and the system matrices as array variables,
+    whatever the storage of the matrices.
+
+    Without `call_logging`, the FMU does not log the FMI calls and skips the
+    per-call logging checks, errors are still reported to the logger.
+
+    `reduce` reduces the order of the model before code generation, it is
+    "minreal", "balred:N" to keep N states, or the largest acceptable error
+    bound, see `qfmu.model.reduction`.
+
+    `realization` transforms the states to the "modal" or "schur" coordinates,
+    see `qfmu.model.realization`. Models whose A is block-diagonal, like the
+    modal form, are propagated block by block in O(nx) unless unrolled.
+
+    Discrete-time models are updated with their difference equation once per
+    sample instant, `dt` and `solver` are ignored and the FMU is Co-Simulation
+    only.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver {solver}, expected one of {SOLVERS}")
+    if float_format not in FLOAT_FORMATS:
+        raise ValueError(
+            f"Unknown float format {float_format}, expected one of {FLOAT_FORMATS}"
+        )
+    if compression not in range(10):
+        raise ValueError(f"Invalid compression level {compression}, expected 0-9")
+    _check_fmi_version(fmi_version)
+
+    start = clock = time.perf_counter()
+    timings: Dict[str, float] = {}
+    reduction = None
+    if reduce is not None:
+        model, reduction = model.reduce(reduce)
+        clock = _lap(timings, "reduce", clock)
+    if realization is not None:
+        model = model.realize(realization)
+        clock = _lap(timings, "realize", clock)
+    if model.is_discrete():
+        solver, dt = "discrete", model.Ts
+    if unroll is None:
+        unroll = is_small(model)
+    modal = not unroll and model.has_states() and modal_blocks(model.A) is not None
+    if sparse is None:
+        sparse = is_sparse(model) and not modal
+
+    target, command = compile_command(identifier, opt, fmi_version)
+    # The GUID is derived from the content so that cached FMUs stay valid
+    key = build_key(
+        model,
+        identifier=identifier,
+        dt=dt,
+        solver=solver,
+        sparse=sparse,
+        float_format=float_format,
+        unroll=unroll,
+        compression=compression,
+        fmi_version=fmi_version,
+        call_logging=call_logging,
+        platform=__platform__,
+        compile_command=(target, command),
+        version=compiler_version(),
+    )
+    _guid = key_to_guid(key)
+    fmu_path = output.parent / f"{identifier}.fmu"
+    report = BuildReport(
+        identifier,
+        fmu_path,
+        _guid,
+        key,
+        timings=timings,
+        compile_command=command,
+        reduction=reduction,
+    )
+    clock = _lap(timings, "key", clock)
+
+    if cache is True:
+        cache = BuildCache()
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            with atomic_write(fmu_path) as dst, open(cached, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            logging.info(f"FMU copied from the build cache to {output}")
+            _lap(timings, "cache", clock)
+            report.cached = True
+            report.fmu_size = fmu_path.stat().st_size
+            report.timings["total"] = time.perf_counter() - start
+            return report
+
     _datetime = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
 
-    # TODO: Support fmi3 by loading different templates
-    fmu_model_tmpl = env.get_template("fmi2model.jinja")
-    fmu_desc_tmpl = env.get_template("fmi2modelDescription.jinja")
-
-    # TODO: Fix me on Windows
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir = pathlib.Path(tmpdir)
-        # Create folder structure
-        logging.debug(f"Creating folder structure at {tmpdir}")
-        bin_dir = tmpdir / "binaries"
-        bin_dir.mkdir()
-        platform_dir = bin_dir / __platform__
-        platform_dir.mkdir()
-        src_dir = tmpdir / "sources"
-        src_dir.mkdir()
+    # The model code is shared, the runtime and the description are specific
+    # to the FMI version
+    env = template_env()
+    fmu_model_tmpl = env.get_template("model.jinja")
+    fmu_desc_tmpl = env.get_template(f"fmi{fmi_version}modelDescription.jinja")
+
+    # Only the compiler inputs and outputs are written to disk, the FMU is
+    # packaged straight from there
+    with tempfile.TemporaryDirectory() as src_dir:
+        src_dir = pathlib.Path(src_dir)
+
+        # Precompute the discretized system for the default step size
+        Ad, Bd, Bd1 = (
+            model.discretize(dt, foh=True) if solver == "zoh" else (None, None, None)
+        )
+        if modal and Ad is not None:
+            Ad = band(Ad)
+        csr = (
+            {name: to_csr(getattr(model, name)) for name in "ABCD"} if sparse else None
+        )
 
         # Write source files
         logging.debug(f"Writing source files to {src_dir}")
-        fmu_model = fmu_model_tmpl.render(
-            model=model, identifier=identifier, version=__version__, guid=_guid, dt=dt
-        )
-        with open(src_dir / "fmi2model.c", "w") as f:
-            f.write(fmu_model)
+        # Stream the rendered source to disk, large matrices are never held in
+        # memory as a single string
+        source_path = src_dir / f"fmi{fmi_version}model.c"
+        fmu_model_tmpl.stream(
+            model=model,
+            identifier=identifier,
+            version=__version__,
+            guid=_guid,
+            dt=dt,
+            solver=solver,
+            Ad=Ad,
+            Bd=Bd,
+            Bd1=Bd1,
+            sparse=sparse,
+            csr=csr,
+            modal=modal,
+            A_band=band(model.A) if modal else None,
+            unrolled=unroll_model(model, float_format) if unroll else None,
+            float_format=float_format,
+            fmi_version=fmi_version,
+        ).dump(str(source_path))
+        report.source_size = source_path.stat().st_size
+        clock = _lap(timings, "render", clock)
+
         # Copy header files to source folder
         shutil.copytree(__include_path__, src_dir / "include")
+        clock = _lap(timings, "includes", clock)
 
-        # Compile model
+        # Compile the model and link it with the runtime, which is only
+        # compiled if the cache does not hold it yet
         logging.debug("Compiling dll")
-        dll_path = compile_dll(src_dir, identifier=identifier)
-        shutil.move(dll_path, platform_dir / dll_path.name)
+        runtime = prepare_runtime(
+            src_dir, opt, cache or None, fmi_version, call_logging
+        )
+        report.runtime_cached = runtime is None
+        clock = _lap(timings, "runtime", clock)
+        if runtime is not None and not runtime.ok:
+            result = runtime
+        else:
+            result = run_compiler(src_dir, command, target)
+        report.compile_command = result.command
+        report.compile_status = result.returncode
+        report.compile_output = result.output
+        clock = _lap(timings, "compile", clock)
+        if not result.ok:
+            timings["total"] = time.perf_counter() - start
+            raise BuildError(
+                f"Failed to compile shared library\n{result.output}", report
+            )
+        report.library_size = result.target.stat().st_size
 
-        # Write model description
-        logging.debug("Writing model description")
-        fmu_desc = fmu_desc_tmpl.render(
+        # Render model description
+        logging.debug("Rendering model description")
+        description = fmu_desc_tmpl.render(
             model=model,
             identifier=identifier,
             version=__version__,
             guid=_guid,
             datetime=_datetime,
             dt=dt,
+            sparse=sparse,
+            modal=modal,
         )
-        with open(tmpdir / "modelDescription.xml", "w") as f:
-            f.write(fmu_desc)
+        clock = _lap(timings, "description", clock)
 
         # Generate FMU
         logging.debug("Generating FMU")
-        zippath = shutil.make_archive(identifier, "zip", tmpdir)
-        shutil.move(zippath, str(output.parent / f"{identifier}.fmu"))
+        platform = __platform_tuple__ if fmi_version == "3" else __platform__
+        package_fmu(
+            fmu_path, description, result.target, src_dir, compression, platform
+        )
+        report.fmu_size = fmu_path.stat().st_size
+        clock = _lap(timings, "zip", clock)
+        if cache:
+            cache.put(key, fmu_path)
+            _lap(timings, "cache", clock)
 
         logging.info(f"FMU generated successfully at {output}")
 
-        # FIXME:
-        # - vc holds on to files for a while and prevents deletion
-        # - need to delete compiler generated temp files
+        # FIXME: vc holds on to files for a while and prevents deletion
         if __platform__.startswith("win"):
             time.sleep(1)  # thank you windose...
-            # for file in src_dir.glob("*"):
-            #     if file.suffix not in [".c", ".h"]:
-            #         file_path = src_dir / file
-            #         file_path.unlink()
-            #         print(f"Removed file: {file_path}")
 
-        shutil.rmtree(tmpdir)
+    timings["total"] = time.perf_counter() - start
+    return report
+
+
+@dataclass
+class BuildResult:
+    """Outcome of building one manifest entry"""
+
+    name: str
+    output: pathlib.Path
+    error: Optional[str] = None
+    duration: float = 0.0
+    report: Optional[BuildReport] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _build_entry(
+    entry: Dict[str, Any], output_dir: pathlib.Path, cache: Union[bool, BuildCache]
+) -> BuildResult:
+    """Build one manifest entry, errors are reported in the result"""
+    start = time.perf_counter()
+    entry = dict(entry)
+    name = str(entry.pop("name", ""))
+    output = output_dir / f"{name}.fmu"
+    try:
+        if not name:
+            raise ValueError("Missing name")
+        kind = entry.pop("type", None)
+        if kind not in MODELS:
+            raise ValueError(
+                f"Unknown model type {kind!r}, expected one of {tuple(MODELS)}"
+            )
+        options = {k: entry.pop(k) for k in BUILD_OPTIONS if k in entry}
+        m = MODELS[kind](**entry)
+        report = build_fmu(m, output, identifier=name, cache=cache, **options)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return BuildResult(
+            name,
+            output,
+            error,
+            time.perf_counter() - start,
+            e.report if isinstance(e, BuildError) else None,
+        )
+    return BuildResult(name, output, None, time.perf_counter() - start, report)
+
+
+def build_many(
+    entries: Sequence[Dict[str, Any]],
+    output_dir: pathlib.Path = pathlib.Path("."),
+    jobs: Optional[int] = None,
+    threads: bool = False,
+    cache: Union[bool, BuildCache] = False,
+) -> List[BuildResult]:
+    """Build the FMUs of manifest `entries` concurrently
+
+    Each entry holds a `name`, used as identifier and file name, a `type` (one
+    of MODELS), the constructor arguments of the model and optionally the
+    BUILD_OPTIONS. A failing entry is reported in its result and does not stop
+    the other builds.
+
+    Args:
+        entries: manifest entries, e.g. from `read_manifest`
+        output_dir: directory the FMUs are written to
+        jobs: number of parallel builds, the number of CPUs if None
+        threads: use a thread pool instead of a process pool
+        cache: see `build_fmu`
+
+    Returns:
+        One result per entry, in the order of `entries`
+    """
+    names = [str(entry.get("name", "")) for entry in entries]
+    duplicates = sorted({n for n in names if n and names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate names in manifest: {duplicates}")
+
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pool = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with pool(max_workers=jobs) as executor:
+        return list(
+            executor.map(_build_entry, entries, repeat(output_dir), repeat(cache))
+        )
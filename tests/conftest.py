@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def build_cache_dir(tmp_path_factory):
+    """Keep the build cache of the test session out of the user cache directory"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("QFMU_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+        yield
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from qfmu.benchmark import (
+    FMI2_MODEL_EXCHANGE,
+    Fmu,
+    benchmark_model,
+    random_model,
+    real_array,
+)
+from qfmu.utils import build_fmu
+
+
+def test_random_model():
+    m = random_model(20, nu=2, ny=3, density=0.2, seed=3)
+    assert (m.nx, m.nu, m.ny) == (20, 2, 3)
+    assert np.all(np.linalg.eigvals(m.A.toarray()).real < 0.0)
+
+
+def test_benchmark_model():
+    result = benchmark_model(random_model(4, nu=2, ny=2), n_calls=100)
+    assert {"total", "render", "compile", "zip"} <= set(result["build"])
+    assert result["build"]["library_size"] > 0
+    assert result["build"]["compile"] < result["build"]["total"]
+    for name in ["do_step", "get_derivatives", "get_real", "set_real"]:
+        assert result[name] > 0.0
+    assert np.isclose(result["steps_per_second"], 1.0 / result["do_step"])
+
+
+def test_benchmark_reduced_model():
+    # The FMU has fewer states than the model, fmi2GetDerivatives must be timed
+    # with its own number of states
+    result = benchmark_model(random_model(6), n_calls=10, reduce="balred:2")
+    assert result["get_derivatives"] > 0.0
+
+
+def test_failing_call(tmp_path):
+    m = random_model(3)
+    build_fmu(m, tmp_path / "f.fmu", "f")
+    fmu = Fmu(tmp_path / "f.fmu", tmp_path / "f")
+    assert fmu.nx == 3
+    fmu.instantiate(FMI2_MODEL_EXCHANGE)
+    fmu.initialize()
+    with pytest.raises(RuntimeError, match="fmi2GetDerivatives"):
+        fmu.call("fmi2GetDerivatives", real_array([0.0] * 2), 2)
+    fmu.free()
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from qfmu.cli import cli
+from qfmu.utils import BUILD_OPTIONS, build_many, read_manifest
+
+fmpy = pytest.importorskip("fmpy")
+
+ENTRIES = [
+    {"name": "FirstOrder", "type": "tf", "num": [10.0], "den": [1.0, 10.0]},
+    {"name": "Controller", "type": "pid", "kp": 1.0, "ki": 0.5, "solver": "zoh"},
+    {"name": "Poles", "type": "zpk", "z": [], "p": [-1.0, -2.0], "k": 2.0},
+    {"name": "SISO", "type": "ss", "A": [[-1.0]], "B": [[1.0]], "C": [[1.0]]},
+    {"name": "Broken", "type": "pid", "kp": 0.0},
+    {"name": "Unknown", "type": "foo"},
+]
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_build_many(threads, tmp_path):
+    entries = [
+        {k: np.array(v) if isinstance(v, list) else v for k, v in e.items()}
+        for e in ENTRIES
+    ]
+    results = build_many(entries, tmp_path, jobs=4, threads=threads, cache=False)
+
+    assert [r.name for r in results] == [e["name"] for e in ENTRIES]
+    assert [r.ok for r in results] == [True] * 4 + [False] * 2
+    assert "ValueError" in results[4].error
+    assert "foo" in results[5].error
+    for r in results[:4]:
+        description = fmpy.read_model_description(str(r.output))
+        assert description.coSimulation.modelIdentifier == r.name
+        assert r.report.fmu_size == r.output.stat().st_size
+    assert results[4].report is None
+    assert not (tmp_path / "Broken.fmu").exists()
+
+
+def test_duplicate_names(tmp_path):
+    with pytest.raises(ValueError):
+        build_many([ENTRIES[0], ENTRIES[0]], tmp_path)
+
+
+def test_read_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"models": ENTRIES[:2]}))
+    entries = read_manifest(path)
+    assert entries[0]["name"] == "FirstOrder"
+    assert np.array_equal(entries[0]["den"], [1.0, 10.0])
+    assert entries[1]["solver"] == "zoh"
+
+    pytest.importorskip("yaml")
+    path = tmp_path / "manifest.yaml"
+    path.write_text(
+        "- name: FirstOrder\n  type: tf\n  num: [10]\n  den: [1, 10]\n"
+        "- name: Controller\n  type: pid\n  kp: 1.0\n  ki: 0.5\n  solver: zoh\n"
+    )
+    assert read_manifest(path)[1]["ki"] == 0.5
+
+    path = tmp_path / "manifest.csv"
+    path.write_text('name,type,num,den,dt\nFirstOrder,tf,[10],"[1, 10]",0.01\n')
+    entries = read_manifest(path)
+    assert entries[0]["type"] == "tf"
+    assert np.array_equal(entries[0]["num"], [10.0])
+    assert entries[0]["dt"] == 0.01
+
+    with pytest.raises(ValueError):
+        read_manifest(tmp_path / "manifest.txt")
+
+
+def test_cli_build_many(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    output = tmp_path / "fmus"
+    runner = CliRunner()
+
+    manifest.write_text(json.dumps(ENTRIES[:4]))
+    result = runner.invoke(
+        cli, ["build-many", str(manifest), "-j", "2", "-o", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    assert sorted(p.name for p in output.glob("*.fmu")) == sorted(
+        f"{e['name']}.fmu" for e in ENTRIES[:4]
+    )
+
+    manifest.write_text(json.dumps(ENTRIES))
+    result = runner.invoke(cli, ["build-many", str(manifest), "-o", str(output)])
+    assert result.exit_code != 0
+    assert "Broken" in result.output
+
+
+def test_cli_help_lists_build_options():
+    result = CliRunner().invoke(cli, ["build-many", "--help"])
+    assert result.exit_code == 0
+    help_text = " ".join(result.output.split())
+    assert all(option in help_text for option in BUILD_OPTIONS)
@@ -0,0 +1,125 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from scipy import sparse
+
+from qfmu import model
+from qfmu.cache import BuildCache, build_key
+from qfmu.cli import cli
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+A = np.array([[-1.0, 0.0], [1.0, -2.0]])
+B = np.array([[1.0], [0.0]])
+C = np.array([[0.0, 1.0]])
+
+
+def test_cache_hit(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    m = model.StateSpace(A, B, C)
+
+    build_fmu(m, tmp_path / "a.fmu", "a", cache=cache)
+    assert len(list(cache.path.glob("*.fmu"))) == 1
+    guid = fmpy.read_model_description(str(tmp_path / "a.fmu")).guid
+
+    (tmp_path / "a.fmu").unlink()
+    start = time.perf_counter()
+    build_fmu(model.StateSpace(A, B, C), tmp_path / "a.fmu", "a", cache=cache)
+    assert time.perf_counter() - start < 0.5
+    assert fmpy.read_model_description(str(tmp_path / "a.fmu")).guid == guid
+
+    # Without the cache, the same content yields the same GUID
+    (tmp_path / "nocache").mkdir()
+    build_fmu(m, tmp_path / "nocache" / "a.fmu", "a", cache=False)
+    description = fmpy.read_model_description(str(tmp_path / "nocache" / "a.fmu"))
+    assert description.guid == guid
+    assert len(list(cache.path.glob("*.fmu"))) == 1
+
+
+def test_build_key():
+    m = model.StateSpace(A, B, C)
+    key = build_key(m, dt=0.001)
+    assert key == build_key(model.StateSpace(A, B, C), dt=0.001)
+    assert key != build_key(m, dt=0.002)
+    assert key != build_key(model.StateSpace(A, B, 2.0 * C), dt=0.001)
+    assert key != build_key(model.StateSpace(A, B, C, x0=np.ones(2)), dt=0.001)
+    assert key != build_key(model.StateSpace(sparse.csr_matrix(A), B, C), dt=0.001)
+
+
+def test_lru_eviction(tmp_path):
+    cache = BuildCache(tmp_path / "cache", max_size=250)
+    for i, key in enumerate(["a", "b", "c"]):
+        src = tmp_path / f"{key}.fmu"
+        src.write_bytes(b"x" * 100)
+        cache.put(key, src)
+        os.utime(cache.path / f"{key}.fmu", (i, i))
+
+    # Two entries fit, "a" was used least recently
+    cache.evict()
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+
+    # The lookup of "b" made "c" the least recently used entry
+    os.utime(cache.path / "c.fmu", (0, 0))
+    src = tmp_path / "d.fmu"
+    src.write_bytes(b"x" * 100)
+    cache.put("d", src)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+    assert cache.get("d") is not None
+
+
+def test_runtime_cache(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    first = build_fmu(model.StateSpace(A, B, C), tmp_path / "a.fmu", "a", cache=cache)
+    assert not first.runtime_cached
+    assert len(list(cache.path.glob("runtime/*.o"))) == 1
+
+    # Another model compiled with the same profile links the cached runtime
+    second = build_fmu(
+        model.StateSpace(A, B, 2.0 * C), tmp_path / "b.fmu", "b", cache=cache
+    )
+    assert second.runtime_cached
+    assert second.timings["runtime"] < first.timings["runtime"]
+    result = fmpy.simulate_fmu(str(tmp_path / "b.fmu"), stop_time=1.0)
+    assert np.isfinite(result["y1"]).all()
+
+    # Runtime objects are not FMUs, so they are never evicted
+    build_fmu(
+        model.StateSpace(A, B, C), tmp_path / "c.fmu", "c", cache=cache, opt="debug"
+    )
+    assert len(list(cache.path.glob("runtime/*.o"))) == 2
+    cache.max_size = 0
+    cache.evict()
+    assert len(list(cache.path.glob("runtime/*.o"))) == 2
+
+    cache.clear()
+    assert not list(cache.path.glob("runtime/*.o"))
+
+
+def test_unusable_cache_dir(tmp_path, caplog):
+    # The cache directory cannot be created below a file
+    (tmp_path / "notadir").write_bytes(b"")
+    cache = BuildCache(tmp_path / "notadir" / "cache")
+    report = build_fmu(model.StateSpace(A, B, C), tmp_path / "a.fmu", "a", cache=cache)
+    assert not report.cached and report.output.exists()
+    assert "Build cache unavailable" in caplog.text
+    assert cache.get(report.key) is None
+
+
+def test_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv("QFMU_CACHE_DIR", str(tmp_path / "cache"))
+    m = model.StateSpace(A, B, C)
+    report = build_fmu(m, tmp_path / "a.fmu", "a")
+    assert not report.cached and not (tmp_path / "cache").exists()
+
+    args = ["ss", "-A", "[[-1]]", "-B", "[[1]]", "-o", str(tmp_path / "b.fmu")]
+    assert CliRunner().invoke(cli, args).exit_code == 0
+    assert not (tmp_path / "cache").exists()
+    assert CliRunner().invoke(cli, args + ["--cache"]).exit_code == 0
+    assert len(list((tmp_path / "cache").glob("*.fmu"))) == 1
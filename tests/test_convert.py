@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from qfmu.model import convert
+
+
+def assert_same(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert x.shape == y.shape
+        np.testing.assert_allclose(x, y)
+
+
+@pytest.mark.parametrize(
+    "num, den",
+    [
+        ([1.0], [1.0]),
+        ([2.0], [1.0, 3.0]),
+        ([1.0, 2.0, 3.0], [4.0, 5.0, 6.0]),
+        ([0.5, 0.0], [1.0, 0.2, 3.0, 4.0, 0.1]),
+        ([0.0, 1.0], [0.0, 2.0, 1.0]),
+    ],
+)
+def test_tf2ss(num, den):
+    assert_same(convert.tf2ss(num, den), signal.tf2ss(num, den))
+
+
+def test_tf2ss_improper():
+    with pytest.raises(ValueError):
+        convert.tf2ss([1.0, 2.0, 3.0], [1.0, 2.0])
+    with pytest.raises(ValueError):
+        convert.tf2ss([1.0], [0.0, 0.0])
+
+
+@pytest.mark.parametrize(
+    "z, p, k",
+    [
+        ([], [-1.0], 1.0),
+        ([-3.0], [-1.0, -2.0], 2.0),
+        ([1.0 + 1.0j, 1.0 - 1.0j], [-1.0, -2.0 + 3.0j, -2.0 - 3.0j], 0.5),
+    ],
+)
+def test_zpk2ss(z, p, k):
+    assert_same(convert.zpk2ss(z, p, k), signal.zpk2ss(z, p, k))
+
+
+def test_abcd_normalize():
+    A, C, D = np.ones((2, 2)), np.ones((3, 2)), np.ones((3, 4))
+    assert_same(
+        convert.abcd_normalize(A, None, C, D), signal.abcd_normalize(A, None, C, D)
+    )
+    with pytest.raises(ValueError):
+        convert.abcd_normalize(A, np.ones((3, 1)), C)
+
+
+def test_parallel():
+    P = signal.StateSpace(*signal.tf2ss([2.0, 1.0], [1.0, 0.0]))
+    D = signal.StateSpace(*signal.tf2ss([1.0, 0.0], [0.1, 1.0]))
+    m = P + D
+    assert_same(
+        convert.parallel((P.A, P.B, P.C, P.D), (D.A, D.B, D.C, D.D)),
+        (m.A, m.B, m.C, m.D),
+    )
@@ -0,0 +1,140 @@
+import zipfile
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from scipy import signal
+
+from qfmu import model
+from qfmu.cli import cli
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+validate_fmu = pytest.importorskip("fmpy.validation").validate_fmu
+
+TS = 0.1
+A = np.array([[0.9, 0.2], [-0.1, 0.7]])
+B = np.array([[1.0], [0.5]])
+C = np.array([[1.0, -1.0]])
+D = np.zeros((1, 1))
+X0 = np.array([1.0, 0.0])
+
+
+def sampled_response(m, stop_time, output_interval, fmu):
+    """Step response of the FMU and of `scipy.signal.dlsim` at the same times"""
+    step = np.array(
+        [(0.0, 1.0), (stop_time, 1.0)], dtype=[("time", float), ("u1", float)]
+    )
+    result = fmpy.simulate_fmu(
+        str(fmu), stop_time=stop_time, output_interval=output_interval, input=step
+    )
+    n = int(round(stop_time / m.Ts)) + 1
+    system = (np.asarray(m.A), np.asarray(m.B), np.asarray(m.C), np.asarray(m.D), m.Ts)
+    _, y, _ = signal.dlsim(system, np.ones(n), x0=m.x0)
+    # The state after the step [t, t + h) has seen the samples before t + h
+    k = np.ceil(result["time"] / m.Ts - 1e-9).astype(int)
+    return result["y1"], y[k, 0]
+
+
+def test_sample_time():
+    m = model.StateSpace(A, B, C, D, Ts=TS)
+    assert m.is_discrete() and m.Ts == TS
+    assert not model.StateSpace(A, B, C, D).is_discrete()
+    with pytest.raises(ValueError, match="Ts"):
+        model.StateSpace(A, B, C, D, Ts=0.0)
+    with pytest.raises(ValueError, match="discretized"):
+        m.discretize(0.01)
+    with pytest.raises(ValueError, match="batched"):
+        model.LTIBatch.from_models([m])
+    assert model.TransferFunction([1.0], [1.0, -0.5], Ts=TS).Ts == TS
+    assert model.ZerosPolesGain([], [0.5], 1.0, Ts=TS).Ts == TS
+
+
+def test_realize_and_reduce_keep_sample_time():
+    m = model.StateSpace(A, B, C, D, x0=X0, Ts=TS)
+    assert m.realize("modal").Ts == TS
+    reduced, reduction = m.reduce("minreal")
+    assert reduced.Ts == TS
+
+
+def test_balanced_truncation():
+    rng = np.random.default_rng(0)
+    n = 12
+    Ad = rng.standard_normal((n, n))
+    Ad *= 0.9 / np.max(np.abs(np.linalg.eigvals(Ad)))
+    m = model.StateSpace(
+        Ad, rng.standard_normal((n, 1)), rng.standard_normal((1, n)), Ts=TS
+    )
+    reduced, reduction = m.reduce("balred:4")
+    assert reduced.nx == 4 and reduced.Ts == TS
+    # The error bound holds on the unit circle
+    z = np.exp(1j * np.linspace(0.0, np.pi, 200))
+
+    def response(s):
+        return np.array(
+            [(s.C @ np.linalg.solve(zi * np.eye(s.nx) - s.A, s.B))[0, 0] for zi in z]
+        )
+
+    assert np.abs(response(reduced) - response(m)).max() <= reduction.error_bound
+    with pytest.raises(ValueError, match="stable"):
+        model.StateSpace(np.eye(2), np.ones((2, 1)), np.ones((1, 2)), Ts=TS).reduce(
+            "balred:1"
+        )
+
+
+@pytest.mark.parametrize("fmi_version", ["2", "3"])
+def test_description(fmi_version, tmp_path):
+    m = model.StateSpace(A, B, C, D, x0=X0, Ts=TS)
+    report = build_fmu(m, tmp_path / "d.fmu", "d", cache=False, fmi_version=fmi_version)
+    assert validate_fmu(str(report.output)) == []
+    description = fmpy.read_model_description(str(report.output), validate=True)
+    assert description.modelExchange is None
+    assert description.coSimulation is not None
+    assert description.defaultExperiment.stepSize == TS
+    assert not description.derivatives
+    names = {v.name for v in description.modelVariables}
+    assert not any(name.startswith("der") for name in names)
+    with zipfile.ZipFile(report.output) as fmu:
+        source = fmu.read(f"sources/fmi{fmi_version}model.c").decode()
+    assert "#define SOLVER_DT 0.1" in source
+
+
+@pytest.mark.parametrize("unroll", [True, False])
+@pytest.mark.parametrize("realization", [None, "modal"])
+def test_build_discrete(unroll, realization, tmp_path):
+    m = model.StateSpace(A, B, C, D, x0=X0, Ts=TS)
+    # dt and solver have no effect on discrete-time models
+    report = build_fmu(
+        m,
+        tmp_path / "d.fmu",
+        "d",
+        solver="rk4",
+        dt=0.001,
+        unroll=unroll,
+        realization=realization,
+        cache=False,
+    )
+    # One sample per step, several samples per step and steps off the sample grid
+    for h in (TS, 0.3, 0.05, 0.07):
+        y, y_ref = sampled_response(m, 3.0, h, report.output)
+        assert np.allclose(y, y_ref, rtol=1e-12, atol=1e-12)
+
+
+def test_build_transfer_function(tmp_path):
+    # Poles at 0.5 and 0.8 in the z-plane
+    m = model.TransferFunction([1.0, 0.5], [1.0, -1.3, 0.4], Ts=TS)
+    report = build_fmu(m, tmp_path / "tf.fmu", "tf", cache=False)
+    y, y_ref = sampled_response(m, 5.0, TS, report.output)
+    # DC gain 1.5 / 0.1
+    assert y[-1] == pytest.approx(15.0, rel=1e-3)
+    assert np.allclose(y, y_ref, rtol=1e-12, atol=1e-12)
+
+
+def test_cli_discrete(tmp_path):
+    filename = tmp_path / "z.fmu"
+    args = ["zpk", "-z", "[]", "-p", "[0.5]", "-k", "0.5", "-Ts", "0.01"]
+    result = CliRunner().invoke(cli, args + ["--no-cache", "-o", str(filename)])
+    assert result.exit_code == 0, result.output
+    description = fmpy.read_model_description(str(filename))
+    assert description.defaultExperiment.stepSize == 0.01
+    assert description.modelExchange is None
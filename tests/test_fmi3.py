@@ -0,0 +1,164 @@
+import zipfile
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from qfmu import __platform_tuple__, model
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+fmi3 = pytest.importorskip("fmpy.fmi3")
+
+A = np.array([[-1.0, 0.5, 0.0], [0.0, -2.0, 0.0], [0.0, 0.0, -3.0]])
+B = np.array([[1.0, 0.0], [0.0, 0.0], [0.0, 2.0]])
+C = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+D = np.array([[0.0, 0.0], [0.0, 0.5]])
+X0 = np.array([1.0, -1.0, 0.5])
+
+# Value references of the array variables
+VR = dict(x=1, der=2, x_start=3, u=4, u_start=5, y=6, A=7, B=8, C=9, D=10)
+
+
+def instantiate(filename):
+    description = fmpy.read_model_description(str(filename))
+    fmu = fmi3.FMU3Slave(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.coSimulation.modelIdentifier,
+    )
+    fmu.instantiate()
+    fmu.enterInitializationMode(startTime=0.0)
+    fmu.exitInitializationMode()
+    return fmu
+
+
+@pytest.mark.parametrize("fmi_type", ["ModelExchange", "CoSimulation"])
+@pytest.mark.parametrize("solver", ["euler", "rk4", "dopri45", "zoh"])
+def test_same_results_as_fmi2(fmi_type, solver, tmp_path):
+    m = model.StateSpace(A, B, C, D, x0=X0, u0=np.array([1.0, -0.5]))
+    for version in "23":
+        build_fmu(
+            m,
+            tmp_path / f"m{version}.fmu",
+            f"m{version}",
+            solver=solver,
+            fmi_version=version,
+        )
+
+    options = dict(stop_time=1.0, output_interval=0.1, fmi_type=fmi_type)
+    r2 = fmpy.simulate_fmu(str(tmp_path / "m2.fmu"), **options)
+    r3 = fmpy.simulate_fmu(str(tmp_path / "m3.fmu"), **options)
+    # Same model code, the importer may round the communication points differently
+    assert r3["y"].shape == (len(r2), 2)
+    assert np.allclose(r3["y"][:, 0], r2["y1"], rtol=1e-12, atol=1e-15)
+    assert np.allclose(r3["y"][:, 1], r2["y2"], rtol=1e-12, atol=1e-15)
+
+
+def test_array_variables(tmp_path):
+    filename = tmp_path / "arr.fmu"
+    build_fmu(model.StateSpace(A, B, C, D, x0=X0), filename, "arr", fmi_version="3")
+
+    with zipfile.ZipFile(filename) as fmu:
+        libraries = [n for n in fmu.namelist() if n.startswith("binaries/")]
+    assert len(libraries) == 1
+    assert libraries[0].startswith(f"binaries/{__platform_tuple__}/arr.")
+    description = fmpy.read_model_description(str(filename))
+    assert description.fmiVersion == "3.0"
+    variables = {v.name: v for v in description.modelVariables}
+    assert variables["x"].shape == (3,)
+    assert variables["A"].shape == (3, 3)
+    assert description.numberOfContinuousStates == 3
+
+    fmu = instantiate(filename)
+    for name, matrix in zip("ABCD", (A, B, C, D)):
+        assert np.array_equal(fmu.getFloat64([VR[name]], matrix.size), matrix.ravel())
+
+    # One call and one buffer for all inputs and all outputs
+    fmu.setFloat64([VR["u"]], [2.0, -1.0])
+    x = np.array(fmu.getFloat64([VR["x"]], 3))
+    assert np.array_equal(x, X0)
+    y = np.array(fmu.getFloat64([VR["y"]], 2))
+    assert np.allclose(y, C @ X0 + D @ [2.0, -1.0])
+    both = fmu.getFloat64([VR["x"], VR["y"]], 5)
+    assert np.array_equal(both, np.concatenate([x, y]))
+
+    # The number of values must match the sizes of the variables
+    with pytest.raises(fmi3.FMICallException):
+        fmu.getFloat64([VR["y"]], 3)
+    fmu.freeInstance()
+
+    fmu = instantiate(filename)
+    # Outputs and system matrices cannot be set
+    with pytest.raises(fmi3.FMICallException):
+        fmu.setFloat64([VR["y"]], [0.0, 0.0])
+    fmu.freeInstance()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(unroll=True),
+        dict(sparse=True),
+        dict(realization="modal"),
+        dict(realization="modal", sparse=True),
+    ],
+)
+def test_matrices_in_every_storage(options, tmp_path):
+    filename = tmp_path / "st.fmu"
+    m = model.StateSpace(A, B, C, D)
+    build_fmu(m, filename, "st", fmi_version="3", **options)
+    if "realization" in options:
+        m = m.realize(options["realization"])
+
+    description = fmpy.read_model_description(str(filename))
+    variables = {v.name: v for v in description.modelVariables}
+    for name, matrix in zip("ABCD", (A, B, C, D)):
+        assert variables[name].valueReference == VR[name]
+        assert variables[name].shape == matrix.shape
+        assert variables[name].start is None
+
+    fmu = instantiate(filename)
+    for name in "ABCD":
+        matrix = getattr(m, name)
+        values = fmu.getFloat64([VR[name]], matrix.size)
+        assert np.array_equal(values, np.asarray(matrix).ravel())
+    fmu.freeInstance()
+
+
+def test_description_size(tmp_path):
+    # The description does not list the entries of the matrices
+    sizes = []
+    for nx in (10, 100):
+        m = model.StateSpace(np.eye(nx), np.ones((nx, 1)), np.ones((1, nx)))
+        build_fmu(m, tmp_path / f"n{nx}.fmu", f"n{nx}", fmi_version="3")
+        with zipfile.ZipFile(tmp_path / f"n{nx}.fmu") as fmu:
+            sizes.append(len(fmu.read("modelDescription.xml")))
+    assert sizes[1] < 1.5 * sizes[0]
+
+
+def test_derivatives_and_state(tmp_path):
+    filename = tmp_path / "jac.fmu"
+    build_fmu(model.StateSpace(A, B, C, D, x0=X0), filename, "jac", fmi_version="3")
+    fmu = instantiate(filename)
+
+    J = np.block([[A, B], [C, D]])
+    unknowns, knowns = [VR["der"], VR["y"]], [VR["x"], VR["u"]]
+    # Seeds and sensitivities hold one entry per array element
+    seed = np.array([1.0, -2.0, 3.0, 0.5, -1.5])
+    dy = fmu.getDirectionalDerivative(unknowns, knowns, seed, nSensitivity=5)
+    assert np.allclose(dy, J @ seed)
+    seed = np.array([0.5, 1.0, -1.0, 2.0, 3.0])
+    dx = fmu.getAdjointDerivative(unknowns, knowns, seed, nSensitivity=5)
+    assert np.allclose(dx, J.T @ seed)
+
+    fmu.doStep(0.0, 0.1)
+    state = fmu.getFMUState()
+    serialized = fmu.serializeFMUState(state)
+    y = fmu.getFloat64([VR["y"]], 2)
+    fmu.doStep(0.1, 0.1)
+    fmu.setFMUState(fmu.deserializeFMUState(serialized))
+    assert fmu.getFloat64([VR["y"]], 2) == y
+    fmu.freeFMUState(state)
+    fmu.terminate()
+    fmu.freeInstance()
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time budgets as a fraction of the import time of
+# REFERENCE_MODULE measured in the same run, so that slow or busy machines
+# scale both. About twice the ratio on a developer machine, importing the
+# reference module itself exceeds them.
+REFERENCE_MODULE = "scipy.signal"
+IMPORT_BUDGETS = {"qfmu.cli": 0.3, "qfmu.model": 0.5}
+
+
+def import_time(module: str) -> float:
+    """Cumulative import time of `module` in a fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) * 1e-6
+    raise ValueError(f"No import time reported for {module}")
+
+
+def imported_modules(module: str, candidates):
+    """Which of `candidates` are loaded by importing `module`"""
+    code = (
+        f"import sys, {module}; print(*(m for m in {candidates!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, check=True, text=True
+    )
+    return proc.stdout.split()
+
+
+@pytest.mark.parametrize("module, budget", IMPORT_BUDGETS.items())
+def test_import_time(module, budget):
+    # Take the best of a few alternating runs, the first one may fill the disk
+    # cache and the load of the machine may change in between
+    times = [(import_time(module), import_time(REFERENCE_MODULE)) for _ in range(3)]
+    best, reference = (min(t) for t in zip(*times))
+    assert best < budget * reference
+
+
+@pytest.mark.parametrize(
+    "module, allowed",
+    [
+        ("qfmu.cli", []),
+        ("qfmu.model", ["numpy"]),
+        ("qfmu.utils", ["numpy"]),
+    ],
+)
+def test_lazy_imports(module, allowed):
+    heavy = ("numpy", "scipy", "jinja2")
+    assert imported_modules(module, heavy) == allowed
@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from qfmu import model
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+fmi2 = pytest.importorskip("fmpy.fmi2")
+
+
+def run(description, unzipdir, u, n_steps=200, h=0.01):
+    """Step one instance with constant input u and return y over time"""
+    fmu = fmi2.FMU2Slave(
+        guid=description.guid,
+        unzipDirectory=unzipdir,
+        modelIdentifier=description.coSimulation.modelIdentifier,
+        instanceName=f"instance_{u}",
+    )
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    fmu.instantiate()
+    fmu.setupExperiment(startTime=0.0)
+    fmu.enterInitializationMode()
+    fmu.exitInitializationMode()
+
+    y = []
+    for i in range(n_steps):
+        fmu.setReal([vrs["u1"]], [u])
+        fmu.doStep(currentCommunicationPoint=i * h, communicationStepSize=h)
+        y.append(fmu.getReal([vrs["y1"]])[0])
+
+    fmu.terminate()
+    fmu.freeInstance()
+    return np.array(y)
+
+
+@pytest.mark.parametrize("solver", ["euler", "zoh"])
+def test_concurrent_instances(solver, tmp_path):
+    filename = tmp_path / "multi.fmu"
+    m = model.StateSpace(np.array([[-1.0]]), np.array([[1.0]]), np.array([[1.0]]))
+    build_fmu(m, filename, "multi", solver=solver)
+
+    description = fmpy.read_model_description(str(filename))
+    unzipdir = fmpy.extract(str(filename))
+    inputs = np.linspace(-5.0, 5.0, 16)
+
+    expected = [run(description, unzipdir, u) for u in inputs]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda u: run(description, unzipdir, u), inputs))
+
+    for u, y, y_ref in zip(inputs, results, expected):
+        assert np.array_equal(y, y_ref)
+        assert np.isclose(y[-1], u * (1.0 - np.exp(-2.0)), rtol=1e-2)
+
+
+@pytest.mark.parametrize("solver", ["euler", "dopri45", "zoh"])
+def test_fmu_state(solver, tmp_path):
+    filename = tmp_path / "state.fmu"
+    m = model.StateSpace(np.array([[-1.0, 0.5], [0.0, -2.0]]), np.array([[1.0], [1.0]]))
+    build_fmu(m, filename, "state", solver=solver)
+
+    description = fmpy.read_model_description(str(filename))
+    assert description.coSimulation.canGetAndSetFMUstate
+    assert description.coSimulation.canSerializeFMUstate
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+
+    fmu = fmi2.FMU2Slave(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.coSimulation.modelIdentifier,
+        instanceName="state",
+    )
+    fmu.instantiate()
+    fmu.setupExperiment(startTime=0.0)
+    fmu.enterInitializationMode()
+    fmu.exitInitializationMode()
+
+    def simulate(t0, n_steps, h=0.05):
+        y = []
+        for i in range(n_steps):
+            fmu.setReal([vrs["u1"]], [np.sin(t0 + i * h)])
+            fmu.doStep(currentCommunicationPoint=t0 + i * h, communicationStepSize=h)
+            y.append(fmu.getReal([vrs["y1"], vrs["y2"]]))
+        return np.array(y)
+
+    simulate(0.0, 10)
+    state = fmu.getFMUstate()
+    serialized = fmu.serializeFMUstate(state)
+    y_ref = simulate(0.5, 10)
+
+    fmu.setFMUstate(state)
+    assert np.array_equal(simulate(0.5, 10), y_ref)
+
+    restored = fmu.deSerializeFMUstate(serialized)
+    fmu.setFMUstate(restored)
+    assert np.array_equal(simulate(0.5, 10), y_ref)
+
+    fmu.freeFMUstate(state)
+    fmu.freeFMUstate(restored)
+    fmu.terminate()
+    fmu.freeInstance()
+
+
+@pytest.mark.parametrize("call_logging", [True, False])
+def test_get_set_real(call_logging, tmp_path):
+    filename = tmp_path / "vals.fmu"
+    m = model.StateSpace(
+        np.diag([-1.0, -2.0, -3.0]), np.eye(3), np.eye(3), x0=np.array([1.0, 2.0, 3.0])
+    )
+    build_fmu(m, filename, "vals", call_logging=call_logging)
+
+    description = fmpy.read_model_description(str(filename))
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    fmu = fmi2.FMU2Slave(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.coSimulation.modelIdentifier,
+        instanceName="vals",
+    )
+    fmu.instantiate(loggingOn=True)
+    fmu.setupExperiment(startTime=0.0)
+    fmu.enterInitializationMode()
+    fmu.exitInitializationMode()
+
+    # Contiguous and scattered value references give the same values
+    u = [vrs[f"u{i}"] for i in (1, 2, 3)]
+    fmu.setReal(u, [1.0, 2.0, 3.0])
+    fmu.setReal([u[2], u[0]], [-3.0, -1.0])
+    assert fmu.getReal(u) == [-1.0, 2.0, -3.0]
+    assert fmu.getReal(u[::-1]) == [-3.0, 2.0, -1.0]
+    assert fmu.getReal([]) == []
+
+    # Nothing is set if one value reference is out of range
+    with pytest.raises(fmi2.FMICallException):
+        fmu.setReal([u[0], 10_000], [5.0, 5.0])
+    assert fmu.getReal(u) == [-1.0, 2.0, -3.0]
+    fmu.freeInstance()
+
+
+def test_reset(tmp_path):
+    filename = tmp_path / "reset.fmu"
+    m = model.StateSpace(np.array([[-1.0, 0.5], [0.0, -2.0]]), np.array([[1.0], [1.0]]))
+    build_fmu(m, filename, "reset", solver="dopri45")
+
+    description = fmpy.read_model_description(str(filename))
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    fmu = fmi2.FMU2Slave(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.coSimulation.modelIdentifier,
+        instanceName="reset",
+    )
+    fmu.instantiate()
+
+    def simulate(h=0.05):
+        fmu.setupExperiment(tolerance=1e-3, startTime=0.0)
+        fmu.enterInitializationMode()
+        fmu.exitInitializationMode()
+        y = []
+        for i in range(40):
+            fmu.setReal([vrs["u1"]], [np.cos(i * h)])
+            fmu.doStep(currentCommunicationPoint=i * h, communicationStepSize=h)
+            y.append(fmu.getReal([vrs["y1"], vrs["y2"]]))
+        return np.array(y)
+
+    y_ref = simulate()
+    fmu.reset()
+    # The adaptive step size starts over as well
+    assert np.array_equal(simulate(), y_ref)
+    fmu.terminate()
+    fmu.freeInstance()
@@ -0,0 +1,209 @@
+import numpy as np
+import pytest
+from scipy import signal
+
+from qfmu import model
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+fmi2 = pytest.importorskip("fmpy.fmi2")
+
+# Complex poles and a direct feedthrough
+M = model.TransferFunction([1.0, 0.5, 2.0], [1.0, 0.8, 4.0])
+H = 0.25
+
+
+def instantiate(filename):
+    description = fmpy.read_model_description(str(filename))
+    fmu = fmi2.FMU2Slave(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.coSimulation.modelIdentifier,
+        instanceName="interpolation",
+    )
+    fmu.instantiate()
+    fmu.setupExperiment(startTime=0.0)
+    fmu.enterInitializationMode()
+    fmu.exitInitializationMode()
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    return fmu, vrs
+
+
+def cosimulate(filename, u, h=H, interpolate=True):
+    """Outputs after each step with the samples u linearly interpolated"""
+    fmu, vrs = instantiate(filename)
+    y = [fmu.getReal([vrs["y1"]])[0]]
+    for k in range(len(u) - 1):
+        fmu.setReal([vrs["u1"]], [u[k]])
+        if interpolate:
+            fmu.setRealInputDerivatives([vrs["u1"]], [1], [(u[k + 1] - u[k]) / h])
+        fmu.doStep(currentCommunicationPoint=k * h, communicationStepSize=h)
+        y.append(fmu.getReal([vrs["y1"]])[0])
+    fmu.terminate()
+    fmu.freeInstance()
+    return np.array(y)
+
+
+def reference(m, u, h=H):
+    """Exact response to the linearly interpolated samples u"""
+    system = tuple(np.asarray(getattr(m, name)) for name in "ABCD")
+    _, y, _ = signal.lsim(system, u, h * np.arange(len(u)))
+    return y
+
+
+def test_description(tmp_path):
+    report = build_fmu(M, tmp_path / "i.fmu", "i", cache=False)
+    description = fmpy.read_model_description(str(report.output), validate=True)
+    assert description.coSimulation.canInterpolateInputs
+    assert description.coSimulation.maxOutputDerivativeOrder == 1
+
+
+@pytest.mark.parametrize(
+    "solver, unroll, realization, atol",
+    [
+        ("euler", True, None, 1e-2),
+        ("rk4", True, None, 1e-10),
+        ("rk4", False, "modal", 1e-10),
+        ("dopri45", False, None, 1e-4),
+        ("zoh", False, None, 1e-10),
+        ("zoh", False, "modal", 1e-10),
+    ],
+)
+def test_interpolated_inputs(solver, unroll, realization, atol, tmp_path):
+    report = build_fmu(
+        M,
+        tmp_path / "i.fmu",
+        "i",
+        solver=solver,
+        unroll=unroll,
+        realization=realization,
+        cache=False,
+    )
+    u = np.sin(H * np.arange(41))
+    y_ref = reference(M, u)
+    assert np.allclose(cosimulate(report.output, u), y_ref, rtol=0.0, atol=atol)
+    # The held input is a step size behind
+    assert not np.allclose(
+        cosimulate(report.output, u, interpolate=False), y_ref, atol=1e-2
+    )
+
+
+@pytest.mark.parametrize("realization", [None, "modal"])
+def test_first_order_hold(realization, tmp_path):
+    # Large step sizes, the default one with the precomputed Bd1 and another
+    # one computed by the FMU
+    m = model.StateSpace(
+        np.array([[-1.0, 0.0, 0.0], [0.0, -0.2, 3.0], [0.0, -3.0, -0.2]]),
+        np.array([[1.0, 0.0], [0.5, 1.0], [0.0, -2.0]]),
+        np.array([[1.0, 1.0, 1.0]]),
+        np.array([[0.0, 1.0]]),
+    )
+    report = build_fmu(
+        m,
+        tmp_path / "foh.fmu",
+        "foh",
+        solver="zoh",
+        dt=0.5,
+        unroll=False,
+        realization=realization,
+        cache=False,
+    )
+    for h in (0.5, 1e-4, 1.5):
+        t = h * np.arange(21)
+        u = np.column_stack([np.cos(t), t])
+        fmu, vrs = instantiate(report.output)
+        y = []
+        for k in range(len(t) - 1):
+            fmu.setReal([vrs["u1"], vrs["u2"]], list(u[k]))
+            du = (u[k + 1] - u[k]) / h
+            fmu.setRealInputDerivatives([vrs["u1"], vrs["u2"]], [1, 1], list(du))
+            fmu.doStep(currentCommunicationPoint=t[k], communicationStepSize=h)
+            y.append(fmu.getReal([vrs["y1"]])[0])
+        fmu.terminate()
+        fmu.freeInstance()
+        y_ref = reference(m, u, h)[1:]
+        assert np.allclose(y, y_ref, rtol=1e-9, atol=1e-12)
+
+
+def test_discretize_foh():
+    Ad, Bd, Bd1 = M.discretize(0.1, foh=True)
+    assert np.allclose(np.hstack([Ad, Bd]), np.hstack(M.discretize(0.1)))
+    # x(h) for x(0) = 0 and u(t) = t
+    h = 0.1
+    _, _, x = signal.lsim(
+        tuple(np.asarray(getattr(M, n)) for n in "ABCD"), [0.0, h], [0.0, h]
+    )
+    assert np.allclose(Bd1[:, 0], x[-1], rtol=1e-9)
+
+
+def test_discrete_samples_interpolated_inputs(tmp_path):
+    # Several sample instants per communication step
+    m = model.StateSpace(
+        np.array([[0.9, 0.2], [-0.1, 0.7]]),
+        np.array([[1.0], [0.5]]),
+        [[1.0, -1.0]],
+        Ts=0.1,
+    )
+    report = build_fmu(m, tmp_path / "d.fmu", "d", cache=False)
+    t = 0.3 * np.arange(11)
+    u = np.sin(t)
+    fmu, vrs = instantiate(report.output)
+    y = []
+    for k in range(len(t) - 1):
+        fmu.setReal([vrs["u1"]], [u[k]])
+        fmu.setRealInputDerivatives([vrs["u1"]], [1], [(u[k + 1] - u[k]) / 0.3])
+        fmu.doStep(currentCommunicationPoint=t[k], communicationStepSize=0.3)
+        y.append(fmu.getReal([vrs["y1"]])[0])
+    fmu.freeInstance()
+    samples = np.interp(0.1 * np.arange(31), t, u)
+    system = (m.A, m.B, m.C, m.D, m.Ts)
+    _, y_ref, _ = signal.dlsim(system, samples)
+    assert np.allclose(y, y_ref[3::3, 0], rtol=1e-12, atol=1e-12)
+
+
+def test_output_derivatives(tmp_path):
+    report = build_fmu(M, tmp_path / "i.fmu", "i", cache=False)
+    fmu, vrs = instantiate(report.output)
+    A, B, C, D = (np.asarray(getattr(M, name)) for name in "ABCD")
+    x_vrs = [vrs[f"x{i + 1}"] for i in range(M.nx)]
+    for k in range(10):
+        fmu.setReal([vrs["u1"]], [np.sin(k * H)])
+        fmu.setRealInputDerivatives([vrs["u1"]], [1], [np.cos(k * H)])
+        fmu.doStep(currentCommunicationPoint=k * H, communicationStepSize=H)
+    x = np.array(fmu.getReal(x_vrs))
+    u = fmu.getReal([vrs["u1"]])
+    # The input moved along its derivative during the step
+    assert u[0] == pytest.approx(np.sin(9 * H) + H * np.cos(9 * H))
+    dy = C @ (A @ x + B @ u) + D[:, 0] * np.cos(9 * H)
+    assert fmu.getRealOutputDerivatives([vrs["y1"]], [1]) == pytest.approx(dy)
+
+    with pytest.raises(fmi2.FMICallException):
+        fmu.getRealOutputDerivatives([vrs["y1"]], [2])
+    with pytest.raises(fmi2.FMICallException):
+        fmu.getRealOutputDerivatives([vrs["u1"]], [1])
+    with pytest.raises(fmi2.FMICallException):
+        fmu.setRealInputDerivatives([vrs["y1"]], [1], [1.0])
+    # Higher derivatives are ignored with a warning
+    fmu.setRealInputDerivatives([vrs["u1"]], [2], [1.0])
+    fmu.freeInstance()
+
+
+def test_fmu_state_keeps_input_derivatives(tmp_path):
+    report = build_fmu(M, tmp_path / "i.fmu", "i", solver="zoh", cache=False)
+    fmu, vrs = instantiate(report.output)
+    fmu.setReal([vrs["u1"]], [1.0])
+    fmu.setRealInputDerivatives([vrs["u1"]], [1], [2.0])
+    state = fmu.getFMUstate()
+    serialized = fmu.serializeFMUstate(state)
+
+    def step():
+        fmu.doStep(currentCommunicationPoint=0.0, communicationStepSize=H)
+        return fmu.getReal([vrs["y1"], vrs["u1"]])
+
+    y_ref = step()
+    assert y_ref[1] == pytest.approx(1.0 + 2.0 * H)
+    for restored in (state, fmu.deSerializeFMUstate(serialized)):
+        fmu.setRealInputDerivatives([vrs["u1"]], [1], [0.0])
+        fmu.setFMUstate(restored)
+        assert step() == y_ref
+    fmu.freeInstance()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from qfmu import model
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+fmi2 = pytest.importorskip("fmpy.fmi2")
+
+A = np.array([[-1.0, 0.5, 0.0], [0.0, -2.0, 0.0], [0.0, 0.0, -3.0]])
+B = np.array([[1.0, 0.0], [0.0, 0.0], [0.0, 2.0]])
+C = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]])
+D = np.array([[0.0, 0.0], [0.0, 0.5]])
+
+
+@pytest.mark.parametrize("sparse_matrices", [False, True])
+def test_directional_derivative(sparse_matrices, tmp_path):
+    filename = tmp_path / "jac.fmu"
+    m = model.StateSpace(A, B, C, D)
+    build_fmu(m, filename, "jac", sparse=sparse_matrices)
+
+    description = fmpy.read_model_description(str(filename))
+    assert description.modelExchange.providesDirectionalDerivative
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    x = [vrs[f"x{i + 1}"] for i in range(3)]
+    der = [vrs[f"der_x{i + 1}"] for i in range(3)]
+    u = [vrs[f"u{i + 1}"] for i in range(2)]
+    y = [vrs[f"y{i + 1}"] for i in range(2)]
+
+    fmu = fmi2.FMU2Model(
+        guid=description.guid,
+        unzipDirectory=fmpy.extract(str(filename)),
+        modelIdentifier=description.modelExchange.modelIdentifier,
+    )
+    fmu.instantiate()
+    fmu.setupExperiment(startTime=0.0)
+    fmu.enterInitializationMode()
+    fmu.exitInitializationMode()
+
+    J = np.block([[A, B], [C, D]])
+    unknowns, knowns = der + y, x + u
+    for j, known in enumerate(knowns):
+        column = fmu.getDirectionalDerivative(unknowns, [known], [1.0])
+        assert np.array_equal(column, J[:, j])
+
+    seed = np.array([1.0, -2.0, 3.0, 0.5, -1.5])
+    assert np.allclose(fmu.getDirectionalDerivative(unknowns, knowns, seed), J @ seed)
+
+    fmu.terminate()
+    fmu.freeInstance()
+
+
+def test_dependencies(tmp_path):
+    filename = tmp_path / "deps.fmu"
+    build_fmu(model.StateSpace(sparse.csr_matrix(A), B, C, D), filename, "deps")
+    description = fmpy.read_model_description(str(filename))
+
+    def deps(unknown):
+        return [v.name for v in unknown.dependencies]
+
+    derivatives = {u.variable.name: u for u in description.derivatives}
+    assert deps(derivatives["der_x1"]) == ["x1", "x2", "u1"]
+    assert deps(derivatives["der_x2"]) == ["x2"]
+    assert deps(derivatives["der_x3"]) == ["x3", "u2"]
+    outputs = {u.variable.name: u for u in description.outputs}
+    assert deps(outputs["y1"]) == ["x1"]
+    assert deps(outputs["y2"]) == ["x3", "u2"]
+    assert set(outputs["y2"].dependenciesKind) == {"constant"}
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from qfmu import model
+from qfmu.cli import cli
+from qfmu.model.convert import tfm2ss, zpkm2ss
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+W = np.logspace(-2, 2, 50)
+
+# 2x2 matrix with the common denominator (s + 1)(s + 2), McMillan degree 4
+NUM = [[[1.0], [2.0, 1.0]], [[1.0, 0.0], [3.0]]]
+DEN = [1.0, 3.0, 2.0]
+
+
+def frequency_response(A, B, C, D):
+    eye = np.eye(A.shape[0])
+    return np.array([C @ np.linalg.solve(1j * w * eye - A, B) + D for w in W])
+
+
+def tfm_response(num, den):
+    return np.array(
+        [
+            [
+                [np.polyval(n, 1j * w) / np.polyval(d, 1j * w) for n, d in zip(*row)]
+                for row in zip(num, den)
+            ]
+            for w in W
+        ]
+    )
+
+
+def test_tfm2ss():
+    A, B, C, D = tfm2ss(NUM, DEN)
+    assert A.shape == (4, 4) and B.shape == (4, 2) and C.shape == (2, 4)
+    dens = [[DEN, DEN], [DEN, DEN]]
+    assert np.allclose(frequency_response(A, B, C, D), tfm_response(NUM, dens))
+
+
+def test_tfm2ss_shared_poles():
+    # One pole per column: the entries of a column share their states
+    num = [[[1.0], [0.0]], [[2.0], [1.0]], [[0.0], [3.0, 1.0]]]
+    den = [[[1.0, 1.0], [1.0, 2.0]]] * 3
+    A, B, C, D = tfm2ss(num, den)
+    assert A.shape == (2, 2)
+    assert np.array_equal(D, [[0.0, 0.0], [0.0, 0.0], [0.0, 3.0]])
+    assert np.allclose(frequency_response(A, B, C, D), tfm_response(num, den))
+
+
+def test_zpkm2ss():
+    z = [[[], [-0.5]], [[0.0], []]]
+    k = [[1.0, 2.0], [1.0, 3.0]]
+    A, B, C, D = zpkm2ss(z, [-1.0, -2.0], k)
+    assert A.shape == (4, 4)
+    assert np.allclose(
+        frequency_response(A, B, C, D), tfm_response(NUM, [[DEN] * 2] * 2)
+    )
+
+
+def test_shape_errors():
+    with pytest.raises(ValueError, match="2 x 2"):
+        tfm2ss([[[1.0], [1.0]], [[1.0]]], DEN)
+    with pytest.raises(ValueError, match="den"):
+        tfm2ss(NUM, [[DEN, DEN]])
+    with pytest.raises(ValueError, match="z"):
+        zpkm2ss([[[]]], [-1.0], [[1.0, 2.0]])
+
+
+def test_siso_unchanged():
+    m = model.TransferFunction([1.0, 2.0], [1.0, 3.0, 5.0])
+    matrix = model.TransferFunction([[[1.0, 2.0]]], [1.0, 3.0, 5.0])
+    assert (m.nu, m.ny, matrix.nu, matrix.ny) == (1, 1, 1, 1)
+    assert np.allclose(
+        frequency_response(m.A, m.B, m.C, m.D),
+        frequency_response(matrix.A, matrix.B, matrix.C, matrix.D),
+    )
+    assert model.ZerosPolesGain([], [-1.0], 2.0).nu == 1
+
+
+def test_models():
+    m = model.TransferFunction(NUM, DEN, u0=[1.0, 2.0])
+    assert (m.nx, m.nu, m.ny) == (4, 2, 2)
+    assert np.array_equal(m.u0, [1.0, 2.0])
+    # A 2-D num is a column with a common denominator
+    column = model.TransferFunction([[1.0], [1.0, 0.0]], DEN)
+    assert (column.nx, column.nu, column.ny) == (2, 1, 2)
+    zpk = model.ZerosPolesGain([[[-1.0], []]], [[[-2.0], [-3.0]]], [[1.0, 2.0]])
+    assert (zpk.nx, zpk.nu, zpk.ny) == (2, 2, 1)
+    with pytest.raises(ValueError, match="u0"):
+        model.TransferFunction(NUM, DEN, u0=1.0)
+
+
+def test_build_mimo(tmp_path):
+    m = model.TransferFunction(NUM, DEN)
+    report = build_fmu(m, tmp_path / "mimo.fmu", "mimo", solver="zoh", cache=False)
+    inputs = np.array(
+        [(0.0, 1.0, -1.0), (5.0, 1.0, -1.0)],
+        dtype=[("time", float), ("u1", float), ("u2", float)],
+    )
+    result = fmpy.simulate_fmu(
+        str(report.output), stop_time=5.0, output_interval=0.5, input=inputs
+    )
+    # Step response of each entry, G(s) / s
+    t = result["time"]
+    e1, e2 = np.exp(-t), np.exp(-2.0 * t)
+    g11 = 0.5 - e1 + 0.5 * e2
+    g12 = 0.5 + e1 - 1.5 * e2
+    g21 = e1 - e2
+    g22 = 1.5 - 3.0 * e1 + 1.5 * e2
+    assert np.allclose(result["y1"], g11 - g12, atol=1e-9)
+    assert np.allclose(result["y2"], g21 - g22, atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["tf", "-n", "[[[1], [2, 1]], [[1, 0], [3]]]", "-d", "[1, 3, 2]"],
+        ["zpk", "-z", "[[[], [-0.5]], [[0], []]]", "-p", "[-1, -2]"]
+        + ["-k", "[[1, 2], [1, 3]]", "-u0", "[0, 1]"],
+    ],
+)
+def test_cli_mimo(args, tmp_path):
+    filename = tmp_path / "mimo.fmu"
+    result = CliRunner().invoke(cli, args + ["--no-cache", "-o", str(filename)])
+    assert result.exit_code == 0, result.output
+    description = fmpy.read_model_description(str(filename))
+    names = {v.name for v in description.modelVariables}
+    assert {"u1", "u2", "y1", "y2"} <= names
+    assert description.numberOfContinuousStates == 4
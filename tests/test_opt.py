@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from qfmu import model
+from qfmu.benchmark import compare_opt, random_model
+from qfmu.utils import (
+    OPT_PROFILES,
+    build_fmu,
+    compile_command,
+    runtime_compile_command,
+)
+
+fmpy = pytest.importorskip("fmpy")
+
+
+def test_compile_command():
+    _, debug = compile_command("q", "debug")
+    _, native = compile_command("q", "native")
+    assert debug != native
+    with pytest.raises(ValueError):
+        compile_command("q", "O9")
+
+
+def test_runtime_call_logging():
+    target, command = runtime_compile_command()
+    quiet_target, quiet = runtime_compile_command(call_logging=False)
+    assert target == quiet_target
+    assert "DISABLE_CALL_LOGGING" not in command
+    assert "DISABLE_CALL_LOGGING" in quiet
+
+
+@pytest.mark.parametrize("opt", OPT_PROFILES)
+def test_profiles(opt, tmp_path):
+    m = random_model(8, nu=2, ny=2, seed=1)
+    filename = tmp_path / f"{opt}.fmu"
+    build_fmu(m, filename, opt, dt=0.01, solver="rk4", opt=opt)
+
+    t = np.array([0.0, 1.0])
+    inp = np.array(
+        list(zip(t, np.ones(2), -np.ones(2))),
+        dtype=[("time", np.float64), ("u1", np.float64), ("u2", np.float64)],
+    )
+    result = fmpy.simulate_fmu(
+        str(filename), stop_time=1.0, output_interval=0.01, input=inp
+    )
+    reference = m.discretize(1.0)
+    x = reference[1] @ np.array([1.0, -1.0])
+    assert np.allclose([result["y1"][-1], result["y2"][-1]], m.C @ x, atol=1e-6)
+
+
+def test_compare_opt():
+    m = model.StateSpace(np.array([[-1.0]]), np.array([[1.0]]), np.array([[1.0]]))
+    results = compare_opt(m, ["debug", "O2"], n_steps=100)
+    assert list(results) == ["debug", "O2"]
+    assert all(t > 0.0 for t in results.values())
@@ -0,0 +1,68 @@
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from qfmu import __platform__, model
+from qfmu.cache import BuildCache
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+A = np.array([[-1.0, 0.0], [1.0, -2.0]])
+B = np.array([[1.0], [0.0]])
+C = np.array([[0.0, 1.0]])
+
+
+def test_fmu_layout(tmp_path, monkeypatch):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    build_fmu(model.StateSpace(A, B, C), tmp_path / "p.fmu", "p", cache=False)
+
+    with zipfile.ZipFile(tmp_path / "p.fmu") as fmu:
+        names = set(fmu.namelist())
+        assert all(i.compress_type == zipfile.ZIP_DEFLATED for i in fmu.infolist())
+    library = next(n for n in names if n.startswith("binaries/"))
+    assert library.startswith(f"binaries/{__platform__}/p.")
+    assert {"modelDescription.xml", "sources/fmi2model.c"} <= names
+    assert "sources/include/fmi2Template.c" in names
+    assert all(n.endswith((".c", ".h")) for n in names if n.startswith("sources/"))
+
+    # Nothing is written to the working directory or left next to the FMU
+    assert not list(cwd.iterdir())
+    assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ["p.fmu"]
+
+
+def test_compression(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    m = model.StateSpace(A, B, C)
+    stored = build_fmu(m, tmp_path / "s.fmu", "s", cache=cache, compression=0)
+    deflated = build_fmu(m, tmp_path / "d.fmu", "d", cache=cache, compression=9)
+    assert stored.fmu_size > deflated.fmu_size
+    with zipfile.ZipFile(tmp_path / "s.fmu") as fmu:
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in fmu.infolist())
+    result = fmpy.simulate_fmu(str(tmp_path / "s.fmu"), stop_time=1.0)
+    assert np.isfinite(result["y1"]).all()
+
+    # The compression is part of the build key
+    other = build_fmu(m, tmp_path / "s.fmu", "s", cache=cache, compression=1)
+    assert not other.cached and other.guid != stored.guid
+
+    with pytest.raises(ValueError):
+        build_fmu(m, tmp_path / "s.fmu", "s", cache=False, compression=10)
+
+
+def test_concurrent_builds(tmp_path):
+    m = model.StateSpace(A, B, C)
+
+    def build(_):
+        return build_fmu(m, tmp_path / "c.fmu", "c", cache=False)
+
+    with ThreadPoolExecutor(4) as pool:
+        reports = list(pool.map(build, range(4)))
+    assert all(r.ok for r in reports)
+    with zipfile.ZipFile(tmp_path / "c.fmu") as fmu:
+        assert fmu.testzip() is None
+    assert [p.name for p in tmp_path.iterdir()] == ["c.fmu"]
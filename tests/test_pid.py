@@ -6,6 +6,7 @@ import pytest
 from click.testing import CliRunner
 
 from qfmu.cli import cli
+from qfmu.model import StateSpace
 from qfmu.model.pid import PID
 
 def any_float():
@@ -38,6 +39,8 @@ def test_pid(kp, ki, kd, tf, nx, nu, ny):
     assert m.nx == nx
     assert m.nu == nu
     assert m.ny == ny
+    assert isinstance(m.m, StateSpace)
+    assert m.m.A.shape == (nx, nx) and m.A is m.m.A
 
 
 @pytest.mark.parametrize(
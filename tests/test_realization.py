@@ -0,0 +1,121 @@
+import zipfile
+
+import numpy as np
+import pytest
+from scipy import linalg, sparse
+
+from qfmu import model
+from qfmu.model.realization import band, modal_blocks
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+# Real poles, complex pairs, an integrator and undamped oscillation
+MODELS = {
+    "damped": model.TransferFunction([1.0, 2.0, 3.0], [1.0, 3.0, 5.0, 7.0, 2.0, 1.0]),
+    "marginal": model.TransferFunction([1.0], [1.0, 0.0, 4.0, 0.0]),
+}
+
+
+def frequency_response(m):
+    A, B, C, D = (np.asarray(getattr(m, name)) for name in "ABCD")
+    eye = np.eye(m.nx)
+    return np.array(
+        [C @ np.linalg.solve(1j * w * eye - A, B) + D for w in np.logspace(-2, 2, 50)]
+    )
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_modal_form(name):
+    m = MODELS[name]
+    modal = m.realize("modal")
+    blocks = modal_blocks(modal.A)
+    assert blocks is not None and sum(blocks) == m.nx
+    assert 2 in blocks
+    assert modal_blocks(m.A) is None
+    assert np.allclose(frequency_response(modal), frequency_response(m))
+    assert np.allclose(
+        np.sort_complex(linalg.eigvals(modal.A)), np.sort_complex(linalg.eigvals(m.A))
+    )
+
+
+def test_schur_form():
+    m = MODELS["damped"]
+    schur = m.realize("schur")
+    # Quasi upper triangular
+    assert not np.tril(schur.A, -2).any()
+    assert np.allclose(frequency_response(schur), frequency_response(m))
+
+
+@pytest.mark.parametrize("form", ["modal", "schur"])
+def test_initial_state_is_mapped(form):
+    x0 = np.array([1.0, -2.0, 0.5, 0.0, 3.0])
+    m = model.StateSpace(MODELS["damped"].A, C=np.eye(5)[:2], x0=x0)
+    realized = m.realize(form)
+    for t in (0.0, 0.5, 2.0):
+        y = m.C @ linalg.expm(m.A * t) @ x0
+        assert np.allclose(realized.C @ linalg.expm(realized.A * t) @ realized.x0, y)
+
+
+def test_defective():
+    with pytest.raises(ValueError, match="schur"):
+        model.StateSpace(np.array([[-1.0, 1.0], [0.0, -1.0]])).realize("modal")
+    with pytest.raises(ValueError):
+        MODELS["damped"].realize("jordan")
+
+
+def test_modal_blocks():
+    pair = np.array([[-1.0, 2.0], [-2.0, -1.0]])
+    A = linalg.block_diag(-3.0, pair, 0.0, pair)
+    assert modal_blocks(A) == [1, 2, 1, 2]
+    assert modal_blocks(sparse.csr_matrix(A)) == [1, 2, 1, 2]
+    assert modal_blocks(np.diag([-1.0, -2.0])) == [1, 1]
+    assert np.array_equal(band(A)[1], [0.0, 2.0, 0.0, 0.0, 2.0, 0.0])
+    # Not canonical 2x2 blocks, or coupled blocks
+    assert modal_blocks(np.array([[-1.0, 2.0], [-3.0, -1.0]])) is None
+    assert (
+        modal_blocks(np.array([[-1.0, 1.0, 0.0], [0.0, -1.0, 1.0], [0, 0, -1]])) is None
+    )
+    assert modal_blocks(np.array([[-1.0, 0.0], [1.0, -1.0]])) is None
+
+
+@pytest.mark.parametrize("solver", ["euler", "dopri45", "zoh"])
+@pytest.mark.parametrize("name", MODELS)
+def test_build_modal(name, solver, tmp_path):
+    m = MODELS[name]
+    step = np.array([(0.0, 1.0), (5.0, 1.0)], dtype=[("time", float), ("u1", float)])
+    results = {}
+    for realization in (None, "modal", "schur"):
+        report = build_fmu(
+            m,
+            tmp_path / f"{realization}.fmu",
+            f"m_{realization}",
+            solver=solver,
+            unroll=False,
+            realization=realization,
+            cache=False,
+        )
+        with zipfile.ZipFile(report.output) as fmu:
+            source = fmu.read("sources/fmi2model.c").decode()
+        assert ("A_band" in source) == (realization == "modal")
+        # The default step size and another one, computed by the FMU
+        results[realization] = [
+            fmpy.simulate_fmu(
+                str(report.output), stop_time=5.0, output_interval=h, input=step
+            )["y1"]
+            for h in (0.001, 0.05)
+        ]
+
+    for y, y_ref in zip(results["modal"] + results["schur"], results[None] * 2):
+        assert np.allclose(y, y_ref, rtol=1e-10, atol=1e-12)
+
+
+def test_build_modal_fmi3(tmp_path):
+    filename = tmp_path / "m3.fmu"
+    m = MODELS["damped"]
+    build_fmu(m, filename, "m3", realization="modal", unroll=False, fmi_version="3")
+    names = {v.name for v in fmpy.read_model_description(str(filename)).modelVariables}
+    # A is exposed although it is stored as a band
+    assert set("ABCD") <= names
+    result = fmpy.simulate_fmu(str(filename), stop_time=1.0)
+    assert np.isfinite(result["y"]).all()
@@ -0,0 +1,144 @@
+import json
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from scipy import linalg
+
+from qfmu import model
+from qfmu.cli import cli
+from qfmu.model.reduction import parse_method
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+W = np.logspace(-2, 3, 200)
+
+
+def stable_model(n=30, nu=2, ny=3, seed=0):
+    rng = np.random.default_rng(seed)
+    A = rng.standard_normal((n, n))
+    A -= (np.max(linalg.eigvals(A).real) + 0.5) * np.eye(n)
+    B = rng.standard_normal((n, nu))
+    C = rng.standard_normal((ny, n))
+    D = rng.standard_normal((ny, nu))
+    return A, B, C, D
+
+
+def non_minimal(A, B, C, D, x0=None):
+    """Pad (A, B, C, D) with 4 uncontrollable and 3 unobservable states"""
+    n, nu, ny = A.shape[0], B.shape[1], C.shape[0]
+    Af = linalg.block_diag(A, -np.eye(4), -2.0 * np.eye(3))
+    Af[:n, n : n + 4] = 1.0  # drive the states, but are not driven
+    Bf = np.vstack((B, np.zeros((4, nu)), np.ones((3, nu))))
+    Cf = np.hstack((C, np.ones((ny, 4)), np.zeros((ny, 3))))
+    x0 = np.zeros(n + 7) if x0 is None else np.concatenate((x0, np.zeros(7)))
+    return model.StateSpace(Af, Bf, Cf, D, x0=x0)
+
+
+def frequency_response(m):
+    A, B, C, D = (np.asarray(getattr(m, name)) for name in "ABCD")
+    eye = np.eye(m.nx)
+    return np.array([C @ np.linalg.solve(1j * w * eye - A, B) + D for w in W])
+
+
+def free_response(m, t):
+    A, C = np.asarray(m.A), np.asarray(m.C)
+    return np.array([C @ linalg.expm(A * ti) @ m.x0 for ti in t])
+
+
+def test_parse_method():
+    assert parse_method("minreal") == ("minreal", None, 0.0)
+    assert parse_method("balred:12") == ("balred", 12, 0.0)
+    assert parse_method("1e-3") == ("balred", None, 1e-3)
+    for method in ("balred", "balred:-1", "balred:x", "fast", "-1.0"):
+        with pytest.raises(ValueError):
+            parse_method(method)
+
+
+def test_minreal():
+    A, B, C, D = stable_model()
+    m = non_minimal(A, B, C, D)
+    reduced, reduction = m.reduce("minreal")
+    assert (reduction.nx_before, reduction.nx_after) == (37, 30)
+    assert reduction.error_bound == 0.0
+    assert reduced.nx == 30
+    assert np.allclose(frequency_response(reduced), frequency_response(m))
+    assert np.array_equal(reduced.D, D)
+
+
+def test_minreal_keeps_free_response():
+    A, _, C, _ = stable_model(n=6, nu=1, ny=2)
+    x0 = np.linspace(-1.0, 1.0, 6)
+    # Without inputs, only the states reachable from x0 are kept
+    m = non_minimal(A, np.zeros((6, 0)), C, np.zeros((2, 0)), x0=x0)
+    reduced, reduction = m.reduce("minreal")
+    assert reduction.nx_after == 6
+    t = np.linspace(0.0, 2.0, 11)
+    assert np.allclose(free_response(reduced, t), free_response(m, t))
+
+
+def test_minreal_pid():
+    # The parallel connection of I and D has no redundant state
+    reduced, reduction = model.PID(1.0, 2.0, 0.5, 0.1).reduce("minreal")
+    assert reduction.nx_after == 2
+    assert reduced.nu == reduced.ny == 1
+
+
+@pytest.mark.parametrize("method", ["balred:8", "balred:15", "0.01"])
+def test_balanced_truncation(method):
+    m = model.StateSpace(*stable_model())
+    reduced, reduction = m.reduce(method)
+    hsv = np.array(reduction.hsv)
+    assert len(hsv) == 30
+    assert np.all(np.diff(hsv) <= 0.0)
+    assert reduction.error_bound == pytest.approx(2.0 * hsv[reduced.nx :].sum())
+
+    error = np.abs(frequency_response(reduced) - frequency_response(m))
+    assert np.linalg.norm(error, 2, axis=(1, 2)).max() <= reduction.error_bound
+    if method.startswith("balred:"):
+        assert reduced.nx == int(method[7:])
+    else:
+        # The fewest states within the tolerance
+        assert reduction.error_bound <= 0.01
+        assert 2.0 * hsv[reduced.nx - 1 :].sum() > 0.01
+
+
+def test_balanced_truncation_unstable():
+    m = model.PID(1.0, 2.0, 0.0)
+    with pytest.raises(ValueError, match="stable"):
+        m.reduce("balred:1")
+
+
+def test_build_reduced(tmp_path):
+    A, B, C, D = stable_model(n=20, nu=1, ny=1)
+    m = non_minimal(A, B, C, D)
+    full = build_fmu(m, tmp_path / "full.fmu", "full", solver="rk4", cache=False)
+    assert full.reduction is None
+    report = build_fmu(
+        m, tmp_path / "red.fmu", "red", solver="rk4", reduce="balred:10", cache=False
+    )
+    assert report.timings["reduce"] > 0.0
+    assert report.reduction.nx_before == 27
+    assert report.reduction.nx_after == 10
+    assert report.to_dict()["reduction"]["error_bound"] == report.reduction.error_bound
+
+    description = fmpy.read_model_description(str(report.output))
+    assert description.numberOfContinuousStates == 10
+    step = np.array([(0.0, 1.0), (2.0, 1.0)], dtype=[("time", float), ("u1", float)])
+    options = dict(stop_time=2.0, output_interval=0.01, input=step)
+    y_full = fmpy.simulate_fmu(str(full.output), **options)["y1"]
+    y_red = fmpy.simulate_fmu(str(report.output), **options)["y1"]
+    assert np.abs(y_full).max() > 0.1
+    assert np.allclose(y_full, y_red, atol=report.reduction.error_bound)
+
+
+def test_cli_reduce(tmp_path):
+    path = tmp_path / "report.json"
+    args = ["ss", "-A", "[[-1, 0], [0, -2]]", "-B", "[[1], [0]]", "-C", "[[1, 1]]"]
+    args += ["--reduce", "minreal", "--no-cache", "--report", str(path)]
+    result = CliRunner().invoke(cli, args + ["-o", str(tmp_path / "r.fmu")])
+    assert result.exit_code == 0, result.output
+    reduction = json.loads(path.read_text())["reduction"]
+    assert (reduction["nx_before"], reduction["nx_after"]) == (2, 1)
+    assert reduction["error_bound"] == 0.0
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from qfmu import model, utils
+from qfmu.cache import BuildCache
+from qfmu.cli import cli
+from qfmu.utils import BuildError, build_fmu
+
+A = np.array([[-1.0, 0.0], [1.0, -2.0]])
+B = np.array([[1.0], [0.0]])
+C = np.array([[0.0, 1.0]])
+
+
+def test_build_report(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    m = model.StateSpace(A, B, C)
+
+    report = build_fmu(m, tmp_path / "r.fmu", "r", cache=cache)
+    assert report.ok and not report.cached
+    assert report.output == tmp_path / "r.fmu"
+    assert report.compile_status == 0
+    assert "fmi2model.c" in report.compile_command
+    assert report.source_size > 0 and report.library_size > 0
+    assert report.fmu_size == (tmp_path / "r.fmu").stat().st_size
+    assert not report.runtime_cached
+    phases = {"key", "render", "includes", "runtime", "compile"}
+    phases |= {"description", "zip", "cache"}
+    assert set(report.timings) == phases | {"total"}
+    assert sum(report.timings[p] for p in phases) <= report.timings["total"]
+
+    cached = build_fmu(m, tmp_path / "r.fmu", "r", cache=cache)
+    assert cached.cached and cached.guid == report.guid
+    assert cached.compile_status is None and cached.library_size is None
+    assert cached.fmu_size == report.fmu_size
+
+    d = json.loads(json.dumps(report.to_dict()))
+    assert d["output"] == str(tmp_path / "r.fmu")
+    assert d["timings"]["compile"] == report.timings["compile"]
+
+
+def test_build_report_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "compile_command", lambda *_: ("r.so", "exit 3"))
+    with pytest.raises(BuildError) as e:
+        build_fmu(model.StateSpace(A, B, C), tmp_path / "r.fmu", "r", cache=False)
+    report = e.value.report
+    assert not report.ok
+    assert report.compile_status == 3
+    assert report.compile_command == "exit 3"
+    assert report.source_size > 0 and report.library_size is None
+    assert not (tmp_path / "r.fmu").exists()
+
+
+def test_cli_report(tmp_path):
+    runner = CliRunner()
+    path = tmp_path / "report.json"
+    result = runner.invoke(
+        cli,
+        [
+            "tf",
+            "-n",
+            "[1]",
+            "-d",
+            "[1, 1]",
+            "--no-cache",
+            "--report",
+            str(path),
+            "-o",
+            str(tmp_path / "r.fmu"),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(path.read_text())
+    assert report["identifier"] == "r"
+    assert report["compile_status"] == 0
+    assert report["timings"]["total"] > 0.0
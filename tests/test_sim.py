@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from scipy import signal, sparse
+
+from qfmu import model
+from qfmu.cli import cli
+from qfmu.sim import simulate, simulate_batch
+from qfmu.utils import build_fmu
+
+A = np.array([[-1.0, 0.0], [0.0, -100.0]])
+B = np.array([[1.0], [100.0]])
+C = np.array([[1.0, 1.0]])
+
+
+def step_response(t):
+    return 2.0 - np.exp(-t) - np.exp(-100.0 * t)
+
+
+@pytest.mark.parametrize(
+    "t",
+    [
+        np.linspace(0.0, 1.0, 101),
+        np.concatenate([np.linspace(0.0, 0.05, 51), np.linspace(0.1, 1.0, 10)]),
+    ],
+)
+def test_step(t):
+    result = simulate(model.StateSpace(A, B, C), t, np.ones(len(t)))
+    assert result.dtype.names == ("time", "y1")
+    assert np.array_equal(result["time"], t)
+    assert np.allclose(result["y1"], step_response(t), atol=1e-12)
+
+
+def test_sparse():
+    t = np.linspace(0.0, 1.0, 101)
+    u = np.sin(t)
+    dense = simulate(model.StateSpace(A, B, C), t, u)
+    csr = simulate(model.StateSpace(sparse.csr_matrix(A), B, C), t, u)
+    assert np.allclose(dense["y1"], csr["y1"], atol=1e-14)
+
+
+def test_foh():
+    m = model.StateSpace(A, B, C, np.array([[0.5]]), x0=np.array([1.0, -1.0]))
+    t = np.linspace(0.0, 1.0, 201)
+    u = np.sin(10.0 * t)
+    _, y_ref, _ = signal.lsim((A, B, C, np.array([[0.5]])), u, t, X0=[1.0, -1.0])
+    assert np.allclose(simulate(m, t, u, solver="foh")["y1"], y_ref, atol=1e-10)
+
+    # Same trajectory on a non-uniform grid
+    tn = np.sort(np.concatenate([t, [0.0025, 0.5025]]))
+    result = simulate(m, tn, np.sin(10.0 * tn), solver="foh")
+    assert np.allclose(np.interp(t, tn, result["y1"]), y_ref, atol=1e-3)
+
+
+def test_u0_and_feedthrough():
+    m = model.StateSpace(D=np.array([[1.0, 2.0], [3.0, 4.0]]), u0=np.array([1.0, 1.0]))
+    result = simulate(m, [0.0, 0.5, 1.0])
+    assert result.dtype.names == ("time", "y1", "y2")
+    assert np.allclose(result["y1"], 3.0)
+    assert np.allclose(result["y2"], 7.0)
+
+
+def test_invalid():
+    m = model.StateSpace(A, B, C)
+    with pytest.raises(ValueError):
+        simulate(m, [0.0, 1.0], solver="foo")
+    with pytest.raises(ValueError):
+        simulate(m, [0.0, 1.0, 0.5])
+    with pytest.raises(ValueError):
+        simulate(m, [0.0, 1.0], np.ones((3, 1)))
+
+
+def test_fmu(tmp_path):
+    fmpy = pytest.importorskip("fmpy")
+    m = model.TransferFunction([1.0, 2.0], [1.0, 3.0, 2.0])
+    filename = tmp_path / "sim.fmu"
+    build_fmu(m, filename, "sim", dt=0.01, solver="zoh")
+
+    t = np.linspace(0.0, 2.0, 201)
+    u = np.where(t >= 0.5, 1.0, 0.0)
+    inp = np.array(list(zip(t, u)), dtype=[("time", np.float64), ("u1", np.float64)])
+    ref = fmpy.simulate_fmu(
+        str(filename),
+        fmi_type="CoSimulation",
+        stop_time=2.0,
+        output_interval=0.01,
+        input=inp,
+    )
+    result = simulate(m, ref["time"], np.interp(ref["time"], t, u))
+    assert np.allclose(result["y1"], ref["y1"], atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "t", [np.linspace(0.0, 1.0, 101), np.array([0.0, 0.1, 0.15, 0.4, 1.0])]
+)
+@pytest.mark.parametrize("solver", ["zoh", "foh"])
+def test_batch(t, solver):
+    models = [
+        model.PID(kp, ki, kd, 0.01)
+        for kp, ki, kd in [(1.0, 0.5, 0.1), (2.0, 1.0, 0.2), (0.5, 3.0, 0.05)]
+    ]
+    batch = model.LTIBatch.from_models(models)
+    assert len(batch) == 3
+    assert batch.A.shape == (3, 2, 2)
+
+    u = np.stack([np.sin(t), np.cos(t), t])[:, :, np.newaxis]
+    result = simulate_batch(batch, t, u, solver=solver)
+    assert result.shape == (3, len(t))
+    for i, m in enumerate(models):
+        expected = simulate(m, t, u[i], solver=solver)
+        assert np.allclose(result[i]["y1"], expected["y1"], rtol=1e-12, atol=1e-12)
+
+    # Inputs shared by all variants
+    shared = simulate_batch(batch, t, np.sin(t), solver=solver)
+    assert np.allclose(shared[0]["y1"], result[0]["y1"])
+
+
+def test_batch_shape_mismatch():
+    with pytest.raises(ValueError):
+        model.LTIBatch.from_models([model.PID(1.0, 1.0), model.PID(1.0, 1.0, 1.0, 0.1)])
+    with pytest.raises(ValueError):
+        model.LTIBatch(
+            np.zeros((2, 1, 1)),
+            np.zeros((2, 1, 1)),
+            np.zeros((2, 1, 1)),
+            np.zeros((1, 1, 1)),
+        )
+
+
+def test_cli_sweep(tmp_path):
+    table = tmp_path / "tf.csv"
+    table.write_text('num,den\n[1],"[1, 1]"\n[2],"[1, 2]"\n')
+    output = tmp_path / "sweep.csv"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["sweep", "tf", str(table), "-u", "[1]", "--dt", "0.1", "-o", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+
+    data = np.loadtxt(output, delimiter=",", skiprows=1)
+    assert output.read_text().splitlines()[0] == "variant,time,y1"
+    assert data.shape == (22, 3)
+    t = data[:11, 1]
+    assert np.allclose(data[:11, 2], 1.0 - np.exp(-t))
+    assert np.allclose(data[11:, 2], 1.0 - np.exp(-2.0 * t))
+
+    table.write_text('num,den\n[1],"[1, 1]"\n[1],"[1, 2, 1]"\n')
+    result = runner.invoke(cli, ["sweep", "tf", str(table), "-o", str(output)])
+    assert result.exit_code != 0
@@ -0,0 +1,134 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from qfmu import model
+from qfmu.utils import build_fmu
+
+fmpy = pytest.importorskip("fmpy")
+
+A = np.array([[-1.0, 0.0], [0.0, -100.0]])
+B = np.array([[1.0], [100.0]])
+C = np.array([[1.0, 1.0]])
+
+
+def step_response(t):
+    return 2.0 - np.exp(-t) - np.exp(-100.0 * t)
+
+
+def simulate(filename, output_interval, relative_tolerance=None):
+    inp = np.array(
+        [(0.0, 1.0), (1.0, 1.0)], dtype=[("time", np.float64), ("u1", np.float64)]
+    )
+    return fmpy.simulate_fmu(
+        str(filename),
+        fmi_type="CoSimulation",
+        stop_time=1.0,
+        output_interval=output_interval,
+        relative_tolerance=relative_tolerance,
+        input=inp,
+    )
+
+
+def test_discretize():
+    m = model.StateSpace(A, B, C)
+    Ad, Bd = m.discretize(0.01)
+    assert np.allclose(Ad, np.diag(np.exp([-0.01, -1.0])))
+    assert np.allclose(Bd[:, 0], [1.0 - np.exp(-0.01), 1.0 - np.exp(-1.0)])
+
+
+@pytest.mark.parametrize("output_interval", [0.01, 0.003, 0.05])
+def test_zoh(output_interval, tmp_path):
+    filename = tmp_path / "zoh.fmu"
+    build_fmu(model.StateSpace(A, B, C), filename, "zoh", dt=0.01, solver="zoh")
+    result = simulate(filename, output_interval)
+    assert np.allclose(result["y1"], step_response(result["time"]), atol=1e-6)
+
+
+@pytest.mark.parametrize("fmi_version", ["2", "3"])
+def test_variable_step_size(fmi_version, tmp_path):
+    filename = tmp_path / "zoh.fmu"
+    build_fmu(
+        model.StateSpace(A, B, C),
+        filename,
+        "zoh",
+        dt=0.01,
+        solver="zoh",
+        fmi_version=fmi_version,
+    )
+    description = fmpy.read_model_description(str(filename))
+    assert description.coSimulation.canHandleVariableCommunicationStepSize
+
+    # Steps off the default step size are discretized on demand
+    fmu = fmpy.instantiate_fmu(fmpy.extract(str(filename)), description)
+    vrs = {v.name: v.valueReference for v in description.modelVariables}
+    if fmi_version == "2":
+        fmu.setupExperiment(startTime=0.0)
+        fmu.enterInitializationMode()
+        fmu.exitInitializationMode()
+        set_real, get_real = fmu.setReal, fmu.getReal
+    else:
+        fmu.enterInitializationMode(startTime=0.0)
+        fmu.exitInitializationMode()
+        set_real, get_real = fmu.setFloat64, fmu.getFloat64
+    # FMI 3 stores the inputs and outputs as arrays
+    u, y = (vrs["u1"], vrs["y1"]) if fmi_version == "2" else (vrs["u"], vrs["y"])
+    t = 0.0
+    for h in [0.013, 0.37, 0.01, 0.002, 0.37, 0.05]:
+        set_real([u], [1.0])
+        fmu.doStep(t, h)
+        t += h
+        assert get_real([y])[0] == pytest.approx(step_response(t), abs=1e-12)
+    fmu.terminate()
+    fmu.freeInstance()
+
+
+@pytest.mark.parametrize(
+    "solver, dt, atol",
+    [
+        ("euler", 0.001, 5e-2),
+        ("rk4", 0.001, 1e-6),
+        ("dopri45", 0.01, 1e-4),
+    ],
+)
+def test_integrator(solver, dt, atol, tmp_path):
+    filename = tmp_path / f"{solver}.fmu"
+    build_fmu(model.StateSpace(A, B, C), filename, solver, dt=dt, solver=solver)
+    result = simulate(filename, 0.01)
+    assert np.allclose(result["y1"], step_response(result["time"]), atol=atol)
+
+
+def test_dopri45_tolerance(tmp_path):
+    filename = tmp_path / "dopri45.fmu"
+    build_fmu(model.StateSpace(A, B, C), filename, "dopri45", solver="dopri45")
+    coarse = simulate(filename, 0.05, relative_tolerance=1e-3)
+    fine = simulate(filename, 0.05, relative_tolerance=1e-8)
+    coarse_err = np.max(np.abs(coarse["y1"] - step_response(coarse["time"])))
+    fine_err = np.max(np.abs(fine["y1"] - step_response(fine["time"])))
+    assert fine_err < 1e-7
+    assert fine_err < coarse_err
+
+
+def test_invalid_solver(tmp_path):
+    with pytest.raises(ValueError):
+        build_fmu(model.StateSpace(A, B, C), tmp_path / "q.fmu", "q", solver="foo")
+
+
+@pytest.mark.parametrize("solver", ["euler", "rk4", "zoh"])
+def test_unroll(solver, tmp_path):
+    m = model.StateSpace(
+        A, B, np.array([[1.0, 1.0], [0.5, 0.0]]), np.array([[0.0], [2.0]])
+    )
+    results = []
+    for unroll in [True, False]:
+        filename = tmp_path / f"unroll_{unroll}.fmu"
+        build_fmu(
+            m, filename, f"unroll_{unroll}", dt=0.001, solver=solver, unroll=unroll
+        )
+        with zipfile.ZipFile(filename) as z:
+            source = z.read("sources/fmi2model.c").decode()
+        assert ("dx[0] = -x[0] + u[0];" in source) == unroll
+        results.append(simulate(filename, 0.01))
+    assert np.allclose(results[0]["y1"], results[1]["y1"], rtol=1e-12, atol=1e-12)
+    assert np.allclose(results[0]["y2"], results[1]["y2"], rtol=1e-12, atol=1e-12)
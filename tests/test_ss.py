@@ -2,13 +2,16 @@ import json
 import pathlib
 import random
 import uuid
+import zipfile
 
 import numpy as np
 import pytest
 from click.testing import CliRunner
+from scipy import sparse
 
 from qfmu import model
 from qfmu.cli import cli
+from qfmu.utils import build_fmu
 
 
 class TestStateSpace:
@@ -130,3 +133,93 @@ class TestStateSpace:
             assert result.exit_code == 0
             assert pathlib.Path(filename).exists()
             assert result.output == ""
+
+    @pytest.mark.parametrize(
+        "A,B,C,D,nx,nu,ny",
+        [
+            (sparse.csr_matrix(A), None, None, None, nx, 0, nx),
+            (None, sparse.csr_matrix(B), None, None, nx, nu, nx),
+            (None, None, None, sparse.csr_matrix(D), 0, nu, ny),
+            (sparse.csr_matrix(A), B, C, None, nx, nu, ny),
+            (A, sparse.csr_matrix(B), None, D, nx, nu, ny),
+            (None, sparse.csr_matrix(B), C, None, nx, nu, ny),
+        ],
+    )
+    def test_sparse_ctor(self, A, B, C, D, nx, nu, ny):
+        m = model.StateSpace(A, B, C, D)
+        assert m.nx == nx
+        assert m.nu == nu
+        assert m.ny == ny
+        assert all(sparse.issparse(mat) for mat in (m.A, m.B, m.C, m.D))
+
+    def test_sparse_fmu(self, tmp_path):
+        fmpy = pytest.importorskip("fmpy")
+        A = sparse.random(24, 24, density=0.1, random_state=0) - 2 * sparse.eye(24)
+        B = sparse.random(24, 2, density=0.2, random_state=1)
+        C = sparse.random(3, 24, density=0.2, random_state=2)
+        inp = np.array(
+            [(0.0, 1.0, -1.0), (1.0, 1.0, -1.0)],
+            dtype=[("time", np.float64), ("u1", np.float64), ("u2", np.float64)],
+        )
+
+        results = []
+        for is_sparse in [True, False]:
+            filename = tmp_path / f"{is_sparse}.fmu"
+            build_fmu(
+                model.StateSpace(A, B, C), filename, str(is_sparse), sparse=is_sparse
+            )
+            results.append(
+                fmpy.simulate_fmu(
+                    str(filename), stop_time=1.0, output_interval=0.01, input=inp
+                )
+            )
+
+        for name in ["y1", "y2", "y3"]:
+            assert np.allclose(results[0][name], results[1][name])
+
+    def test_cli_sparse(self, tmp_path):
+        runner = CliRunner()
+        with runner.isolated_filesystem(temp_dir=tmp_path) as td:
+            filename = f"{td}/{uuid.uuid4()}.fmu"
+            result = runner.invoke(
+                cli,
+                [
+                    "ss",
+                    "--A",
+                    json.dumps(self.A.tolist()),
+                    "--B",
+                    json.dumps(self.B.tolist()),
+                    "--sparse",
+                    "--output",
+                    f"{filename}",
+                ],
+            )
+            assert result.exit_code == 0
+            assert pathlib.Path(filename).exists()
+
+    @pytest.mark.parametrize(
+        "float_format, literal", [("dec", "0.5"), ("hex", "0x1.0000000000000p-1")]
+    )
+    def test_cli_float_format(self, float_format, literal, tmp_path):
+        runner = CliRunner()
+        filename = tmp_path / "q.fmu"
+        result = runner.invoke(
+            cli,
+            [
+                "ss",
+                "-A",
+                "[[-0.1]]",
+                "-B",
+                "[[0.5]]",
+                "--no-unroll",
+                "--float-format",
+                float_format,
+                "--no-cache",
+                "-o",
+                str(filename),
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        with zipfile.ZipFile(filename) as z:
+            source = z.read("sources/fmi2model.c").decode()
+        assert f"B[1][1] = {{{{{literal}}}}};" in source
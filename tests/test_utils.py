@@ -3,6 +3,12 @@ import sys
 import numpy as np
 import pytest
 
+from qfmu.codegen.utils import (
+    array2cstr,
+    array2xml,
+    iter_carray,
+    linear_combination,
+)
 from qfmu.utils import find_vcvarsall_location, str_to_arr, str_to_mat
 
 
@@ -19,3 +25,53 @@ def test_str_to_arr():
 )
 def test_find_vcvarsall_location():
     assert find_vcvarsall_location() is not None
+
+
+def test_array2cstr_precision():
+    arr = np.array([0.1, 1.0 / 3.0, -2.5e-300, 12345678.123456789])
+    values = array2cstr(arr).strip("{}").split(",")
+    assert np.array_equal(np.array(values, dtype=float), arr)
+
+
+def test_array2cstr_hex():
+    arr = np.array([[0.1, -1.0 / 3.0], [0.0, 1e10]])
+    rows = array2cstr(arr, float_format="hex")[2:-2].split("},{")
+    values = [[float.fromhex(v) for v in row.split(",")] for row in rows]
+    assert np.array_equal(np.array(values), arr)
+
+
+def test_array2cstr_large():
+    arr = np.arange(2000 * 3, dtype=float).reshape(2000, 3)
+    cstr = array2cstr(arr)
+    assert "..." not in cstr
+    assert cstr.count("},{") == 1999
+
+
+def test_array2cstr_nonfinite():
+    assert array2cstr(np.array([np.inf, -np.inf, np.nan])) == "{INFINITY,-INFINITY,NAN}"
+
+
+def test_iter_carray_chunks():
+    arr = np.arange(10, dtype=int)
+    chunks = list(iter_carray(arr, chunk_size=4))
+    assert len(chunks) > 3
+    assert "".join(chunks) == "{0,1,2,3,4,5,6,7,8,9}"
+
+
+def test_linear_combination():
+    operands = ["x[0]", "x[1]", "x[2]", "u[0]"]
+    assert (
+        linear_combination([0.0, 1.0, -1.0, 0.5], operands)
+        == "x[1] - x[2] + 0.5 * u[0]"
+    )
+    assert linear_combination([-2.0, 0.0, 0.0, 1.0], operands) == "-2 * x[0] + u[0]"
+    assert linear_combination([0.0] * 4, operands) == "0.0"
+    assert linear_combination([0.1], ["x[0]"]) == "0.10000000000000001 * x[0]"
+    assert linear_combination([-0.5], ["x[0]"], "hex") == "-0x1.0000000000000p-1 * x[0]"
+
+
+def test_array2xml():
+    arr = np.array([[0.1, 1.0 / 3.0], [np.inf, np.nan]])
+    values = array2xml(arr).split(" ")
+    assert values[2:] == ["INF", "NaN"]
+    assert np.array_equal(np.array(values[:2], dtype=float), arr[0])